@@ -8,32 +8,29 @@ Added implementation of security simulation
 
 """
 
-def main():
+def main(serial=False):
     print("Starting StarPerf...")
 
+    """
+    The XML, TLE, standalone module, kits, duration constellation, traffic
+    and security cases are declared in experiment_runner.STARPERF_CASES
+    together with the cases they must wait for. Independent cases run
+    concurrently in a process pool; each case's output goes to
+    .experiment_cache/<case>.log and a timing summary is printed at the end.
+    The cases declare no output files, so every run re-runs all of them.
+    Use --serial to run them one after another as before.
 
-    print("Starting XML Constellations Testing...")
-    # test the core module functionality of various XML constellations
-    import samples.XML_constellation.XML_constellation_test_cases
-    samples.XML_constellation.XML_constellation_test_cases.XML_constellation_test_cases()
-    print("END.")
-
-    print("Starting TLE Constellations Testing")
-    # test the core module functionality of various TLE constellations
-    import samples.TLE_constellation.TLE_constellation_test_cases
-    samples.TLE_constellation.TLE_constellation_test_cases.TLE_constellation_test_cases()
-    print("END.")
-
-    print("Starting Standalone Module Testing...")
-    # test each standalone module under "src/standalone_module/" in starperf 2.0
-    import samples.standalone_module.standalone_module_test_cases as standalone_module_test_cases
-    standalone_module_test_cases.standalone_module_test_cases()
-    print("END.")
+    Traffic generation will take the longest time. On a 4-core Intel Xeon
+    Processor (Icelake) processor, 1 second of traffic will be generated
+    every 15 seconds. Therefore, the traffic generation here is set to 10
+    seconds, although I generated 1000 seconds of traffic in the experiment.
 
-    print("Starting Tool Scripts Testing...")
-    # test each tool script under "kits/" in starperf 2.0
-    import samples.kits.kits_test_cases as KITS_TEST_CASES
-    KITS_TEST_CASES.kits_test_cases()
+    Energy consumption attacks require longer traffic generation time, because the implementation
+    period of the attack is usually measured in months and years. In the example here, I only 
+    implemented a simulation of dT=500 for one orbital period, which requires 11s of traffic generation.
+    """
+    from experiment_runner import run_stages, starperf_stages
+    run_stages(starperf_stages(), num_workers=1 if serial else None)
     print("END.")
 
     """
@@ -52,38 +49,7 @@ def main():
     # CONS_VIS_TEST_CASES.visualization_example()
     # print("END.")
 
-    """
-    This will test the functionality of duration constellation. It is similar to the previously 
-    implemented XML Constellation, but supports customizing the simulation time and simulation 
-    sampling interval (XML Constellation currently only supports simulation of the entire orbital period)
-    """
-    print("Start simulation performance and indicators testing")
-    import samples.duration_constellation.duration_constellation_cases
-    samples.duration_constellation.duration_constellation_cases.constellation_performance()
-    print("END.")
-
-    """
-    This will take the longest time. On a 4-core Intel Xeon Processor (Icelake) processor, 
-    1 second of traffic will be generated every 15 seconds. Therefore, the traffic generation 
-    here is set to 10 seconds, although I generated 1000 seconds of traffic in the experiment.
-    """
-    print("Start benign traffic generation")
-    import samples.traffic.traffic_generation_cases
-    samples.traffic.traffic_generation_cases.traffic_generation()
-    print("END.")
-
-    """
-    Energy consumption attacks require longer traffic generation time, because the implementation
-    period of the attack is usually measured in months and years. In the example here, I only 
-    implemented a simulation of dT=500 for one orbital period, which requires 11s of traffic generation.
-    """
-    print("Start LEO network security simulation")
-    import samples.attack.attack_cases
-    samples.attack.attack_cases.attack_cases()
-    print("END.")
-    
-
 
 if __name__ == '__main__':
-    main()
-    
\ No newline at end of file
+    import sys
+    main(serial='--serial' in sys.argv)
@@ -4,7 +4,10 @@ AI-Powered Routing vs. Classic Routing (Version 3 - Dynamic Access)
 ======================================================================
 This version dynamically finds the best access satellites at each
 timeslot instead of using hardcoded start/end nodes. This ensures
-that the routing problem is always valid.
+that the routing problem is always valid. The timeslot loop runs as a
+prefetch pipeline (prefetch_pipeline.py): H5 reads, access search and
+graph/prediction work for later slots overlap the routing of the
+current one.
 """
 import time
 import pandas as pd
@@ -17,37 +20,13 @@ import os
 from src.constellation_generation.by_XML.constellation_configuration import constellation_configuration
 import src.XML_constellation.constellation_entity.user as USER
 import src.XML_constellation.constellation_connectivity.connectivity_mode_plugin_manager as connectivity_mode_plugin_manager
-import h5py
-from math import radians, cos, sin, asin, sqrt
 
-# --- Utility Functions (Unchanged) ---
-def distance_between_satellite_and_user(groundstation, satellite, t):
-    longitude1, latitude1 = groundstation.longitude, groundstation.latitude
-    longitude2, latitude2 = satellite.longitude[t-1], satellite.latitude[t-1]
-    longitude1, latitude1, longitude2, latitude2 = map(radians, [float(longitude1), float(latitude1), float(longitude2), float(latitude2)])
-    dlon, dlat = longitude2 - longitude1, latitude2 - latitude1
-    a = sin(dlat/2)**2 + cos(latitude1) * cos(latitude2) * sin(dlon/2)**2
-    distance = 2 * asin(sqrt(a)) * 6371.0
-    return np.round(distance, 3)
-
-def build_graph_from_h5(h5_file_path, shell_name, time_slot):
-    try:
-        with h5py.File(h5_file_path, 'r') as file:
-            delay_group = file['delay']
-            current_shell_group = delay_group[shell_name]
-            delay_matrix = np.array(current_shell_group[f'timeslot{time_slot}']).tolist()
-    except (KeyError, FileNotFoundError):
-        print(f"  Warning: Could not read delay data for shell '{shell_name}', timeslot {time_slot}.")
-        return None
-    
-    G = nx.Graph()
-    num_sats_plus_one = len(delay_matrix)
-    for i in range(1, num_sats_plus_one):
-        for j in range(i + 1, num_sats_plus_one):
-            if delay_matrix[i][j] > 0:
-                G.add_edge(f"satellite_{i}", f"satellite_{j}", weight=delay_matrix[i][j])
-    return G
+from constellation_index import ConstellationIndex
+from prefetch_pipeline import run_pipeline
+from snapshot_reader import SnapshotReader, graph_from_edges, nearest_satellite
+from tracing import span
 
+# --- Utility Functions (Unchanged) ---
 def calculate_path_metrics(path, G_real):
     if not path: return float('inf'), float('inf')
     hops = len(path) - 1
@@ -84,49 +63,41 @@ def ai_comparison():
     print("AI model loaded successfully.")
 
     shell = constellation.shells[0]
-    sat_to_orbit_map = {f"satellite_{sat.id}": orbit.orbit_id for orbit in shell.orbits for sat in orbit.satellites}
+    index = ConstellationIndex.from_shell(shell)
     
     # --- 4. Simulation and Comparison Loop ---
     simulation_range = range(1, 51) # Let's try a longer range
     results = []
 
-    print(f"\nStarting simulation for {len(simulation_range)} time steps...")
-    for t in simulation_range:
-        # --- DYNAMIC ACCESS SATELLITE FINDING (INSIDE THE LOOP) ---
-        nearest_sat_to_source, nearest_sat_to_target = None, None
-        min_dist_source, min_dist_target = float('inf'), float('inf')
-        for orbit in shell.orbits:
-            for sat in orbit.satellites:
-                dist1 = distance_between_satellite_and_user(source_user, sat, t)
-                if dist1 < min_dist_source:
-                    min_dist_source = dist1
-                    nearest_sat_to_source = sat
-                
-                dist2 = distance_between_satellite_and_user(target_user, sat, t)
-                if dist2 < min_dist_target:
-                    min_dist_target = dist2
-                    nearest_sat_to_target = sat
-        
-        if not nearest_sat_to_source or not nearest_sat_to_target:
-            print(f"  Skipping timeslot {t}: Could not find access satellites.")
-            continue
-        start_node = f"satellite_{nearest_sat_to_source.id}"
-        end_node = f"satellite_{nearest_sat_to_target.id}"
-        # --- END OF DYNAMIC ACCESS LOGIC ---
-
-        G_real = build_graph_from_h5(h5_file_path, shell.shell_name, t)
-        if G_real is None: continue
-            
-        G_predicted = G_real.copy()
-        for u, v in G_predicted.edges():
-            is_inter_plane = 1 if sat_to_orbit_map.get(u) != sat_to_orbit_map.get(v) else 0
-            features = pd.DataFrame([[t, is_inter_plane]], columns=['time_slot', 'is_inter_plane'])
-            predicted_delay = model.predict(features)[0]
-            G_predicted[u][v]['weight'] = predicted_delay
+    reader = SnapshotReader(h5_file_path, shell.shell_name)
+
+    # Stage 1: read and decode the slot from the H5 file
+    def read_slot(t):
+        return reader.edges(t), reader.positions(t)
 
+    # Stage 2: access satellites, real graph and AI-weighted graph
+    def build_slot(t, raw):
+        (src, dst, delays), positions = raw
+        # --- DYNAMIC ACCESS SATELLITE FINDING (INSIDE THE LOOP) ---
+        start_id, _ = nearest_satellite(positions, source_user.longitude, source_user.latitude)
+        end_id, _ = nearest_satellite(positions, target_user.longitude, target_user.latitude)
+        # Predict every edge of the slot in one model call; the model was
+        # trained on int64 CSV columns, so cast the int8 feature back
+        features = pd.DataFrame({'time_slot': t,
+                                 'is_inter_plane': index.is_inter_plane(src, dst).astype(np.int64)})
+        with span('model.predict'):
+            predicted_delays = model.predict(features)
+        G_real = graph_from_edges(src, dst, delays)
+        G_predicted = graph_from_edges(src, dst, predicted_delays)
+        return f"satellite_{start_id}", f"satellite_{end_id}", G_real, G_predicted
+
+    # Stage 3: routing on both graphs
+    def route_slot(t, snapshot):
+        start_node, end_node, G_real, G_predicted = snapshot
         try:
-            path_classic = nx.dijkstra_path(G_real, source=start_node, target=end_node, weight='weight')
-            path_ai = nx.dijkstra_path(G_predicted, source=start_node, target=end_node, weight='weight')
+            with span('route.dijkstra'):
+                path_classic = nx.dijkstra_path(G_real, source=start_node, target=end_node, weight='weight')
+                path_ai = nx.dijkstra_path(G_predicted, source=start_node, target=end_node, weight='weight')
             
             classic_delay, classic_hops = calculate_path_metrics(path_classic, G_real)
             ai_delay, ai_hops = calculate_path_metrics(path_ai, G_real)
@@ -136,7 +107,13 @@ def ai_comparison():
 
         except nx.NetworkXNoPath:
             print(f"  Skipping timeslot {t}: No path found between {start_node} and {end_node}.")
-            continue
+
+    print(f"\nStarting simulation for {len(simulation_range)} time steps...")
+    # A timeslot missing from the H5 file is skipped, not fatal
+    stats = run_pipeline(simulation_range, read_slot, build_slot, route_slot, skip=(KeyError,))
+    reader.close()
+    print("\n--- Pipeline Stage Timing ---")
+    print(stats.summary())
 
     # --- 5. Analyze and Print Final Results ---
     print("\n======================================================================")
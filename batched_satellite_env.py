@@ -0,0 +1,175 @@
+"""
+================================================================
+Batched Beam Steering Environment (N episodes per call)
+================================================================
+SatelliteEnv scores beams with a Python loop and a set, and
+Stable-Baselines3 can only parallelise it by cloning whole envs.
+BatchedSatelliteEnv steps N independent episodes in one NumPy call:
+
+- per-env timesteps live in one int array,
+- rewards are one fancy-indexing lookup into the flattened demand
+  map, with duplicate beams masked out after a row-wise sort,
+- finished episodes are reset in place (SB3 auto-reset semantics).
+
+It implements the SB3 VecEnv interface, so it can be passed straight
+to PPO("MlpPolicy", env). The envs share ONE set of attributes:
+get_attr() returns the shared value for every index, and set_attr() /
+env_method() raise ValueError unless 'indices' selects all envs. Use step_batch() for raw throughput when
+the per-env info dicts that SB3 requires are not needed.
+"""
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from satellite_env import SatelliteEnv, build_demand_map, load_trajectory
+from tracing import count, traced
+
+
+def batched_beam_rewards(actions, flat_demand):
+    """
+    Rewards for a (num_envs, num_beams) array of cell indices. A beam that
+    points at a cell already covered by another beam of the same env
+    earns nothing, exactly like the set in SatelliteEnv.step.
+    """
+    cells = np.sort(actions, axis=1)
+    duplicate = np.zeros(cells.shape, dtype=bool)
+    duplicate[:, 1:] = cells[:, 1:] == cells[:, :-1]
+    return np.where(duplicate, 0.0, flat_demand[cells]).sum(axis=1, dtype=np.float32)
+
+
+class BatchedSatelliteEnv(VecEnv):
+    """N copies of SatelliteEnv sharing one trajectory and one demand map."""
+
+    def __init__(self, num_envs, trajectory_file='satellite_1_trajectory.npz', trajectory=None,
+                 random_start=False, seed=None):
+        # --- 1. Shared Data ---
+        if trajectory is None:
+            trajectory = load_trajectory(trajectory_file)
+        self.trajectory = trajectory
+        self.total_timesteps = len(trajectory)
+        self.demand_map = build_demand_map()
+        self.flat_demand = self.demand_map.ravel().astype(np.float32)
+
+        # --- 2. Constants and Spaces (identical to SatelliteEnv) ---
+        self.NUM_BEAMS = 4
+        self.GRID_ROWS = 18
+        self.GRID_COLS = 36
+        action_space = spaces.MultiDiscrete([self.GRID_ROWS * self.GRID_COLS] * self.NUM_BEAMS)
+        observation_space = spaces.Box(low=np.array([-90.0, -180.0], dtype=np.float32),
+                                       high=np.array([90.0, 180.0], dtype=np.float32), dtype=np.float32)
+        self.render_mode = None
+        super().__init__(num_envs, observation_space, action_space)
+
+        # --- 3. Per-Env State ---
+        # With random_start, each episode begins at a random point of the orbit
+        # so the N envs do not move in lockstep.
+        self.random_start = random_start
+        self.rng = np.random.default_rng(seed)
+        self.timesteps = np.zeros(num_envs, dtype=np.int64)
+        self._actions = None
+
+    # --- Batched Core ---
+    def _start_timesteps(self, count):
+        if self.random_start:
+            return self.rng.integers(0, self.total_timesteps - 1, size=count)
+        return np.zeros(count, dtype=np.int64)
+
+    def _get_obs(self):
+        return np.asarray(self.trajectory[self.timesteps], dtype=np.float32)
+
+    @traced('env.step_batch')
+    def step_batch(self, actions):
+        """
+        Steps every env at once. Returns (obs, rewards, dones, terminal_obs),
+        where terminal_obs holds the last observation of the episodes that
+        just ended (rows of finished envs in 'obs' are already reset).
+        """
+        actions = np.asarray(actions).reshape(self.num_envs, self.NUM_BEAMS)
+        rewards = batched_beam_rewards(actions, self.flat_demand)
+
+        self.timesteps += 1
+        dones = self.timesteps >= (self.total_timesteps - 1)
+        obs = self._get_obs()
+
+        terminal_obs = obs[dones]
+        if terminal_obs.shape[0]:
+            self.timesteps[dones] = self._start_timesteps(terminal_obs.shape[0])
+            obs[dones] = np.asarray(self.trajectory[self.timesteps[dones]], dtype=np.float32)
+        count('env.transitions', self.num_envs)
+        return obs, rewards, dones, terminal_obs
+
+    # --- SB3 VecEnv Interface ---
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self.timesteps = self._start_timesteps(self.num_envs)
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self):
+        obs, rewards, dones, terminal_obs = self.step_batch(self._actions)
+        infos = [{} for _ in range(self.num_envs)]
+        for info, final_obs in zip((infos[i] for i in np.flatnonzero(dones)), terminal_obs):
+            info['terminal_observation'] = final_obs
+            # Episodes only end at the trajectory horizon, a time limit
+            info['TimeLimit.truncated'] = True
+        return obs, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def _indices_count(self, indices):
+        return len(self._get_indices(indices))
+
+    def _check_all_envs(self, indices, operation):
+        """Attributes are shared, so a change can only apply to every env at once."""
+        if set(self._get_indices(indices)) != set(range(self.num_envs)):
+            raise ValueError(f"{operation}: the {self.num_envs} envs share their attributes; "
+                             f"indices must select all of them, got {indices}.")
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name)] * self._indices_count(indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._check_all_envs(indices, f"set_attr('{attr_name}')")
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        self._check_all_envs(indices, f"env_method('{method_name}')")
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result] * self._indices_count(indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * self._indices_count(indices)
+
+
+def benchmark_batched_env(num_envs=4096, num_steps=1000):
+    """Measures transitions per second of step_batch against SatelliteEnv.step."""
+    import time
+
+    env = BatchedSatelliteEnv(num_envs, random_start=True, seed=0)
+    env.reset()
+    actions = env.rng.integers(0, env.GRID_ROWS * env.GRID_COLS, size=(num_steps, num_envs, env.NUM_BEAMS))
+    start_time = time.perf_counter()
+    for step_actions in actions:
+        env.step_batch(step_actions)
+    batched_rate = num_steps * num_envs / (time.perf_counter() - start_time)
+
+    single_env = SatelliteEnv(trajectory=env.trajectory)
+    single_env.reset()
+    start_time = time.perf_counter()
+    for step_actions in actions[:, 0]:
+        _, _, terminated, truncated, _ = single_env.step(step_actions)
+        if terminated or truncated:
+            single_env.reset()
+    single_rate = num_steps / (time.perf_counter() - start_time)
+
+    print(f"  SatelliteEnv.step:              {single_rate:>14,.0f} transitions/s")
+    print(f"  BatchedSatelliteEnv ({num_envs} envs): {batched_rate:>14,.0f} transitions/s")
+
+
+if __name__ == "__main__":
+    benchmark_batched_env()
@@ -0,0 +1,235 @@
+"""
+================================================================
+Benchmark Suite for the Simulation Hot Paths
+================================================================
+Times the hot paths on SYNTHETIC constellations, so no StarPerf
+pre-computation (and no Telesat H5 file) is needed:
+
+- snapshot build        H5 edge read + NetworkX graph build
+- access lookup         nearest_satellite() for a batch of users
+- routing               single pair (NetworkX, SciPy), multi-pair,
+                        all-pairs next-hop table
+- betweenness           sampled betweenness centrality
+- model inference       predict_link_weights() over all slots
+- dataset write/read    link CSV rows (isl_link_data.csv layout)
+- env step              SatelliteEnv.step and BatchedSatelliteEnv
+
+Every benchmark runs per constellation size (Telesat to Starlink
+scale plus a 10k-satellite 'mega' shell, see SIZES). Results go to a JSON file together with the git
+commit, so two runs can be compared:
+
+    python benchmarks.py --sizes telesat starlink --output before.json
+    python benchmarks.py --compare before.json after.json
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+from walker_generator import PRESETS, generate_walker_delta
+
+# name: (planes, satellites per plane, phasing F, altitude km, inclination deg)
+SIZES = PRESETS
+USER_LOCATIONS = [(105.84, 21.02), (-43.17, -22.91), (116.41, 39.9), (-74.00, 40.43),
+                  (-122.42, 37.77), (151.21, -33.87), (2.35, 48.86), (28.05, -26.2)]
+
+
+# --- 1. Measurement ---
+def measure(function, repeat=5):
+    """Runs function once to warm up, then 'repeat' times; returns timing stats in ms."""
+    function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': float(np.median(timings)), 'min_ms': float(np.min(timings)),
+            'max_ms': float(np.max(timings)), 'runs': repeat}
+
+
+def _train_benchmark_model(reader, index, timeslots):
+    """The repo's XGBoost predictor if installed, else a scikit-learn stand-in."""
+    import pandas as pd
+
+    src, dst, delays = reader.edges(timeslots[0])
+    features = pd.DataFrame({'time_slot': np.full(len(src), timeslots[0]),
+                             'is_inter_plane': index.is_inter_plane(src, dst).astype(np.int64)})
+    try:
+        import xgboost as xgb
+        model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100, max_depth=7, n_jobs=-1)
+    except ImportError:
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        model = HistGradientBoostingRegressor(max_iter=100, max_depth=7)
+    model.fit(features, delays)
+    return model
+
+
+# --- 2. Benchmarks ---
+def run_size(name, planes, sats_per_plane, phasing, altitude_km, inclination_deg, num_timeslots, repeat, work_dir):
+    import networkx as nx
+
+    from batched_satellite_env import BatchedSatelliteEnv
+    from jitter_analysis import route_pairs
+    from predictive_routing_tables import compute_next_hop_table, predict_link_weights
+    from satellite_env import SatelliteEnv
+    from snapshot_reader import SnapshotReader, graph_from_edges, nearest_satellite
+
+    h5_file = os.path.join(work_dir, f"{name}.h5")
+    start_time = time.perf_counter()
+    index = generate_walker_delta(h5_file, planes, sats_per_plane, phasing, altitude_km, inclination_deg,
+                                  num_timeslots=num_timeslots, layout='compact')
+    generate_s = time.perf_counter() - start_time
+
+    reader = SnapshotReader(h5_file, 'shell1')
+    timeslots = list(range(1, reader.num_timeslots + 1))
+    src, dst, delays = reader.edges(1)
+    positions = np.asarray(reader.positions(1))
+    G = graph_from_edges(src, dst, delays, integer_nodes=True)
+    access = [nearest_satellite(positions, *location)[0] - 1 for location in USER_LOCATIONS]
+    sources, targets = np.array(access[0::2]), np.array(access[1::2])
+    rng = np.random.default_rng(0)
+    results = {'num_satellites': reader.num_satellites, 'num_links': int(len(src)),
+               'timeslots': num_timeslots, 'generate_s': generate_s}
+
+    def bench(label, function, runs=repeat):
+        results[label] = measure(function, runs)
+        print(f"  {name:<10} {label:<28} {results[label]['median_ms']:>10.3f} ms")
+
+    bench('h5_read_edges', lambda: [reader.edges(t) for t in timeslots])
+    bench('h5_read_positions', lambda: [reader.positions(t) for t in timeslots])
+    bench('graph_build', lambda: graph_from_edges(src, dst, delays))
+    bench('access_lookup_8_users', lambda: [nearest_satellite(positions, *location) for location in USER_LOCATIONS])
+    bench('route_single_networkx', lambda: nx.dijkstra_path(G, access[0] + 1, access[1] + 1, weight='weight'))
+    bench('route_single_scipy', lambda: route_pairs(reader.num_satellites, src, dst, delays,
+                                                    sources[:1], targets[:1]))
+    bench('route_multi_pair_scipy', lambda: route_pairs(reader.num_satellites, src, dst, delays, sources, targets))
+    if reader.num_satellites <= 2000:
+        bench('route_all_pairs_table', lambda: compute_next_hop_table(reader.num_satellites, src, dst, delays),
+              runs=max(1, repeat // 2))
+    bench('betweenness_k32', lambda: nx.betweenness_centrality(G, k=32, weight='weight', seed=0),
+          runs=max(1, repeat // 2))
+
+    model = _train_benchmark_model(reader, index, timeslots)
+    results['model'] = type(model).__name__
+    bench('model_predict_all_slots', lambda: predict_link_weights(model, reader, timeslots, index))
+
+    csv_file = os.path.join(work_dir, f"{name}_links.csv")
+
+    def write_dataset():
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['time_slot', 'source_sat_id', 'target_sat_id', 'is_inter_plane', 'actual_delay'])
+            for t in timeslots:
+                slot_src, slot_dst, slot_delays = reader.edges(t)
+                writer.writerows(zip([t] * len(slot_src), index.node_names(slot_src), index.node_names(slot_dst),
+                                     index.is_inter_plane(slot_src, slot_dst).tolist(), slot_delays.tolist()))
+
+    def read_dataset():
+        import pandas as pd
+        pd.read_csv(csv_file)
+
+    bench('dataset_write_csv', write_dataset)
+    bench('dataset_read_csv', read_dataset)
+
+    # Env step on the trajectory of satellite 1, as [lat, lon] float32
+    trajectory = np.ascontiguousarray(reader.positions_range(1, reader.num_timeslots)[:, 0, [1, 0]],
+                                      dtype=np.float32)
+    env = SatelliteEnv(trajectory=trajectory)
+    env.reset(seed=0)
+    actions = rng.integers(0, env.GRID_ROWS * env.GRID_COLS, size=(1000, env.NUM_BEAMS))
+
+    def env_steps():
+        env.reset(seed=0)
+        for action in actions:
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset(seed=0)
+
+    bench('satellite_env_1000_steps', env_steps)
+    batched = BatchedSatelliteEnv(1024, trajectory=trajectory, seed=0)
+    batched.reset()
+    batch_actions = rng.integers(0, env.GRID_ROWS * env.GRID_COLS, size=(1024, env.NUM_BEAMS))
+    bench('batched_env_100x1024_steps', lambda: [batched.step_batch(batch_actions) for _ in range(100)])
+    reader.close()
+    return results
+
+
+# --- 3. Results and Comparison ---
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, num_timeslots=10, repeat=5, output_file=None):
+    import sklearn
+
+    report = {
+        'meta': {'commit': git_commit(), 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                 'python': platform.python_version(), 'numpy': np.__version__, 'h5py': h5py.__version__,
+                 'sklearn': sklearn.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count(),
+                 'timeslots': num_timeslots, 'repeat': repeat},
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in sizes:
+            print(f"\n--- {name}: {SIZES[name][0]} planes x {SIZES[name][1]} satellites ---")
+            report['results'][name] = run_size(name, *SIZES[name], num_timeslots, repeat, work_dir)
+
+    output_file = output_file or f"benchmark_{report['meta']['commit'] or 'local'}.json"
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output_file}")
+    return report
+
+
+def compare_results(baseline_file, candidate_file, threshold=0.10):
+    """Prints the median time ratio candidate/baseline per benchmark; flags changes beyond the threshold."""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    with open(candidate_file) as f:
+        candidate = json.load(f)
+    print("======================================================================")
+    print(f"  {baseline['meta']['commit']} -> {candidate['meta']['commit']} (median ms)")
+    print("======================================================================")
+    regressions = 0
+    for size, results in candidate['results'].items():
+        for label, stats in results.items():
+            old = baseline['results'].get(size, {}).get(label)
+            if not isinstance(stats, dict) or not isinstance(old, dict):
+                continue
+            ratio = stats['median_ms'] / max(old['median_ms'], 1e-9)
+            flag = 'REGRESSION' if ratio > 1 + threshold else ('faster' if ratio < 1 - threshold else '')
+            regressions += flag == 'REGRESSION'
+            print(f"  {size:<10} {label:<28} {old['median_ms']:>10.3f} {stats['median_ms']:>10.3f} "
+                  f"x{ratio:>6.2f} {flag}")
+    print(f"\n{regressions} regression(s) above {threshold:.0%}.")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hot-path benchmarks on synthetic constellations.")
+    parser.add_argument('--sizes', nargs='+', choices=sorted(SIZES), default=['telesat', 'starlink'])
+    parser.add_argument('--timeslots', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None, help="JSON results file (default: benchmark_<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'), default=None)
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change flagged by --compare")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.compare:
+        compare_results(*args.compare, threshold=args.threshold)
+    else:
+        run_benchmarks(args.sizes, args.timeslots, args.repeat, args.output)
@@ -0,0 +1,151 @@
+"""
+================================================================
+Unified Command-Line Front End
+================================================================
+One entry point for the scripts of this repository:
+
+    python cli.py <command> [script arguments]
+    python cli.py --importtime <command> [script arguments]
+    python cli.py --trace trace.json <command> [script arguments]
+
+cli.py itself imports only the standard library. A command runs its
+script as __main__ (with the script's own argument parser), so only
+the subsystems that script uses are imported, on first use: listing
+the commands never loads h5py, networkx, pandas, xgboost or
+stable_baselines3.
+
+Scripts without an argument parser (POSITIONAL_USAGE) never see
+-h/--help: cli.py prints their usage itself and rejects a wrong
+number of arguments before running them.
+
+--importtime runs the command under 'python -X importtime' and
+prints the slowest top-level imports, to spot new startup costs.
+--trace enables the hot-path spans of tracing.py for the command and
+writes a Chrome trace plus a summary table at exit.
+"""
+import argparse
+import os
+import re
+import runpy
+import subprocess
+import sys
+
+# command: (module, description)
+COMMANDS = {
+    'generate-data': ('generate_ai_data', "pre-compute the H5 file and write isl_link_data.csv"),
+    'train-predictor': ('train_predictor_model', "train the XGBoost link delay predictor"),
+    'compare-routing': ('ai_routing_comparison', "AI vs. classic routing for one user pair"),
+    'routing-tables': ('predictive_routing_tables', "pre-compute look-ahead next-hop tables"),
+    'visibility': ('gsl_visibility', "GSL visibility and end-to-end user routes"),
+    'contact-plan': ('contact_plan', "link up/down intervals and topology-change timeline"),
+    'jitter': ('jitter_analysis', "full-orbit jitter analysis over all timeslots"),
+    'simulate-packets': ('packet_simulator', "packet-level discrete-event simulation"),
+    'resilience': ('resilience_campaign', "Monte Carlo failure campaign"),
+    'generate-walker': ('walker_generator', "synthetic Walker-Delta +Grid constellation H5"),
+    'trajectories': ('trajectory_store', "extract the (T, N, 3) trajectory store"),
+    'interpolate-positions': ('position_interpolation', "sub-timeslot positions and their error bound"),
+    'convert-delays': ('delay_store', "convert dense delay matrices to the COO layout"),
+    'migrate-positions': ('position_store', "write typed position datasets"),
+    'shared-store': ('shared_snapshot_store', "load a snapshot into shared memory"),
+    'train-drl': ('train_drl_agent', "train the PPO beam steering agent"),
+    'evaluate-drl': ('evaluate_drl', "evaluate DRL, random and greedy policies"),
+    'benchmark-env': ('batched_satellite_env', "batched environment throughput"),
+    'experiments': ('experiment_runner', "stage-graph runner with cached outputs"),
+    'benchmark': ('benchmarks', "hot-path benchmarks on synthetic constellations"),
+    'starperf': ('StarPerf', "StarPerf test cases"),
+    'explore-h5': ('explore_h5', "print the structure of the Telesat H5 file"),
+}
+
+# Usage of the scripts WITHOUT an argument parser ('' = no arguments).
+# cli.py answers -h/--help and checks the argument count for these
+# itself, so a help request never starts a pre-computation.
+POSITIONAL_USAGE = {
+    'generate-data': '',
+    'train-predictor': '',
+    'compare-routing': '',
+    'trajectories': '',
+    'convert-delays': '<h5 file> <shell name> [output h5]',
+    'migrate-positions': '<h5 file> <shell name> [float32|float64]',
+    'shared-store': '[constellation] [shell name]',
+    'benchmark-env': '',
+    'starperf': '[--serial]',
+    'explore-h5': '',
+}
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def check_positional_arguments(command, arguments):
+    """
+    For scripts without an argument parser: prints the usage for -h/--help
+    or a wrong argument count. Returns an exit code, or None to run.
+    """
+    usage = POSITIONAL_USAGE[command]
+    required = len(re.findall(r'<[^>]+>', usage))
+    optional = len(re.findall(r'\[[^]]+\]', usage))
+    wants_help = any(argument in ('-h', '--help') for argument in arguments)
+    if not wants_help and required <= len(arguments) <= required + optional:
+        return None
+    print(f"usage: cli.py {command} {usage}".rstrip())
+    print(f"\n{COMMANDS[command][1]}")
+    if wants_help:
+        return 0
+    print(f"\nerror: '{command}' takes {required if not optional else f'{required} to {required + optional}'} "
+          f"argument(s), got {len(arguments)}", file=sys.stderr)
+    return 2
+
+
+def run_command(command, arguments):
+    """Runs the command's script as __main__ with its own sys.argv."""
+    module_name = COMMANDS[command][0]
+    sys.argv = [f"{module_name}.py"] + list(arguments)
+    runpy.run_module(module_name, run_name='__main__', alter_sys=True)
+
+
+def importtime_report(command, arguments, top=15):
+    """Runs the command under -X importtime and prints the slowest top-level imports."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__), command, *arguments],
+                             stderr=subprocess.PIPE, text=True)
+    top_level = []
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            # Keep the command's own error output visible
+            if not line.startswith('import time:'):
+                print(line, file=sys.stderr)
+        elif len(match.group(3)) == 1:
+            top_level.append((int(match.group(2)), match.group(4)))
+
+    total_us = sum(cumulative for cumulative, _ in top_level)
+    print("\n======================================================================")
+    print(f"  Import time of '{command}': {total_us / 1e6:.3f} s in {len(top_level)} top-level imports")
+    print("======================================================================")
+    for cumulative, name in sorted(top_level, reverse=True)[:top]:
+        print(f"  {cumulative / 1e3:>10.1f} ms  {name}")
+    return process.returncode
+
+
+def parse_args():
+    epilog = "commands:\n" + "\n".join(f"  {name:<22} {description}"
+                                        for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(description="StarPerf research scripts.", epilog=epilog,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--importtime', action='store_true', help="report import times of the command")
+    parser.add_argument('--trace', metavar='FILE', help="write a Chrome trace of the command's hot paths")
+    parser.add_argument('command', choices=sorted(COMMANDS), metavar='command')
+    parser.add_argument('arguments', nargs=argparse.REMAINDER, help="passed to the command's script")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.trace:
+        # Read by tracing.py on import, also in spawned worker processes
+        os.environ['STARPERF_TRACE'] = args.trace
+    if args.command in POSITIONAL_USAGE:
+        exit_code = check_positional_arguments(args.command, args.arguments)
+        if exit_code is not None:
+            sys.exit(exit_code)
+    if args.importtime:
+        sys.exit(importtime_report(args.command, args.arguments))
+    run_command(args.command, args.arguments)
@@ -0,0 +1,115 @@
+"""
+================================================================
+Constellation-Scale Beam Steering Environment
+================================================================
+SatelliteEnv models one satellite from satellite_1_trajectory.npz.
+ConstellationEnv drives EVERY satellite of a shell straight from the
+'position' group of the pre-computed H5 file:
+
+- State:  (lat, lon) of all N satellites, flattened to 2N values.
+- Action: NUM_BEAMS cell indices per satellite (N * NUM_BEAMS entries).
+- Reward: total demand of the cells covered by at least one beam.
+          A beam only counts if its cell centre is visible from its
+          satellite above MIN_ELEVATION, and a cell covered by several
+          beams (of the same or different satellites) counts once.
+
+Geometry and coverage are computed with NumPy for all beams of a
+timestep at once. Positions are read lazily through SnapshotReader,
+one timeslot at a time, so memory does not grow with the horizon.
+"""
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np
+
+from earth_geometry import central_angle_rad, grid_cell_centers, visibility_central_angle_rad
+from satellite_env import build_demand_map
+from snapshot_reader import SnapshotReader, h5_path_for
+from tracing import traced
+
+
+class ConstellationEnv(gym.Env):
+    """Shared demand map, per-satellite beams, coverage deduplicated across satellites."""
+    metadata = {'render_modes': ['human']}
+
+    def __init__(self, h5_file_path=h5_path_for("Telesat"), shell_name='shell1',
+                 num_beams=4, min_elevation_deg=25.0, reader=None):
+        super(ConstellationEnv, self).__init__()
+
+        # --- 1. Lazy Position Source ---
+        self.reader = reader if reader is not None else SnapshotReader(h5_file_path, shell_name)
+        self.num_satellites = self.reader.num_satellites
+        self.total_timesteps = self.reader.num_timeslots
+        self.current_timestep = 0
+        self._positions = None
+
+        # --- 2. Shared Demand Map and Grid Geometry ---
+        self.demand_map = build_demand_map()
+        self.GRID_ROWS, self.GRID_COLS = self.demand_map.shape
+        self.flat_demand = self.demand_map.ravel()
+        self.cell_lat, self.cell_lon = grid_cell_centers(self.GRID_ROWS, self.GRID_COLS)
+        self.NUM_BEAMS = num_beams
+        self.MIN_ELEVATION = min_elevation_deg
+
+        # --- 3. Action and Observation Space ---
+        num_cells = self.GRID_ROWS * self.GRID_COLS
+        self.action_space = spaces.MultiDiscrete([num_cells] * (self.num_satellites * self.NUM_BEAMS))
+        low = np.tile(np.array([-90.0, -180.0], dtype=np.float32), self.num_satellites)
+        high = np.tile(np.array([90.0, 180.0], dtype=np.float32), self.num_satellites)
+        self.observation_space = spaces.Box(low=low, high=high, dtype=np.float32)
+
+    def _load_positions(self):
+        """Reads the current timeslot only (H5 timeslots are 1-based)."""
+        self._positions = self.reader.positions(self.current_timestep + 1)
+
+    def _get_obs(self):
+        return self._positions[:, [1, 0]].astype(np.float32).ravel()
+
+    def _get_info(self):
+        return {'timestep': self.current_timestep}
+
+    def coverage(self, action):
+        """
+        Returns (covered, visible_beams): a boolean mask over grid cells and
+        the per-beam visibility mask of shape (N, NUM_BEAMS).
+        """
+        cells = np.asarray(action).reshape(self.num_satellites, self.NUM_BEAMS)
+        sat_lat = self._positions[:, 1:2]
+        sat_lon = self._positions[:, 0:1]
+        angles = central_angle_rad(sat_lat, sat_lon, self.cell_lat[cells], self.cell_lon[cells])
+        max_angles = visibility_central_angle_rad(self._positions[:, 2:3], self.MIN_ELEVATION)
+        visible_beams = angles <= max_angles
+
+        covered = np.zeros(self.flat_demand.shape[0], dtype=bool)
+        covered[cells[visible_beams]] = True
+        return covered, visible_beams
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.current_timestep = 0
+        self._load_positions()
+        return self._get_obs(), self._get_info()
+
+    @traced('env.step')
+    def step(self, action):
+        # --- Calculate Reward (deduplicated across all satellites) ---
+        covered, visible_beams = self.coverage(action)
+        total_reward = float(self.flat_demand[covered].sum())
+        num_covered = int(covered.sum())
+
+        # --- Move to the next state ---
+        self.current_timestep += 1
+        # The slot horizon running out is a time limit (truncated), not a terminal state
+        truncated = self.current_timestep >= (self.total_timesteps - 1)
+        self._load_positions()
+
+        info = self._get_info()
+        info['covered_cells'] = num_covered
+        info['overlapping_beams'] = int(visible_beams.sum()) - num_covered
+        return self._get_obs(), total_reward, False, truncated, info
+
+    def render(self):
+        print(f"Timestep {self.current_timestep}: {self.num_satellites} satellites, "
+              f"sub-satellite latitudes {self._positions[:, 1].min():.1f}..{self._positions[:, 1].max():.1f}")
+
+    def close(self):
+        self.reader.close()
@@ -0,0 +1,103 @@
+"""
+================================================================
+Array-Backed Constellation Index
+================================================================
+Every script used to build
+
+    sat_to_orbit_map = {f"satellite_{sat.id}": orbit.orbit_id ...}
+
+by walking shell.orbits, then do two string-keyed dict lookups per
+edge to derive is_inter_plane. ConstellationIndex holds the same
+facts as NumPy arrays indexed by satellite ID (slot 0 unused):
+
+- orbit_of[id]        orbit ID of the satellite
+- index_in_orbit[id]  0-based position of the satellite in its orbit
+- shell_of[id]        shell index
+- position_row[id]    row of the satellite in position/delay tables
+
+so features for all edges are one array comparison. Node names
+('satellite_<id>') are only converted at the API edge.
+"""
+import numpy as np
+
+UNUSED = -1
+
+
+def node_name(satellite_id):
+    return f"satellite_{satellite_id}"
+
+
+def node_id(name):
+    return int(name.rsplit('_', 1)[1])
+
+
+class ConstellationIndex:
+    def __init__(self, satellite_ids, orbit_ids, in_orbit_indices, shell_index=0, shell_name=None):
+        satellite_ids = np.asarray(satellite_ids, dtype=np.int64)
+        size = int(satellite_ids.max()) + 1
+        self.shell_index = shell_index
+        self.shell_name = shell_name
+        self.satellite_ids = np.sort(satellite_ids)
+
+        self.orbit_of = np.full(size, UNUSED, dtype=np.int32)
+        self.index_in_orbit = np.full(size, UNUSED, dtype=np.int32)
+        self.shell_of = np.full(size, UNUSED, dtype=np.int32)
+        self.position_row = np.full(size, UNUSED, dtype=np.int32)
+
+        self.orbit_of[satellite_ids] = orbit_ids
+        self.index_in_orbit[satellite_ids] = in_orbit_indices
+        self.shell_of[satellite_ids] = shell_index
+        # The H5 tables store satellite <id> at row id - 1.
+        self.position_row[satellite_ids] = satellite_ids - 1
+
+    @property
+    def num_satellites(self):
+        return len(self.satellite_ids)
+
+    # --- Constructors ---
+    @classmethod
+    def from_shell(cls, shell, shell_index=0):
+        """Builds the index from a StarPerf shell object (walks the orbits once)."""
+        satellite_ids, orbit_ids, in_orbit_indices = [], [], []
+        for orbit in shell.orbits:
+            for index, sat in enumerate(orbit.satellites):
+                satellite_ids.append(sat.id)
+                orbit_ids.append(orbit.orbit_id)
+                in_orbit_indices.append(index)
+        return cls(satellite_ids, orbit_ids, in_orbit_indices, shell_index, shell.shell_name)
+
+    @classmethod
+    def walker(cls, num_orbits, satellites_per_orbit, shell_index=0, shell_name='shell1'):
+        """
+        Index for the usual StarPerf numbering without a shell object:
+        satellite IDs run orbit by orbit, orbit IDs are 1-based.
+        """
+        satellite_ids = np.arange(1, num_orbits * satellites_per_orbit + 1)
+        orbit_ids = (satellite_ids - 1) // satellites_per_orbit + 1
+        in_orbit_indices = (satellite_ids - 1) % satellites_per_orbit
+        return cls(satellite_ids, orbit_ids, in_orbit_indices, shell_index, shell_name)
+
+    # --- Name / ID conversion (API edge only) ---
+    def node_names(self, satellite_ids):
+        return [node_name(i) for i in np.asarray(satellite_ids).tolist()]
+
+    def node_ids(self, names):
+        return np.array([node_id(name) for name in names], dtype=np.int64)
+
+    # --- Vectorized Features ---
+    def is_inter_plane(self, src_ids, dst_ids):
+        """1 where the two satellites of an edge are in different orbits, else 0."""
+        return (self.orbit_of[src_ids] != self.orbit_of[dst_ids]).astype(np.int8)
+
+    # --- Persistence (workers can load the index without the shell object) ---
+    def save(self, output_file):
+        ids = self.satellite_ids
+        np.savez(output_file, satellite_ids=ids, orbit_ids=self.orbit_of[ids],
+                 in_orbit_indices=self.index_in_orbit[ids], shell_index=self.shell_index,
+                 shell_name=str(self.shell_name))
+
+    @classmethod
+    def load(cls, input_file):
+        with np.load(input_file) as data:
+            return cls(data['satellite_ids'], data['orbit_ids'], data['in_orbit_indices'],
+                       int(data['shell_index']), str(data['shell_name']))
@@ -0,0 +1,277 @@
+"""
+================================================================
+Link Contact Plan and Event-Driven Topology Timeline
+================================================================
+Every consumer walks timeslots 1..T and rebuilds the network, even
+when nothing changed between two slots. build_contact_plan() scans
+the snapshot sequence ONCE and turns it into a contact plan:
+
+- links      every ISL (satellite a < satellite b) and, for the given
+             ground stations, every GSL (ground station, satellite)
+             that is ever up
+- intervals  the up intervals of every link (first and last slot),
+             each split into segments of at most SEGMENT_SLOTS slots
+             with a least-squares delay polynomial per segment
+             (delay_s = c0 + c1 x + c2 x^2, x in timeslots since the
+             segment start), fitted for all segments in one batch
+- events     the sorted up/down timeline (downs before ups at equal
+             times); an interval observed in slots first..last is up
+             over [first * dT, (last + 1) * dT)
+
+topologies() replays the timeline and yields the edge arrays when
+the topology changes, so routing and resilience studies can iterate
+over change events instead of slots. Delays are evaluated at the
+yielded times and held until the next one; as the link set can stay
+the same for a whole orbit (ISLs only), topologies() also yields a
+delay refresh every segment (SEGMENT_SLOTS * dT) by default. Pass
+refresh_s=0 for change times only, or call delay_at() for exact
+delays at any time. Ground station i is node
+num_satellites + 1 + i, as in gsl_visibility.with_ground_links().
+"""
+import argparse
+import time
+
+import numpy as np
+
+from gsl_visibility import DEFAULT_MIN_ELEVATION_DEG, ragged_range, visible_satellites
+
+ISL, GSL = 0, 1
+POLYNOMIAL_DEGREE = 2
+# Quadratic pieces of 5 slots (60 s slots) keep the fit residual of
+# +Grid ISLs at tens of microseconds; inter-plane delays change too
+# fast near the poles for much longer pieces
+SEGMENT_SLOTS = 5
+
+
+# --- 1. Intervals and Delay Polynomials ---
+def link_intervals(slot_keys, slot_delays, segment_slots=SEGMENT_SLOTS):
+    """
+    From per-slot link keys and delays: (unique keys, interval link index,
+    first slot, last slot, interval segment counts, segment coefficients,
+    segment max fit residual) with 1-based slots.
+    """
+    num_timeslots = len(slot_keys)
+    keys = np.unique(np.concatenate(slot_keys))
+    delays = np.full((len(keys), num_timeslots), np.nan)
+    for t, (slot_key, slot_delay) in enumerate(zip(slot_keys, slot_delays)):
+        delays[np.searchsorted(keys, slot_key), t] = slot_delay
+
+    # Up runs of every link from the edges of its presence row
+    present = np.zeros((len(keys), num_timeslots + 2), dtype=np.int8)
+    present[:, 1:-1] = ~np.isnan(delays)
+    link, start = np.nonzero(np.diff(present, axis=1) == 1)
+    _, stop = np.nonzero(np.diff(present, axis=1) == -1)
+
+    # Segments of at most segment_slots slots per interval
+    num_segments = -(-(stop - start) // segment_slots)
+    segment_interval, k = ragged_range(num_segments)
+    segment_start = start[segment_interval] + k * segment_slots
+    segment_stop = np.minimum(segment_start + segment_slots, stop[segment_interval])
+
+    # Batched least squares over all segments: sums of x^k and x^k * delay
+    owner, x = ragged_range(segment_stop - segment_start)
+    y = delays[link[segment_interval[owner]], segment_start[owner] + x]
+    powers = x[:, None] ** np.arange(2 * POLYNOMIAL_DEGREE + 1)
+    first = np.cumsum(segment_stop - segment_start) - (segment_stop - segment_start)
+    moments = np.add.reduceat(powers, first, axis=0)
+    targets = np.add.reduceat(powers[:, :POLYNOMIAL_DEGREE + 1] * y[:, None], first, axis=0)
+    exponents = np.arange(POLYNOMIAL_DEGREE + 1)
+    normal = moments[:, exponents[:, None] + exponents[None, :]]
+    coefficients = np.einsum('ijk,ik->ij', np.linalg.pinv(normal), targets)
+
+    fitted = np.einsum('ij,ij->i', coefficients[owner], powers[:, :POLYNOMIAL_DEGREE + 1])
+    residual = np.zeros(len(segment_start))
+    np.maximum.at(residual, owner, np.abs(fitted - y))
+    return keys, link, start + 1, stop, num_segments, coefficients, residual
+
+
+class ContactPlan:
+    """Links, up intervals with piecewise delay polynomials, and the sorted event timeline."""
+
+    def __init__(self, num_satellites, num_timeslots, time_step_s, link_kind, link_a, link_b,
+                 interval_link, first_slot, last_slot, num_segments, coefficients, residual,
+                 segment_slots=SEGMENT_SLOTS):
+        self.num_satellites = num_satellites
+        self.num_timeslots = num_timeslots
+        self.time_step_s = time_step_s
+        self.link_kind, self.link_a, self.link_b = link_kind, link_a, link_b
+        self.interval_link = interval_link
+        self.first_slot, self.last_slot = first_slot, last_slot
+        self.num_segments = num_segments
+        self.segment_offsets = np.cumsum(num_segments) - num_segments
+        self.coefficients = coefficients
+        self.residual = residual
+        self.segment_slots = segment_slots
+        self.start_s = first_slot * time_step_s
+        self.end_s = (last_slot + 1) * time_step_s
+
+        # Ups for every interval, downs only for intervals ending before the last slot
+        intervals = np.arange(len(interval_link))
+        ends = intervals[last_slot < num_timeslots]
+        event_time = np.concatenate([self.start_s, self.end_s[ends]])
+        event_up = np.concatenate([np.ones(len(intervals), bool), np.zeros(len(ends), bool)])
+        order = np.lexsort((event_up, event_time))
+        self.event_time = event_time[order]
+        self.event_interval = np.concatenate([intervals, ends])[order]
+        self.event_up = event_up[order]
+
+    @property
+    def num_links(self):
+        return len(self.link_kind)
+
+    @property
+    def change_times(self):
+        return np.unique(self.event_time)
+
+    def interval_residual(self):
+        """Max delay fit residual (s) of every interval over its segments."""
+        return np.maximum.reduceat(self.residual, self.segment_offsets) if len(self.residual) else self.residual
+
+    def delay_at(self, intervals, time_s):
+        """Polynomial delay (s) of intervals at time_s (both broadcast)."""
+        intervals = np.asarray(intervals)
+        x = (np.asarray(time_s) - self.start_s[intervals]) / self.time_step_s
+        piece = np.clip(x // self.segment_slots, 0, self.num_segments[intervals] - 1).astype(np.int64)
+        powers = (x - piece * self.segment_slots)[..., None] ** np.arange(POLYNOMIAL_DEGREE + 1)
+        return np.einsum('...j,...j->...', self.coefficients[self.segment_offsets[intervals] + piece], powers)
+
+    def timeline(self):
+        """Yields (time_s, up intervals, down intervals), one tuple per change time."""
+        boundaries = np.flatnonzero(np.r_[True, np.diff(self.event_time) > 0, True])
+        for first, last in zip(boundaries[:-1], boundaries[1:]):
+            up = self.event_up[first:last]
+            intervals = self.event_interval[first:last]
+            yield float(self.event_time[first]), intervals[up], intervals[~up]
+
+    def topologies(self, refresh_s=None):
+        """
+        Yields (time_s, src, dst, delays) at every change time and every
+        refresh_s seconds in between (default: one polynomial segment,
+        0: change times only): the links up from time_s until the next
+        yield, with their delays at time_s.
+        """
+        refresh_s = self.segment_slots * self.time_step_s if refresh_s is None else refresh_s
+        times = self.change_times
+        if refresh_s and len(times):
+            horizon_end_s = (self.num_timeslots + 1) * self.time_step_s
+            times = np.union1d(times, np.arange(times[0], horizon_end_s, refresh_s))
+
+        active = np.zeros(len(self.interval_link), dtype=bool)
+        changes = self.timeline()
+        change = next(changes, None)
+        for time_s in times.tolist():
+            while change is not None and change[0] <= time_s:
+                _, up, down = change
+                active[down] = False
+                active[up] = True
+                change = next(changes, None)
+            intervals = np.flatnonzero(active)
+            links = self.interval_link[intervals]
+            yield time_s, self.node_a(links), self.link_b[links], self.delay_at(intervals, time_s)
+
+    def node_a(self, links):
+        """Graph node of the first end of links: ground station i -> num_satellites + 1 + i."""
+        return np.where(self.link_kind[links] == GSL, self.num_satellites + 1 + self.link_a[links],
+                        self.link_a[links])
+
+    # --- Persistence ---
+    def save(self, output_file):
+        np.savez_compressed(output_file, num_satellites=self.num_satellites, num_timeslots=self.num_timeslots,
+                            time_step_s=self.time_step_s, link_kind=self.link_kind, link_a=self.link_a,
+                            link_b=self.link_b, interval_link=self.interval_link, first_slot=self.first_slot,
+                            last_slot=self.last_slot, num_segments=self.num_segments,
+                            coefficients=self.coefficients, residual=self.residual,
+                            segment_slots=self.segment_slots)
+        return output_file
+
+    @classmethod
+    def load(cls, input_file):
+        with np.load(input_file) as data:
+            return cls(int(data['num_satellites']), int(data['num_timeslots']), float(data['time_step_s']),
+                       *(data[name] for name in ('link_kind', 'link_a', 'link_b', 'interval_link', 'first_slot',
+                                                 'last_slot', 'num_segments', 'coefficients', 'residual')),
+                       int(data['segment_slots']))
+
+
+# --- 2. Building the Plan ---
+def build_contact_plan(reader, time_step_s=60, ground_stations=None, min_elevation_deg=DEFAULT_MIN_ELEVATION_DEG,
+                       segment_slots=SEGMENT_SLOTS):
+    """
+    One pass over all timeslots of a SnapshotReader. 'ground_stations' is
+    an optional (G, 2) array of (lon, lat) for GSL contacts.
+    """
+    key_base = np.int64(reader.num_satellites + 1)
+    isl_keys, isl_delays, gsl_keys, gsl_delays = [], [], [], []
+    for t in range(1, reader.num_timeslots + 1):
+        src, dst, delays = reader.edges(t)
+        isl_keys.append(np.asarray(src, dtype=np.int64) * key_base + dst)
+        isl_delays.append(np.asarray(delays))
+        if ground_stations is not None:
+            links = visible_satellites(reader.positions(t), ground_stations[:, 0], ground_stations[:, 1],
+                                       min_elevation_deg)
+            gsl_keys.append(links.users.astype(np.int64) * key_base + links.satellites)
+            gsl_delays.append(links.delay)
+
+    parts = [(ISL, link_intervals(isl_keys, isl_delays, segment_slots))]
+    if ground_stations is not None:
+        parts.append((GSL, link_intervals(gsl_keys, gsl_delays, segment_slots)))
+
+    link_kind, link_a, link_b, interval_parts = [], [], [], []
+    num_links = 0
+    for kind, (keys, link, first_slot, last_slot, num_segments, coefficients, residual) in parts:
+        link_kind.append(np.full(len(keys), kind, dtype=np.int8))
+        link_a.append(keys // key_base)
+        link_b.append(keys % key_base)
+        interval_parts.append((link + num_links, first_slot, last_slot, num_segments, coefficients, residual))
+        num_links += len(keys)
+
+    return ContactPlan(reader.num_satellites, reader.num_timeslots, time_step_s,
+                       np.concatenate(link_kind), np.concatenate(link_a), np.concatenate(link_b),
+                       *(np.concatenate(arrays) for arrays in zip(*interval_parts)), segment_slots)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Contact plan and topology-change timeline.")
+    parser.add_argument('--constellation', default='Telesat')
+    parser.add_argument('--shell', default='shell1')
+    parser.add_argument('--time-step', type=int, default=60, help="dT of the pre-computation in seconds")
+    parser.add_argument('--ground-stations', type=int, default=100, help="random ground stations (0: ISLs only)")
+    parser.add_argument('--min-elevation', type=float, default=DEFAULT_MIN_ELEVATION_DEG, help="degrees")
+    parser.add_argument('--output', default=None, help="save the plan as .npz")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from snapshot_reader import SnapshotReader, h5_path_for
+
+    args = parse_args()
+    stations = None
+    if args.ground_stations:
+        rng = np.random.default_rng(0)
+        stations = np.stack([rng.uniform(-180, 180, args.ground_stations),
+                             np.degrees(np.arcsin(rng.uniform(-1, 1, args.ground_stations)))], axis=1)
+
+    start_time = time.time()
+    with SnapshotReader(h5_path_for(args.constellation), args.shell) as reader:
+        plan = build_contact_plan(reader, args.time_step, stations, args.min_elevation)
+    build_s = time.time() - start_time
+
+    print("\n======================================================================")
+    print(f"  Contact plan of {args.constellation}/{args.shell} ({build_s:.2f} s)")
+    print("======================================================================")
+    residual = plan.interval_residual()
+    for kind, label in ((ISL, 'ISL'), (GSL, 'GSL')):
+        links = plan.link_kind == kind
+        intervals = links[plan.interval_link]
+        if links.any():
+            print(f"  {label}: {links.sum():>7} links, {intervals.sum():>7} up intervals, "
+                  f"max delay fit residual {residual[intervals].max() * 1e6:.3f} us")
+    print(f"  {plan.num_timeslots} timeslots -> {len(plan.change_times)} topology changes "
+          f"({len(plan.event_time)} up/down events)")
+
+    start_time = time.time()
+    snapshots = sum(1 for _ in plan.topologies())
+    print(f"  Replayed {snapshots} topologies (changes + delay refresh every {plan.segment_slots} slots) "
+          f"in {time.time() - start_time:.3f} s")
+    if args.output:
+        print(f"  Saved to {plan.save(args.output)}")
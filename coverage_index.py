@@ -0,0 +1,102 @@
+"""
+================================================================
+Precomputed Coverage Footprint Index for Beam Rewards
+================================================================
+SatelliteEnv rewards a beam with the demand of exactly one 10 degree
+cell. CoverageIndex keeps the same action grid (beam centres on the
+18x36 cells) but scores each beam on a fine demand raster, e.g.
+0.25 degree, with a circular footprint derived from the satellite
+altitude and the beamwidth.
+
+The cell-to-footprint index is a sparse CSR matrix (beam cell x fine
+raster cell), built once. A footprint only depends on the latitude
+of its centre, so one template per latitude band is computed and
+shifted in longitude for every column. The demand under every
+footprint (index @ demand) is precomputed too, so the reward of a
+beam set is a sum over its beams; only beams close enough to overlap
+fall back to the deduplicated union of their sparse rows.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from earth_geometry import central_angle_rad, footprint_central_angle_rad, grid_cell_centers
+
+
+def upsample_demand_map(demand_map, resolution_deg):
+    """
+    Spreads a coarse demand map over a fine raster of 'resolution_deg'
+    cells. Each coarse value is split evenly, so the total demand is kept.
+    Coarse cells must be a whole number of fine cells in both directions.
+    """
+    rows, cols = demand_map.shape
+    factors = np.array([180.0 / rows, 360.0 / cols]) / resolution_deg
+    row_factor, col_factor = np.round(factors).astype(int)
+    if np.any(np.abs(factors - np.round(factors)) > 1e-9) or min(row_factor, col_factor) < 1:
+        raise ValueError(f"A {rows}x{cols} demand map ({180.0 / rows:g} x {360.0 / cols:g} deg cells) "
+                         f"does not split into {resolution_deg:g} deg cells.")
+    return np.kron(demand_map, np.ones((row_factor, col_factor))) / (row_factor * col_factor)
+
+
+class CoverageIndex:
+    """Sparse beam-cell -> fine-raster-cell footprint index with fast rewards."""
+
+    def __init__(self, demand_raster, altitude_km=1015.0, beamwidth_deg=10.0, beam_rows=18, beam_cols=36):
+        # --- 1. Raster and Beam Grid Geometry ---
+        self.raster_rows, self.raster_cols = demand_raster.shape
+        if self.raster_rows % beam_rows or self.raster_cols % beam_cols:
+            raise ValueError("The demand raster resolution must evenly divide the beam grid cells.")
+        self.resolution_deg = 180.0 / self.raster_rows
+        self.beam_rows, self.beam_cols = beam_rows, beam_cols
+        self.flat_demand = np.ascontiguousarray(demand_raster, dtype=np.float64).ravel()
+        self.footprint_radius = float(footprint_central_angle_rad(altitude_km, beamwidth_deg))
+        self.beam_lat, self.beam_lon = grid_cell_centers(beam_rows, beam_cols)
+
+        # --- 2. Sparse Footprint Index and Per-Footprint Demand ---
+        self.index = self._build_index()
+        self.footprint_demand = self.index @ self.flat_demand
+
+        # --- 3. Beam Pairs Whose Footprints Can Overlap ---
+        separation = central_angle_rad(self.beam_lat[:, None], self.beam_lon[:, None],
+                                       self.beam_lat[None, :], self.beam_lon[None, :])
+        self.may_overlap = separation <= 2 * self.footprint_radius
+
+    def _band_template(self, beam_row):
+        """Fine cell (rows, cols) inside the footprint of the beam cell (beam_row, 0)."""
+        center_lat, center_lon = self.beam_lat[beam_row * self.beam_cols], self.beam_lon[0]
+        raster_lat, raster_lon = grid_cell_centers(self.raster_rows, self.raster_cols)
+        raster_lat = raster_lat.reshape(self.raster_rows, self.raster_cols)[:, 0]
+        raster_lon = raster_lon[:self.raster_cols]
+
+        radius_deg = np.degrees(self.footprint_radius)
+        band_rows = np.flatnonzero(np.abs(raster_lat - center_lat) <= radius_deg + self.resolution_deg)
+        angles = central_angle_rad(raster_lat[band_rows, None], raster_lon[None, :], center_lat, center_lon)
+        inside_rows, inside_cols = np.nonzero(angles <= self.footprint_radius)
+        return band_rows[inside_rows], inside_cols
+
+    def _build_index(self):
+        columns_per_beam = self.raster_cols // self.beam_cols
+        indptr, indices = [0], []
+        for beam_row in range(self.beam_rows):
+            rows, cols = self._band_template(beam_row)
+            for beam_col in range(self.beam_cols):
+                shifted_cols = (cols + beam_col * columns_per_beam) % self.raster_cols
+                footprint = np.sort(rows * self.raster_cols + shifted_cols)
+                indices.append(footprint)
+                indptr.append(indptr[-1] + len(footprint))
+        indices = np.concatenate(indices).astype(np.int32)
+        data = np.ones(len(indices), dtype=np.float64)
+        shape = (self.beam_rows * self.beam_cols, self.raster_rows * self.raster_cols)
+        return csr_matrix((data, indices, np.asarray(indptr)), shape=shape)
+
+    def covered_cells(self, beam_cells):
+        """Sorted fine raster cells covered by at least one of the beams."""
+        indptr, indices = self.index.indptr, self.index.indices
+        return np.unique(np.concatenate([indices[indptr[c]:indptr[c + 1]] for c in beam_cells]))
+
+    def reward(self, action):
+        """Total demand covered by a set of beam cells, each fine cell counted once."""
+        beam_cells = np.unique(action)
+        # The diagonal is always True; anything beyond it is an overlapping pair.
+        if self.may_overlap[beam_cells[:, None], beam_cells].sum() > len(beam_cells):
+            return float(self.flat_demand[self.covered_cells(beam_cells)].sum())
+        return float(self.footprint_demand[beam_cells].sum())
@@ -4,7 +4,9 @@ Data Generation Script for Predictive Routing AI Model
 ================================================================
 This script simulates a satellite constellation over a long period,
 builds the network graph at each time step, and extracts link
-features to create a training dataset.
+features to create a training dataset. The timeslot loop runs as a
+prefetch pipeline (prefetch_pipeline.py): the next slots are read and
+their features computed while the current one is written out.
 
 Output: isl_link_data.csv
 """
@@ -14,29 +16,10 @@ import os
 
 # --- Core Imports ---
 import src.constellation_generation.by_XML.constellation_configuration as constellation_configuration
-import h5py
-import numpy as np
-from math import radians, cos, sin, asin, sqrt
-
-# --- Utility Function to Build Graph (from our previous work) ---
-def build_graph_at_time_t(constellation_name, shell, time_slot):
-    file_path = f"data/XML_constellation/{constellation_name}.h5"
-    try:
-        with h5py.File(file_path, 'r') as file:
-            delay_group = file['delay']
-            current_shell_group = delay_group[shell.shell_name]
-            delay_matrix = np.array(current_shell_group[f'timeslot{time_slot}']).tolist()
-    except KeyError:
-        print(f"ERROR: 'delay' data not found for timeslot {time_slot}. The pre-computation might not have run for this long.")
-        return None
-
-    G = nx.Graph()
-    num_sats_plus_one = len(delay_matrix)
-    for i in range(1, num_sats_plus_one):
-        for j in range(i + 1, num_sats_plus_one):
-            if delay_matrix[i][j] > 0:
-                G.add_edge(f"satellite_{i}", f"satellite_{j}", weight=delay_matrix[i][j])
-    return G
+
+from constellation_index import ConstellationIndex
+from prefetch_pipeline import run_pipeline
+from snapshot_reader import SnapshotReader, h5_path_for
 
 # --- Main Data Generation Logic ---
 
@@ -73,57 +56,55 @@ def generate_data():
         'actual_delay' # Label: The real delay of the link
     ]
 
-    # Create a lookup map for satellite -> orbit_id for quick access
-    sat_to_orbit_map = {}
-    for orbit in shell.orbits:
-        for sat in orbit.satellites:
-            sat_to_orbit_map[f"satellite_{sat.id}"] = orbit.orbit_id
+    # Array lookup of satellite ID -> orbit ID for all edges at once
+    index = ConstellationIndex.from_shell(shell)
 
     # --- 4. Main Simulation Loop ---
     start_time = time.time()
     print(f"\nStarting data generation for {total_timeslots} timeslots. This will take a while...")
 
+    reader = SnapshotReader(h5_path_for(constellation_name), shell.shell_name)
+    # Stop if data for later timeslots doesn't exist
+    last_slot = min(total_timeslots, reader.num_timeslots)
+
     with open(output_csv_file, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(csv_header)
 
-        for t in range(1, total_timeslots + 1):
-            # Build the graph for the current time slot
-            G = build_graph_at_time_t(constellation_name, shell, t)
-            
-            if G is None:
-                # Stop if data for this timeslot doesn't exist
-                break
-
-            # Iterate over every link (edge) in the graph
-            for u, v, data in G.edges(data=True):
-                # Extract the satellite IDs from the node names
-                u_id = u
-                v_id = v
-                
-                # --- Feature Engineering ---
-                # 1. is_inter_plane
-                # A crucial feature. Links between planes are generally less stable.
-                is_inter_plane = 1 if sat_to_orbit_map.get(u_id) != sat_to_orbit_map.get(v_id) else 0
-
-                # --- Label ---
-                actual_delay = data['weight']
-
-                # Write the row to the CSV file
-                writer.writerow([t, u_id, v_id, is_inter_plane, actual_delay])
+        # Stage 2: one row per link (edge) of the slot
+        def build_rows(t, edges):
+            src, dst, delays = edges
+            # --- Feature Engineering ---
+            # 1. is_inter_plane
+            # A crucial feature. Links between planes are generally less stable.
+            is_inter_plane = index.is_inter_plane(src, dst)
+            # --- Label ---: the real delay of the link
+            return zip([t] * len(src), index.node_names(src), index.node_names(dst),
+                       is_inter_plane.tolist(), delays.tolist())
+
+        # Stage 3 of the pipeline: runs here while later slots are read and built
+        def write_slot(t, rows):
+            # Write the rows to the CSV file
+            writer.writerows(rows)
             
             if t % 10 == 0:
                 print(f"  Processed timeslot {t}/{total_timeslots}...")
 
+        stats = run_pipeline(range(1, last_slot + 1),
+                             read=reader.edges,
+                             build=build_rows,
+                             consume=write_slot,
+                             skip=(KeyError,))  # timeslot missing from the H5 file
+    reader.close()
+
     end_time = time.time()
     print("\n----------------------------------------------------")
     print(f"Data generation complete!")
     print(f"Data saved to: {output_csv_file}")
     print(f"Total time taken: {end_time - start_time:.2f} seconds.")
+    print(stats.summary())
     print("----------------------------------------------------")
 
 if __name__ == "__main__":
-    # We need to import networkx for the build_graph function
-    import networkx as nx
     generate_data()
 
@@ -0,0 +1,145 @@
+"""
+================================================================
+Sparse (COO) Delay Storage for Constellation H5 Files
+================================================================
+The pre-computation stores a dense (N+1)x(N+1) delay matrix per
+timeslot, although in +Grid every satellite has only ~4 ISLs (over
+99% zeros for Telesat, tens of GB for a Starlink shell and a full
+orbit). This module adds an alternative layout next to it:
+
+    delay_coo/<shell>/src           int32   all slots, concatenated
+    delay_coo/<shell>/dst           int32
+    delay_coo/<shell>/delay         float64
+    delay_coo/<shell>/slot_offsets  int64   (T+1,), slot t is
+                                            [offsets[t-1], offsets[t])
+
+Edges are stored once per link (src < dst, 1-based IDs). The edge
+datasets are extendable, chunked and gzip-compressed. SnapshotReader
+reads either layout behind the same edges()/delay_matrix()/graph() API.
+"""
+import contextlib
+import time
+
+import h5py
+import numpy as np
+
+COO_GROUP = 'delay_coo'
+EDGE_CHUNK = 65536
+
+
+class SparseDelayWriter:
+    """
+    Appends one timeslot of COO edges at a time to an open H5 file. As a
+    context manager it calls close() on success and abort() on an error.
+    """
+
+    def __init__(self, h5_file, shell_name, num_satellites, compression='gzip', compression_opts=4):
+        group = h5_file.require_group(COO_GROUP)
+        if shell_name in group:
+            del group[shell_name]
+        self.shell_name = shell_name
+        self.group = group.create_group(shell_name)
+        self.group.attrs['num_satellites'] = num_satellites
+
+        dataset_options = dict(shape=(0,), maxshape=(None,), chunks=(EDGE_CHUNK,),
+                               compression=compression, compression_opts=compression_opts, shuffle=True)
+        self.src = self.group.create_dataset('src', dtype=np.int32, **dataset_options)
+        self.dst = self.group.create_dataset('dst', dtype=np.int32, **dataset_options)
+        self.delay = self.group.create_dataset('delay', dtype=np.float64, **dataset_options)
+        self.slot_offsets = [0]
+
+    def append_slot(self, src, dst, delay):
+        start, end = self.slot_offsets[-1], self.slot_offsets[-1] + len(src)
+        for dataset, values in ((self.src, src), (self.dst, dst), (self.delay, delay)):
+            dataset.resize((end,))
+            dataset[start:end] = values
+        self.slot_offsets.append(end)
+
+    def close(self):
+        """Writes the slot offset index; call once after the last slot."""
+        if 'slot_offsets' in self.group:
+            del self.group['slot_offsets']
+        self.group.create_dataset('slot_offsets', data=np.asarray(self.slot_offsets, dtype=np.int64))
+        self.group.attrs['num_timeslots'] = len(self.slot_offsets) - 1
+
+    def abort(self):
+        """Deletes the partially written group, so no reader sees a truncated layout."""
+        parent = self.group.parent
+        if self.shell_name in parent:
+            del parent[self.shell_name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def read_coo_slot(group, slot_offsets, time_slot):
+    """Returns (src, dst, delay) of one timeslot (1-based) from a COO group."""
+    start, end = slot_offsets[time_slot - 1], slot_offsets[time_slot]
+    return group['src'][start:end], group['dst'][start:end], group['delay'][start:end]
+
+
+def coo_to_dense(num_satellites, src, dst, delay):
+    """Rebuilds the symmetric (N+1)x(N+1) matrix of the dense layout."""
+    delay_matrix = np.zeros((num_satellites + 1, num_satellites + 1))
+    delay_matrix[src, dst] = delay
+    delay_matrix[dst, src] = delay
+    return delay_matrix
+
+
+def dense_to_coo(delay_matrix):
+    """Returns (src, dst, delay) of the links (src < dst) in a dense delay matrix."""
+    upper = np.triu(delay_matrix[1:, 1:], k=1)
+    src, dst = np.nonzero(upper > 0)
+    return (src + 1).astype(np.int32), (dst + 1).astype(np.int32), upper[src, dst]
+
+
+def convert_dense_to_coo(h5_file_path, shell_name, output_path=None, drop_dense=False):
+    """
+    Converts the dense 'delay/<shell>' group to the COO layout, in place or
+    into 'output_path' (which also receives a copy of the position group).
+    With 'drop_dense' an in-place conversion deletes the dense group
+    afterwards (run h5repack to reclaim the space). Returns the edge count.
+    If the conversion fails, the partial 'delay_coo/<shell>' group is
+    deleted and both files are closed.
+    """
+    in_place = output_path is None or output_path == h5_file_path
+    with h5py.File(h5_file_path, 'a' if in_place else 'r') as source, \
+            (contextlib.nullcontext(source) if in_place else h5py.File(output_path, 'a')) as output:
+        dense_group = source['delay'][shell_name]
+        num_timeslots = len(dense_group.keys())
+        num_satellites = dense_group['timeslot1'].shape[0] - 1
+
+        with SparseDelayWriter(output, shell_name, num_satellites) as writer:
+            for t in range(1, num_timeslots + 1):
+                writer.append_slot(*dense_to_coo(dense_group[f'timeslot{t}'][()]))
+
+        if not in_place and shell_name in source.get('position', {}):
+            position_group = output.require_group('position')
+            if shell_name not in position_group:
+                source.copy(source['position'][shell_name], position_group, name=shell_name)
+        if in_place and drop_dense:
+            del source['delay'][shell_name]
+    return writer.slot_offsets[-1]
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    # Usage: python delay_store.py <h5 file> <shell name> [output h5]
+    h5_file_path, shell_name = sys.argv[1], sys.argv[2]
+    output_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    start_time = time.time()
+    num_edges = convert_dense_to_coo(h5_file_path, shell_name, output_path)
+    print(f"Converted {num_edges} edges to the COO layout in {time.time() - start_time:.2f} seconds.")
+    if output_path:
+        print(f"  Dense file: {os.path.getsize(h5_file_path) / 1e6:.1f} MB, "
+              f"COO file: {os.path.getsize(output_path) / 1e6:.1f} MB")
@@ -0,0 +1,78 @@
+"""
+================================================================
+Earth Geometry Helpers (vectorized)
+================================================================
+Small NumPy helpers shared by the environments and access logic:
+great-circle angles between lat/lon points, the centres of the
+lat/lon demand grid, and the Earth central angle a satellite at a
+given altitude can see above a minimum elevation angle.
+
+All angles taken and returned by the public helpers are in degrees
+unless the name says otherwise; distances are in km.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+SPEED_OF_LIGHT_KM_S = 299792.458
+
+
+def central_angle_rad(lat1, lon1, lat2, lon2):
+    """
+    Haversine great-circle angle (radians) between points given in
+    degrees. Inputs broadcast against each other like any ufunc.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def ground_distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points given in degrees."""
+    return central_angle_rad(lat1, lon1, lat2, lon2) * EARTH_RADIUS_KM
+
+
+def grid_cell_centers(rows, cols):
+    """
+    Returns (lat, lon) arrays of length rows*cols with the centre of every
+    cell of a lat/lon grid, in the same flat order as demand_map.ravel():
+    row 0 is the southernmost band, column 0 starts at -180 degrees.
+    """
+    lat_step, lon_step = 180.0 / rows, 360.0 / cols
+    lat = -90.0 + lat_step * (np.arange(rows) + 0.5)
+    lon = -180.0 + lon_step * (np.arange(cols) + 0.5)
+    lat_grid, lon_grid = np.meshgrid(lat, lon, indexing='ij')
+    return lat_grid.ravel(), lon_grid.ravel()
+
+
+def visibility_central_angle_rad(altitude_km, min_elevation_deg):
+    """
+    Earth central angle (radians) between a satellite's sub-satellite point
+    and the edge of the area that sees it above 'min_elevation_deg'.
+    """
+    elevation = np.radians(min_elevation_deg)
+    ratio = EARTH_RADIUS_KM / (EARTH_RADIUS_KM + np.asarray(altitude_km, dtype=np.float64))
+    return np.arccos(ratio * np.cos(elevation)) - elevation
+
+
+def footprint_central_angle_rad(altitude_km, beamwidth_deg):
+    """
+    Earth central angle (radians) of the footprint radius of a circular beam
+    with full 'beamwidth_deg' pointed at nadir from 'altitude_km'. A beam
+    wider than the Earth disc is clipped at the horizon.
+    """
+    half_angle = np.radians(beamwidth_deg / 2.0)
+    cos_elevation = (EARTH_RADIUS_KM + altitude_km) / EARTH_RADIUS_KM * np.sin(half_angle)
+    elevation = np.arccos(np.clip(cos_elevation, 0.0, 1.0))
+    return np.pi / 2 - half_angle - elevation
+
+
+def lon_lat_alt_to_cartesian(lon, lat, alt_km=0.0):
+    """
+    Earth-fixed Cartesian coordinates (km, spherical Earth) of points
+    given as longitude/latitude in degrees and altitude in km; returns
+    an array with a trailing axis of size 3.
+    """
+    lon, lat = np.radians(lon), np.radians(lat)
+    radius = EARTH_RADIUS_KM + np.asarray(alt_km, dtype=np.float64)
+    return np.stack(np.broadcast_arrays(radius * np.cos(lat) * np.cos(lon), radius * np.cos(lat) * np.sin(lon),
+                                        radius * np.sin(lat)), axis=-1)
@@ -5,10 +5,19 @@ DRL Agent Evaluation Script
 This script loads a pre-trained DRL agent and evaluates its
 performance over a full episode. It also compares the DRL agent's
 performance against two baseline strategies: Random and Greedy.
+
+With --episodes M, every policy is evaluated over M seeded episodes
+(each starting at a seeded point of the orbit) spread across a worker
+pool. PPO acts on batched observations of a BatchedSatelliteEnv, and
+the static Greedy baseline is computed in closed form. The report
+shows mean reward, a 95% confidence interval and episodes/s.
 """
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-from stable_baselines3 import PPO
-from satellite_env import SatelliteEnv
+from satellite_env import SatelliteEnv, build_demand_map, load_trajectory
 
 def evaluate_agent(agent, env):
     """Runs one full episode with a given agent and returns the total reward."""
@@ -21,7 +30,8 @@ def evaluate_agent(agent, env):
         # For other policies, this will be handled by a wrapper.
         action, _states = agent.predict(obs, deterministic=True)
         
-        obs, reward, done, truncated, info = env.step(action)
+        obs, reward, terminated, truncated, info = env.step(action)
+        done = terminated or truncated
         total_reward += reward
     
     return total_reward
@@ -36,7 +46,8 @@ def run_random_policy(env):
         # Take a completely random action from the action space
         action = env.action_space.sample()
         
-        obs, reward, done, truncated, info = env.step(action)
+        obs, reward, terminated, truncated, info = env.step(action)
+        done = terminated or truncated
         total_reward += reward
         
     return total_reward
@@ -60,12 +71,15 @@ def run_greedy_policy(env):
     greedy_action = best_cell_indices
     
     while not done:
-        obs, reward, done, truncated, info = env.step(greedy_action)
+        obs, reward, terminated, truncated, info = env.step(greedy_action)
+        done = terminated or truncated
         total_reward += reward
         
     return total_reward
 
 def main_evaluation():
+    from stable_baselines3 import PPO
+
     model_file = "drl_beam_steering_agent.zip"
     
     print("--- Initializing the Satellite Environment for Evaluation ---")
@@ -100,5 +114,119 @@ def main_evaluation():
     print(f"  DRL Agent (Our Trained Model): {drl_total_reward:>10.2f}")
     print("======================================================================")
 
+# --- Parallel Multi-Episode Evaluation ---
+def episode_start_timesteps(seeds, total_timesteps):
+    """Each seed picks the orbit position its episode starts from."""
+    return np.array([np.random.default_rng(seed).integers(0, total_timesteps - 1) for seed in seeds])
+
+def greedy_episode_rewards(seeds, trajectory_file, num_beams=4):
+    """
+    Closed form of run_greedy_policy: the greedy action never changes, so an
+    episode starting at timestep s earns the same reward on each of its
+    (T - 1 - s) steps.
+    """
+    from batched_satellite_env import batched_beam_rewards
+
+    flat_demand = build_demand_map().ravel()
+    greedy_action = np.argsort(flat_demand)[-num_beams:]
+    step_reward = batched_beam_rewards(greedy_action[None, :], flat_demand)[0]
+    total_timesteps = len(load_trajectory(trajectory_file))
+    starts = episode_start_timesteps(seeds, total_timesteps)
+    return step_reward * (total_timesteps - 1 - starts), int((total_timesteps - 1 - starts).sum())
+
+def _evaluate_episode_chunk(policy_name, seeds, model_file, trajectory_file):
+    """
+    Worker: runs one episode per seed, all of them batched in a single
+    BatchedSatelliteEnv. Returns (episode_rewards, env_steps).
+    """
+    import torch
+    from stable_baselines3 import PPO
+    from batched_satellite_env import BatchedSatelliteEnv
+
+    torch.set_num_threads(1)
+    env = BatchedSatelliteEnv(len(seeds), trajectory_file)
+    env.timesteps = episode_start_timesteps(seeds, env.total_timesteps)
+    obs = env._get_obs()
+
+    model = PPO.load(model_file) if policy_name == 'ppo' else None
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    num_cells = env.GRID_ROWS * env.GRID_COLS
+
+    rewards = np.zeros(len(seeds))
+    active = np.ones(len(seeds), dtype=bool)
+    env_steps = 0
+    while active.any():
+        if model is not None:
+            actions, _ = model.predict(obs, deterministic=True)
+        else:
+            actions = np.stack([rng.integers(0, num_cells, env.NUM_BEAMS) for rng in rngs])
+        obs, step_rewards, dones, _ = env.step_batch(actions)
+        rewards[active] += step_rewards[active]
+        env_steps += int(active.sum())
+        active &= ~dones
+    return rewards, env_steps
+
+def summarize_rewards(rewards, confidence=0.95):
+    """Returns (mean, half-width of the confidence interval)."""
+    from scipy import stats
+
+    rewards = np.asarray(rewards, dtype=np.float64)
+    if len(rewards) < 2:
+        return rewards.mean(), 0.0
+    sem = rewards.std(ddof=1) / np.sqrt(len(rewards))
+    return rewards.mean(), stats.t.ppf((1 + confidence) / 2, len(rewards) - 1) * sem
+
+def parallel_evaluation(num_episodes, num_workers, model_file="drl_beam_steering_agent.zip",
+                        trajectory_file='satellite_1_trajectory.npz', base_seed=0):
+    seeds = list(range(base_seed, base_seed + num_episodes))
+    chunks = [chunk.tolist() for chunk in np.array_split(seeds, num_workers) if len(chunk)]
+    results = {}
+
+    print(f"--- Evaluating {num_episodes} seeded episodes per policy on {num_workers} workers ---")
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        for policy_name in ['ppo', 'random']:
+            start_time = time.perf_counter()
+            try:
+                outputs = list(executor.map(_evaluate_episode_chunk, [policy_name] * len(chunks), chunks,
+                                            [model_file] * len(chunks), [trajectory_file] * len(chunks)))
+            except FileNotFoundError:
+                print(f"  ERROR: Model file not found. Skipping {policy_name} evaluation.")
+                continue
+            elapsed = time.perf_counter() - start_time
+            rewards = np.concatenate([chunk_rewards for chunk_rewards, _ in outputs])
+            env_steps = sum(steps for _, steps in outputs)
+            results[policy_name] = (rewards, env_steps, elapsed)
+
+    start_time = time.perf_counter()
+    greedy_rewards, greedy_steps = greedy_episode_rewards(seeds, trajectory_file)
+    results['greedy'] = (greedy_rewards, greedy_steps, time.perf_counter() - start_time)
+
+    labels = {'random': "Random Policy (Baseline):", 'greedy': "Greedy Policy (Near-Optimal):",
+              'ppo': "DRL Agent (Our Trained Model):"}
+    print("\n======================================================================")
+    print(f"           Policy Performance Comparison ({num_episodes} episodes, 95% CI)")
+    print("======================================================================")
+    for policy_name in ['random', 'greedy', 'ppo']:
+        if policy_name not in results:
+            continue
+        rewards, env_steps, elapsed = results[policy_name]
+        mean, half_width = summarize_rewards(rewards)
+        print(f"  {labels[policy_name]:<31}{mean:>10.2f} +/- {half_width:<8.2f}"
+              f"({len(rewards) / elapsed:,.0f} episodes/s, {env_steps / elapsed:,.0f} steps/s)")
+    print("======================================================================")
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate the beam steering policies.")
+    parser.add_argument('--episodes', type=int, default=0,
+                        help="seeded episodes per policy (0 runs the single-episode comparison)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main_evaluation()
+    args = parse_args()
+    if args.episodes > 0:
+        parallel_evaluation(args.episodes, args.workers, base_seed=args.seed)
+    else:
+        main_evaluation()
@@ -0,0 +1,342 @@
+"""
+================================================================
+Stage-Graph Experiment Runner with Cached Stage Outputs
+================================================================
+Our experiment pipeline is a set of loose scripts that each redo the
+StarPerf pre-computation, and StarPerf.py runs its test cases one
+after another. This runner declares every step as a Stage:
+
+    Stage(name, 'module:function', kwargs, inputs=[files], outputs=[files])
+
+- Dependencies follow from the files: a stage that reads a file
+  another stage writes runs after it ('after' adds explicit order).
+- Before a stage runs, its function, kwargs and the CONTENT of its
+  input files are hashed. If the manifest (.experiment_cache/
+  manifest.json) holds the same hash and all outputs exist, the stage
+  is skipped. A stage that finishes without writing all its outputs
+  counts as failed. Stages without outputs always run; this includes
+  every StarPerf test case (the 'starperf' pipeline only gains the
+  concurrency and the per-case logs, not caching).
+- Stages whose dependencies are done run concurrently in a process
+  pool; each one's stdout goes to .experiment_cache/<stage>.log.
+- A per-stage timing summary is printed at the end.
+
+Usage:
+    python experiment_runner.py [--pipeline research|starperf] [--workers N]
+                                [--force] [--dry-run] [--stages a b ...]
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+CACHE_DIR = '.experiment_cache'
+HASH_BLOCK = 1 << 20
+
+
+class Stage:
+    def __init__(self, name, target, kwargs=None, inputs=(), outputs=(), after=()):
+        self.name = name
+        self.target = target
+        self.kwargs = kwargs or {}
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+
+
+# --- 1. Input Hashing and Manifest ---
+def load_manifest(cache_dir=CACHE_DIR):
+    manifest_file = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(manifest_file):
+        return {'stages': {}, 'files': {}}
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_file = os.path.join(cache_dir, 'manifest.json')
+    with open(manifest_file + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+
+def file_digest(path, manifest):
+    """
+    SHA-256 of a file's content. Digests are remembered per (size,
+    mtime) in the manifest, so an unchanged multi-GB H5 file is hashed
+    only once.
+    """
+    if not os.path.exists(path):
+        return 'missing'
+    stat = os.stat(path)
+    known = manifest['files'].get(path)
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        return known['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    manifest['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+
+def stage_hash(stage, manifest):
+    payload = {
+        'target': stage.target,
+        'kwargs': stage.kwargs,
+        'inputs': {path: file_digest(path, manifest) for path in stage.inputs},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def is_cached(stage, input_hash, manifest):
+    entry = manifest['stages'].get(stage.name)
+    return (bool(stage.outputs) and entry is not None and entry['hash'] == input_hash
+            and all(os.path.exists(path) for path in stage.outputs))
+
+
+# --- 2. Stage Graph ---
+def stage_dependencies(stages):
+    """Returns {stage name: set of upstream stage names}."""
+    producer = {path: stage.name for stage in stages for path in stage.outputs}
+    names = {stage.name for stage in stages}
+    dependencies = {}
+    for stage in stages:
+        upstream = {producer[path] for path in stage.inputs if path in producer}
+        upstream |= {name for name in stage.after if name in names}
+        upstream.discard(stage.name)
+        dependencies[stage.name] = upstream
+    return dependencies
+
+
+def _run_stage(target, kwargs, log_file):
+    """Worker entry point: imports the stage function lazily and runs it."""
+    module_name, function_name = target.split(':')
+    start_time = time.time()
+    with open(log_file, 'w') as log, contextlib.redirect_stdout(log):
+        function = getattr(importlib.import_module(module_name), function_name)
+        function(**kwargs)
+    return time.time() - start_time
+
+
+def run_stages(stages, num_workers=None, force=False, dry_run=False, cache_dir=CACHE_DIR):
+    """Runs the stage graph; returns {stage name: (status, seconds)}."""
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = load_manifest(cache_dir)
+    by_name = {stage.name: stage for stage in stages}
+    dependencies = stage_dependencies(stages)
+    report = {}
+    done, failed = set(), set()
+    running = {}
+    wall_start = time.time()
+
+    def ready_stages():
+        return [stage for stage in stages
+                if stage.name not in report and stage.name not in [name for name, _ in running.values()]
+                and dependencies[stage.name] <= done]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        while len(report) < len(stages):
+            for stage in ready_stages():
+                input_hash = stage_hash(stage, manifest)
+                if not force and is_cached(stage, input_hash, manifest):
+                    report[stage.name] = ('cached', 0.0)
+                    done.add(stage.name)
+                    continue
+                if dry_run:
+                    report[stage.name] = ('would run', 0.0)
+                    done.add(stage.name)
+                    continue
+                print(f"  -> starting {stage.name}")
+                log_file = os.path.join(cache_dir, f"{stage.name}.log")
+                future = executor.submit(_run_stage, stage.target, stage.kwargs, log_file)
+                running[future] = (stage.name, input_hash)
+
+            # Stages downstream of a failure can never become ready
+            for stage in stages:
+                if stage.name not in report and dependencies[stage.name] & failed:
+                    report[stage.name] = ('blocked', 0.0)
+                    failed.add(stage.name)
+            if not running:
+                if len(report) < len(stages) and not ready_stages():
+                    raise ValueError("stage graph has a cycle: "
+                                     + ", ".join(s.name for s in stages if s.name not in report))
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, input_hash = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception as error:
+                    print(f"  !! {name} failed: {error!r} (see {cache_dir}/{name}.log)")
+                    report[name] = ('failed', 0.0)
+                    failed.add(name)
+                    continue
+                missing = [path for path in by_name[name].outputs if not os.path.exists(path)]
+                if missing:
+                    print(f"  !! {name} finished without writing {', '.join(missing)}")
+                    report[name] = ('failed', elapsed)
+                    failed.add(name)
+                    continue
+                print(f"  <- finished {name} in {elapsed:.2f} s")
+                report[name] = ('ran', elapsed)
+                done.add(name)
+                # Re-hash outputs now, so downstream stages see the new content
+                for path in by_name[name].outputs:
+                    file_digest(path, manifest)
+                manifest['stages'][name] = {'hash': input_hash, 'outputs': by_name[name].outputs,
+                                            'seconds': elapsed, 'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+                save_manifest(manifest, cache_dir)
+
+    save_manifest(manifest, cache_dir)
+    print_summary(stages, report, time.time() - wall_start)
+    return report
+
+
+def print_summary(stages, report, wall_s):
+    print("\n======================================================================")
+    print("                     Experiment Stage Summary")
+    print("======================================================================")
+    print(f"  {'stage':<22} {'status':<10} {'seconds':>10}")
+    for stage in stages:
+        status, elapsed = report.get(stage.name, ('not run', 0.0))
+        print(f"  {stage.name:<22} {status:<10} {elapsed:>10.2f}")
+    serial_s = sum(elapsed for _, elapsed in report.values())
+    print(f"\n  Wall time {wall_s:.2f} s for {serial_s:.2f} s of stage work.")
+
+
+# --- 3. Stage Functions of the Research Pipeline ---
+def precompute_constellation(constellation_name, time_step_s):
+    """StarPerf pre-computation: writes the H5 file with delay and position groups."""
+    from src.constellation_generation.by_XML.constellation_configuration import constellation_configuration
+    import src.XML_constellation.constellation_connectivity.connectivity_mode_plugin_manager as connectivity_mode_plugin_manager
+
+    constellation = constellation_configuration(dT=time_step_s, constellation_name=constellation_name, max_duration=True)
+    connectionManager = connectivity_mode_plugin_manager.connectivity_mode_plugin_manager()
+    connectionManager.execute_connection_policy(constellation, time_step_s)
+
+
+def extract_link_data(h5_file_path, shell_name, walker, output_csv_file):
+    """Link dataset (isl_link_data.csv layout) read from an existing H5 file."""
+    import csv
+
+    from constellation_index import ConstellationIndex
+    from snapshot_reader import SnapshotReader
+
+    index = ConstellationIndex.walker(*walker, shell_name=shell_name)
+    with SnapshotReader(h5_file_path, shell_name) as reader, open(output_csv_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time_slot', 'source_sat_id', 'target_sat_id', 'is_inter_plane', 'actual_delay'])
+        for t in range(1, reader.num_timeslots + 1):
+            src, dst, delays = reader.edges(t)
+            writer.writerows(zip([t] * len(src), index.node_names(src), index.node_names(dst),
+                                 index.is_inter_plane(src, dst).tolist(), delays.tolist()))
+    print(f"Link data saved to {output_csv_file}")
+
+
+def run_jitter_analysis(h5_file_path, shell_name, model_file, walker, output_file):
+    from constellation_index import ConstellationIndex
+    from jitter_analysis import USER_PAIRS, jitter_analysis, summarize_jitter
+    from snapshot_reader import SnapshotReader
+
+    reader = SnapshotReader(h5_file_path, shell_name)
+    index = ConstellationIndex.walker(*walker, shell_name=shell_name)
+    df = jitter_analysis(reader, model_file, index, USER_PAIRS, reader.num_timeslots)
+    df.to_csv(output_file, index=False)
+    summarize_jitter(df)
+
+
+def run_resilience_campaign(h5_file_path, shell_name, slot_step, seeds, output_file):
+    from resilience_campaign import FAILURE_MODELS, USER_PAIRS, build_scenarios, run_campaign, summarize_campaign
+    from snapshot_reader import SnapshotReader
+
+    reader = SnapshotReader(h5_file_path, shell_name)
+    scenarios = build_scenarios(range(1, reader.num_timeslots + 1, slot_step), USER_PAIRS, FAILURE_MODELS, seeds)
+    summarize_campaign(run_campaign(reader, scenarios, output_file))
+
+
+def research_stages(constellation_name="Telesat", shell_name='shell1', time_step_s=60, walker=(27, 13)):
+    """pre-compute -> {link data -> model -> routing tables / jitter, trajectories, resilience}"""
+    from resilience_campaign import results_file
+
+    h5_file_path = f"data/XML_constellation/{constellation_name}.h5"
+    walker = list(walker)
+    # CSV instead of Parquet when no Parquet engine is installed
+    resilience_file = results_file('resilience_campaign.parquet')
+    return [
+        Stage('precompute', 'experiment_runner:precompute_constellation',
+              {'constellation_name': constellation_name, 'time_step_s': time_step_s},
+              inputs=[f"config/XML_constellation/{constellation_name}.xml"], outputs=[h5_file_path]),
+        Stage('extract_links', 'experiment_runner:extract_link_data',
+              {'h5_file_path': h5_file_path, 'shell_name': shell_name, 'walker': walker,
+               'output_csv_file': 'isl_link_data.csv'},
+              inputs=[h5_file_path], outputs=['isl_link_data.csv']),
+        Stage('trajectories', 'trajectory_store:extract_constellation_trajectories',
+              {'h5_file_path': h5_file_path, 'shell_name': shell_name,
+               'output_prefix': f"{constellation_name}_positions", 'time_step_s': time_step_s},
+              inputs=[h5_file_path],
+              outputs=[f"{constellation_name}_positions.npy", f"{constellation_name}_positions.json"]),
+        Stage('train_predictor', 'train_predictor_model:train_model',
+              inputs=['isl_link_data.csv'], outputs=['delay_predictor.joblib']),
+        Stage('routing_tables', 'predictive_routing_tables:precompute_routing_tables',
+              {'h5_file_path': h5_file_path, 'shell_name': shell_name, 'walker': walker,
+               'model_file': 'delay_predictor.joblib', 'output_file': 'routing_tables.npz', 'horizon': 50},
+              inputs=[h5_file_path, 'delay_predictor.joblib'], outputs=['routing_tables.npz']),
+        Stage('jitter', 'experiment_runner:run_jitter_analysis',
+              {'h5_file_path': h5_file_path, 'shell_name': shell_name, 'model_file': 'delay_predictor.joblib',
+               'walker': walker, 'output_file': 'jitter_analysis.csv'},
+              inputs=[h5_file_path, 'delay_predictor.joblib'], outputs=['jitter_analysis.csv']),
+        Stage('resilience', 'experiment_runner:run_resilience_campaign',
+              {'h5_file_path': h5_file_path, 'shell_name': shell_name, 'slot_step': 10, 'seeds': 3,
+               'output_file': resilience_file},
+              inputs=[h5_file_path], outputs=[resilience_file]),
+    ]
+
+
+# --- 4. StarPerf Test Cases as a Stage Table ---
+# (name, 'module:function', stages it must wait for). The XML cases
+# generate the constellation data the standalone, kits and duration
+# cases reuse; the attack cases run on generated traffic. The cases
+# write into paths chosen inside the samples package, so they declare
+# no inputs/outputs: the order comes from 'after' and they are never
+# served from the manifest cache.
+STARPERF_CASES = [
+    ('xml_cases', 'samples.XML_constellation.XML_constellation_test_cases:XML_constellation_test_cases', []),
+    ('tle_cases', 'samples.TLE_constellation.TLE_constellation_test_cases:TLE_constellation_test_cases', []),
+    ('standalone_cases', 'samples.standalone_module.standalone_module_test_cases:standalone_module_test_cases',
+     ['xml_cases']),
+    ('kits_cases', 'samples.kits.kits_test_cases:kits_test_cases', ['xml_cases']),
+    ('duration_cases', 'samples.duration_constellation.duration_constellation_cases:constellation_performance',
+     ['xml_cases']),
+    ('traffic_generation', 'samples.traffic.traffic_generation_cases:traffic_generation', ['duration_cases']),
+    ('attack_cases', 'samples.attack.attack_cases:attack_cases', ['traffic_generation']),
+]
+
+
+def starperf_stages():
+    return [Stage(name, target, after=after) for name, target, after in STARPERF_CASES]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stage-graph experiment runner.")
+    parser.add_argument('--pipeline', choices=['research', 'starperf'], default='research')
+    parser.add_argument('--stages', nargs='+', default=None, help="run only these stages")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="ignore cached stage outputs")
+    parser.add_argument('--dry-run', action='store_true', help="only report what would run")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    stages = research_stages() if args.pipeline == 'research' else starperf_stages()
+    if args.stages:
+        stages = [stage for stage in stages if stage.name in args.stages]
+    print(f"Running {len(stages)} '{args.pipeline}' stages...")
+    run_stages(stages, args.workers, force=args.force, dry_run=args.dry_run)
@@ -6,42 +6,22 @@ This script follows the simulator's intended workflow:
 1. Run a full pre-computation to generate a complete H5 file with
    position and delay data for an entire orbit cycle.
 2. Loop through the timeslots, read data from the H5 file, build
-   the graph, and extract features.
+   the graph, and extract features. The loop runs as a prefetch
+   pipeline (prefetch_pipeline.py): the next slots are read and their
+   features computed while the current one is written out.
 """
 import time
 import csv
 import os
-import h5py
-import networkx as nx
-import numpy as np
+
+from constellation_index import ConstellationIndex
+from prefetch_pipeline import run_pipeline
+from snapshot_reader import SnapshotReader
 
 # --- Core Imports ---
 from src.constellation_generation.by_XML.constellation_configuration import constellation_configuration
 import src.XML_constellation.constellation_connectivity.connectivity_mode_plugin_manager as connectivity_mode_plugin_manager
 
-# --- Utility function to build graph from H5 data ---
-def build_graph_from_h5(h5_file_path, shell_name, time_slot):
-    """
-    Builds and returns a NetworkX graph 'G' for a specific shell and time slot
-    by READING pre-computed data from an H5 file.
-    """
-    try:
-        with h5py.File(h5_file_path, 'r') as file:
-            delay_group = file['delay']
-            current_shell_group = delay_group[shell_name]
-            delay_matrix = np.array(current_shell_group[f'timeslot{time_slot}']).tolist()
-    except (KeyError, FileNotFoundError):
-        print(f"Warning: Could not read delay data for shell '{shell_name}', timeslot {time_slot}.")
-        return None
-
-    G = nx.Graph()
-    num_sats_plus_one = len(delay_matrix)
-    for i in range(1, num_sats_plus_one):
-        for j in range(i + 1, num_sats_plus_one):
-            if delay_matrix[i][j] > 0:
-                G.add_edge(f"satellite_{i}", f"satellite_{j}", weight=delay_matrix[i][j])
-    return G
-
 # --- Main Data Generation Logic ---
 
 def generate_data():
@@ -77,40 +57,44 @@ def generate_data():
     output_csv_file = 'isl_link_data.csv'
     csv_header = ['time_slot', 'source_sat_id', 'target_sat_id', 'is_inter_plane', 'actual_delay']
     
-    sat_to_orbit_map = {}
-    for orbit in shell.orbits:
-        for sat in orbit.satellites:
-            sat_to_orbit_map[f"satellite_{sat.id}"] = orbit.orbit_id
+    index = ConstellationIndex.from_shell(shell)
 
     # --- 4. Data Extraction Loop ---
     start_extract_time = time.time()
     print(f"\nStarting data extraction for {total_timeslots} timeslots...")
 
+    reader = SnapshotReader(h5_file_path, shell.shell_name)
+
     with open(output_csv_file, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(csv_header)
 
-        for t in range(1, total_timeslots + 1):
-            # Now we just read the H5 file at each step
-            G = build_graph_from_h5(h5_file_path, shell.shell_name, t)
-            
-            if G is None: continue
+        # Stage 2: features for all edges of the slot at once
+        def build_rows(t, edges):
+            src, dst, delays = edges
+            return zip([t] * len(src), index.node_names(src), index.node_names(dst),
+                       index.is_inter_plane(src, dst).tolist(), delays.tolist())
 
-            for u, v, data in G.edges(data=True):
-                u_orbit = sat_to_orbit_map.get(u)
-                v_orbit = sat_to_orbit_map.get(v)
-                is_inter_plane = 1 if u_orbit != v_orbit else 0
-                actual_delay = data['weight']
-                writer.writerow([t, u, v, is_inter_plane, actual_delay])
+        # Stage 3 of the pipeline: runs here while later slots are read and built
+        def write_slot(t, rows):
+            writer.writerows(rows)
             
             if t % 10 == 0:
                 print(f"  Extracted data from timeslot {t}/{total_timeslots}...")
 
+        stats = run_pipeline(range(1, min(total_timeslots, reader.num_timeslots) + 1),
+                             read=reader.edges,
+                             build=build_rows,
+                             consume=write_slot,
+                             skip=(KeyError,))  # timeslot missing from the H5 file
+    reader.close()
+
     end_extract_time = time.time()
     print("\n----------------------------------------------------")
     print(f"Data generation complete!")
     print(f"Data saved to: {output_csv_file}")
     print(f"Total extraction time: {end_extract_time - start_extract_time:.2f} seconds.")
+    print(stats.summary())
     print("----------------------------------------------------")
 
 if __name__ == "__main__":
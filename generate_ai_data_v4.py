@@ -11,37 +11,14 @@ This script follows the simulator's intended workflow:
 import time
 import csv
 import os
-import h5py
-import networkx as nx
-import numpy as np
+
+from constellation_index import ConstellationIndex
+from snapshot_reader import SnapshotReader
 
 # --- Core Imports ---
 from src.constellation_generation.by_XML.constellation_configuration import constellation_configuration
 import src.XML_constellation.constellation_connectivity.connectivity_mode_plugin_manager as connectivity_mode_plugin_manager
 
-# --- Utility function to build graph from H5 data ---
-def build_graph_from_h5(h5_file_path, shell_name, time_slot):
-    """
-    Builds and returns a NetworkX graph 'G' for a specific shell and time slot
-    by READING pre-computed data from an H5 file.
-    """
-    try:
-        with h5py.File(h5_file_path, 'r') as file:
-            delay_group = file['delay']
-            current_shell_group = delay_group[shell_name]
-            delay_matrix = np.array(current_shell_group[f'timeslot{time_slot}']).tolist()
-    except (KeyError, FileNotFoundError):
-        print(f"Warning: Could not read delay data for shell '{shell_name}', timeslot {time_slot}.")
-        return None
-
-    G = nx.Graph()
-    num_sats_plus_one = len(delay_matrix)
-    for i in range(1, num_sats_plus_one):
-        for j in range(i + 1, num_sats_plus_one):
-            if delay_matrix[i][j] > 0:
-                G.add_edge(f"satellite_{i}", f"satellite_{j}", weight=delay_matrix[i][j])
-    return G
-
 # --- Main Data Generation Logic ---
 
 def generate_data():
@@ -77,31 +54,22 @@ def generate_data():
     output_csv_file = 'isl_link_data.csv'
     csv_header = ['time_slot', 'source_sat_id', 'target_sat_id', 'is_inter_plane', 'actual_delay']
     
-    sat_to_orbit_map = {}
-    for orbit in shell.orbits:
-        for sat in orbit.satellites:
-            sat_to_orbit_map[f"satellite_{sat.id}"] = orbit.orbit_id
+    index = ConstellationIndex.from_shell(shell)
 
     # --- 4. Data Extraction Loop ---
     start_extract_time = time.time()
     print(f"\nStarting data extraction for {total_timeslots} timeslots...")
 
-    with open(output_csv_file, 'w', newline='') as f:
+    with SnapshotReader(h5_file_path, shell.shell_name) as reader, open(output_csv_file, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(csv_header)
 
-        for t in range(1, total_timeslots + 1):
-            # Now we just read the H5 file at each step
-            G = build_graph_from_h5(h5_file_path, shell.shell_name, t)
-            
-            if G is None: continue
-
-            for u, v, data in G.edges(data=True):
-                u_orbit = sat_to_orbit_map.get(u)
-                v_orbit = sat_to_orbit_map.get(v)
-                is_inter_plane = 1 if u_orbit != v_orbit else 0
-                actual_delay = data['weight']
-                writer.writerow([t, u, v, is_inter_plane, actual_delay])
+        for t in range(1, min(total_timeslots, reader.num_timeslots) + 1):
+            # Read the slot's edges as arrays; features for all edges at once
+            src, dst, delays = reader.edges(t)
+            is_inter_plane = index.is_inter_plane(src, dst)
+            writer.writerows(zip([t] * len(src), index.node_names(src), index.node_names(dst),
+                                 is_inter_plane.tolist(), delays.tolist()))
             
             if t % 10 == 0:
                 print(f"  Extracted data from timeslot {t}/{total_timeslots}...")
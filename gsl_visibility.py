@@ -0,0 +1,247 @@
+"""
+================================================================
+Ground-to-Satellite Link (GSL) Visibility
+================================================================
+nearest_satellite() / distance_between_satellite_and_user() connect a
+user to the satellite with the closest sub-satellite point, ignoring
+the minimum elevation angle, and give exactly one candidate. This
+module finds, for many ground points at once, EVERY satellite above
+a minimum elevation, with slant range and one-way delay:
+
+1. SatelliteBucketGrid sorts the satellites of one timeslot into
+   lat/lon buckets about one visibility radius wide (CSR layout:
+   satellites ordered by bucket + bucket offsets).
+2. Each user only checks the buckets that can intersect its
+   visibility cap (3 latitude rows, a longitude span that widens
+   towards the poles), vectorized over all users.
+3. The candidates get the exact elevation / slant range from
+   Earth-fixed vectors; the ones above the mask are GroundLinks.
+
+with_ground_links() appends the GSLs to the ISL edge arrays (user i
+becomes node num_satellites + 1 + i), so routes between users include
+the up- and downlink: route_users() gives true end-to-end delays.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from earth_geometry import SPEED_OF_LIGHT_KM_S, lon_lat_alt_to_cartesian, visibility_central_angle_rad
+from tracing import span
+
+DEFAULT_MIN_ELEVATION_DEG = 25.0
+
+
+# --- 1. Spatial Bucket Grid ---
+class SatelliteBucketGrid:
+    """Lat/lon bucket index of the sub-satellite points of one timeslot."""
+
+    def __init__(self, positions, max_central_angle_rad, bucket_deg=None):
+        positions = np.asarray(positions, dtype=np.float64)
+        self.reach_deg = float(np.degrees(max_central_angle_rad))
+        # Buckets at least one visibility radius tall (a cap spans <= 3
+        # rows) that tile the globe exactly, so longitudes wrap cleanly
+        bucket_deg = max(bucket_deg or self.reach_deg, 0.1)
+        self.rows = max(int(180.0 // bucket_deg), 1)
+        self.cols = max(int(360.0 // bucket_deg), 1)
+        self.row_deg, self.col_deg = 180.0 / self.rows, 360.0 / self.cols
+
+        buckets = self._row(positions[:, 1]) * self.cols + self._col(positions[:, 0])
+        self.order = np.argsort(buckets, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(buckets, minlength=self.rows * self.cols))])
+
+    def _row(self, lat):
+        return np.clip(((np.asarray(lat) + 90.0) // self.row_deg).astype(np.int64), 0, self.rows - 1)
+
+    def _col(self, lon):
+        return ((np.asarray(lon) + 180.0) // self.col_deg).astype(np.int64) % self.cols
+
+    def candidates(self, user_lon, user_lat):
+        """
+        (user, satellite) index pairs (0-based) of every satellite in a
+        bucket that may be visible from the user; a superset of the
+        visible satellites.
+        """
+        user_lon, user_lat = np.asarray(user_lon, dtype=np.float64), np.asarray(user_lat, dtype=np.float64)
+        first_row = self._row(user_lat - self.reach_deg)
+        num_rows = self._row(user_lat + self.reach_deg) - first_row + 1
+
+        # Longitude half-width of a spherical cap: asin(sin(reach) / cos(lat))
+        reach = np.radians(self.reach_deg)
+        cos_lat = np.cos(np.radians(user_lat))
+        near_pole = np.abs(user_lat) + self.reach_deg >= 90.0
+        half_width = np.degrees(np.arcsin(np.clip(np.sin(reach) / np.maximum(cos_lat, 1e-12), 0.0, 1.0)))
+        first_col = self._col(user_lon - half_width)
+        num_cols = (((user_lon + half_width + 180.0) // self.col_deg).astype(np.int64)
+                    - ((user_lon - half_width + 180.0) // self.col_deg).astype(np.int64) + 1)
+        all_cols = near_pole | (num_cols >= self.cols)
+        first_col = np.where(all_cols, 0, first_col)
+        num_cols = np.where(all_cols, self.cols, num_cols)
+
+        # Expand (user, bucket) pairs, then (user, satellite) pairs
+        pair_user, k = ragged_range(num_rows * num_cols)
+        row = first_row[pair_user] + k // num_cols[pair_user]
+        col = (first_col[pair_user] + k % num_cols[pair_user]) % self.cols
+        bucket = row * self.cols + col
+        starts = self.offsets[bucket]
+        candidate_pair, k = ragged_range(self.offsets[bucket + 1] - starts)
+        return pair_user[candidate_pair], self.order[starts[candidate_pair] + k]
+
+
+def ragged_range(counts):
+    """For counts [2, 3]: owners [0, 0, 1, 1, 1] and local indices [0, 1, 0, 1, 2]."""
+    owners = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return owners, np.arange(len(owners)) - starts[owners]
+
+
+# --- 2. Visibility ---
+class GroundLinks:
+    """All visible (user, satellite) links of one timeslot; satellites are 1-based IDs."""
+
+    def __init__(self, users, satellites, elevation_deg, slant_range_km, num_users):
+        self.users = users
+        self.satellites = satellites
+        self.elevation_deg = elevation_deg
+        self.slant_range_km = slant_range_km
+        self.delay = slant_range_km / SPEED_OF_LIGHT_KM_S
+        self.num_users = num_users
+
+    def __len__(self):
+        return len(self.users)
+
+    def counts(self):
+        """Number of visible satellites per user."""
+        return np.bincount(self.users, minlength=self.num_users)
+
+    def for_user(self, user):
+        mask = self.users == user
+        return self.satellites[mask], self.elevation_deg[mask], self.delay[mask]
+
+    def best(self, key='elevation'):
+        """
+        One satellite per user (0 where none is visible): the highest
+        elevation, or with key='delay' the shortest slant range.
+        """
+        score = self.elevation_deg if key == 'elevation' else -self.slant_range_km
+        order = np.lexsort((-score, self.users))
+        first = order[np.r_[True, self.users[order][1:] != self.users[order][:-1]]] if len(order) else order
+        chosen = np.zeros(self.num_users, dtype=np.int64)
+        chosen[self.users[first]] = self.satellites[first]
+        return chosen
+
+
+def visible_satellites(positions, user_lon, user_lat, min_elevation_deg=DEFAULT_MIN_ELEVATION_DEG,
+                       bucket_deg=None):
+    """
+    GroundLinks of every satellite above 'min_elevation_deg' for every
+    user. 'positions' is the (N, 3) [lon, lat, alt] array of a timeslot.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    user_lon, user_lat = np.atleast_1d(user_lon).astype(np.float64), np.atleast_1d(user_lat).astype(np.float64)
+    with span('access.visibility', users=len(user_lon)):
+        reach = visibility_central_angle_rad(positions[:, 2].max(), min_elevation_deg)
+        grid = SatelliteBucketGrid(positions, reach, bucket_deg)
+        users, satellites = grid.candidates(user_lon, user_lat)
+
+        user_xyz = lon_lat_alt_to_cartesian(user_lon, user_lat)[users]
+        line_of_sight = lon_lat_alt_to_cartesian(positions[satellites, 0], positions[satellites, 1],
+                                                 positions[satellites, 2]) - user_xyz
+        slant_range = np.linalg.norm(line_of_sight, axis=1)
+        sin_elevation = (np.einsum('ij,ij->i', line_of_sight, user_xyz)
+                         / (slant_range * np.linalg.norm(user_xyz, axis=1)))
+        elevation = np.degrees(np.arcsin(np.clip(sin_elevation, -1.0, 1.0)))
+
+        visible = elevation >= min_elevation_deg
+        return GroundLinks(users[visible], satellites[visible] + 1, elevation[visible], slant_range[visible],
+                           len(user_lon))
+
+
+# --- 3. Snapshot Graph Integration ---
+def with_ground_links(src, dst, delays, num_satellites, links):
+    """
+    Appends the GSLs to ISL edge arrays: user i is node
+    num_satellites + 1 + i. Only add the users a route should start or
+    end at, otherwise routes may relay through other ground stations.
+    """
+    user_nodes = num_satellites + 1 + links.users
+    return (np.concatenate([src, links.satellites]).astype(np.int64),
+            np.concatenate([dst, user_nodes]).astype(np.int64),
+            np.concatenate([delays, links.delay]))
+
+
+def add_ground_links(G, links, user_names, integer_nodes=False):
+    """Adds the GSLs to a snapshot graph as 'user_<name>' nodes (see graph_from_edges)."""
+    for user, satellite, delay in zip(links.users.tolist(), links.satellites.tolist(), links.delay.tolist()):
+        G.add_edge(f"user_{user_names[user]}", satellite if integer_nodes else f"satellite_{satellite}",
+                   weight=delay)
+    return G
+
+
+def route_users(reader, time_slot, user_pairs, min_elevation_deg=DEFAULT_MIN_ELEVATION_DEG, weights=None):
+    """
+    End-to-end routes (uplink + ISLs + downlink) for {name: ((lon, lat),
+    (lon, lat))} user pairs. Returns {name: (delay_s, [node, ...])} with
+    satellite IDs and 'src'/'dst' for the users, or (nan, None).
+    """
+    from jitter_analysis import path_delay, route_pairs
+
+    src, dst, delays = reader.edges(time_slot)
+    locations = np.array([location for pair in user_pairs.values() for location in pair])
+    links = visible_satellites(reader.positions(time_slot), locations[:, 0], locations[:, 1], min_elevation_deg)
+    src, dst, delays = with_ground_links(src, dst, delays, reader.num_satellites, links)
+    route_weights = delays if weights is None else np.concatenate([weights, links.delay])
+    delay_lookup = dict(zip(zip((np.minimum(src, dst) - 1).tolist(), (np.maximum(src, dst) - 1).tolist()),
+                            delays.tolist()))
+
+    sources = reader.num_satellites + np.arange(0, len(locations), 2)
+    targets = sources + 1
+    paths = route_pairs(reader.num_satellites + len(locations), src, dst, route_weights, sources, targets)
+    routes = {}
+    for name, path in zip(user_pairs, paths):
+        if path is None:
+            routes[name] = (float('nan'), None)
+            continue
+        routes[name] = (path_delay(path, delay_lookup), ['src'] + [n + 1 for n in path[1:-1]] + ['dst'])
+    return routes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="GSL visibility and end-to-end user delays.")
+    parser.add_argument('--constellation', default='Telesat')
+    parser.add_argument('--shell', default='shell1')
+    parser.add_argument('--timeslot', type=int, default=1)
+    parser.add_argument('--min-elevation', type=float, default=DEFAULT_MIN_ELEVATION_DEG, help="degrees")
+    parser.add_argument('--ground-stations', type=int, default=10000,
+                        help="random ground stations for the throughput test")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from jitter_analysis import USER_PAIRS
+    from snapshot_reader import SnapshotReader, h5_path_for
+
+    args = parse_args()
+    with SnapshotReader(h5_path_for(args.constellation), args.shell) as reader:
+        positions = reader.positions(args.timeslot)
+
+        print("\n======================================================================")
+        print(f"  End-to-end routes, timeslot {args.timeslot}, elevation >= {args.min_elevation} deg")
+        print("======================================================================")
+        routes = route_users(reader, args.timeslot, USER_PAIRS, args.min_elevation)
+        for name, (delay, path) in routes.items():
+            if path is None:
+                print(f"  {name:<24} no route (a user sees no satellite)")
+            else:
+                print(f"  {name:<24} {delay * 1000:8.2f} ms  {len(path) - 1:>3} hops  {'-'.join(map(str, path))}")
+
+        rng = np.random.default_rng(0)
+        lon = rng.uniform(-180, 180, args.ground_stations)
+        lat = np.degrees(np.arcsin(rng.uniform(-1, 1, args.ground_stations)))
+        start_time = time.perf_counter()
+        links = visible_satellites(positions, lon, lat, args.min_elevation)
+        elapsed = time.perf_counter() - start_time
+        counts = links.counts()
+        print(f"\n{args.ground_stations} ground stations: {len(links)} GSLs in {elapsed * 1000:.1f} ms; "
+              f"visible satellites per station: mean {counts.mean():.2f}, max {counts.max()}, "
+              f"{np.mean(counts == 0) * 100:.1f}% see none")
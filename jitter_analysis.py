@@ -0,0 +1,196 @@
+"""
+======================================================================
+Full-Orbit Jitter Analysis: Classic vs. AI-Weighted Routing
+======================================================================
+ai_routing_comparison.py measures jitter (std of delay) over only
+range(1, 51) timeslots because its per-slot loop is slow. This script
+evaluates EVERY timeslot in the H5 file (one orbit_cycle, or several
+if the pre-computation covered a longer duration) for several user
+pairs:
+
+- timeslots are split into contiguous chunks evaluated by worker
+  processes, each with its own snapshot handle and model copy,
+- each chunk predicts all its link weights in one model call and runs
+  one single-source Dijkstra per source satellite on sparse matrices,
+- chunks are merged back in timeslot order.
+
+Output (CSV): per-slot and per-pair latency and hops of both routes,
+whether the path changed since the previous slot, and the rolling
+jitter over a window of slots, followed by a summary table.
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from constellation_index import ConstellationIndex
+from predictive_routing_tables import predict_link_weights
+from shared_snapshot_store import SharedSnapshotStore
+from snapshot_reader import SnapshotReader, h5_path_for, nearest_satellite
+from tracing import count, span
+
+USER_PAIRS = {
+    'Hanoi-Rio_de_Janeiro': ((105.84, 21.02), (-43.17, -22.91)),
+    'Beijing-NewYork': ((116.41, 39.9), (-74.00, 40.43)),
+    'San_Francisco-Sydney': ((-122.42, 37.77), (151.21, -33.87)),
+}
+
+
+# --- 1. Routing on Sparse Matrices ---
+def path_from_predecessors(predecessors, src, dst):
+    """Walks a csgraph predecessor row back from dst; returns 0-based nodes or None."""
+    path = [dst]
+    while path[-1] != src:
+        previous = predecessors[path[-1]]
+        if previous < 0:
+            return None
+        path.append(previous)
+    return path[::-1]
+
+
+def route_pairs(num_satellites, src, dst, weights, sources, targets):
+    """
+    Shortest paths for several (source, target) pairs (0-based) with one
+    Dijkstra call over the distinct sources. Returns a list of paths.
+    """
+    weights = np.maximum(weights, np.finfo(np.float64).tiny)
+    adjacency = csr_matrix((weights, (src - 1, dst - 1)), shape=(num_satellites, num_satellites))
+    unique_sources, source_rows = np.unique(sources, return_inverse=True)
+    with span('route.dijkstra', sources=len(unique_sources)):
+        _, predecessors = dijkstra(adjacency, directed=False, indices=unique_sources, return_predecessors=True)
+    return [path_from_predecessors(predecessors[row], s, t)
+            for row, s, t in zip(source_rows, sources, targets)]
+
+
+def path_delay(path, delay_lookup):
+    return sum(delay_lookup[min(u, v), max(u, v)] for u, v in zip(path[:-1], path[1:]))
+
+
+# --- 2. Worker ---
+_reader = None
+_model = None
+_index = None
+
+
+def _init_worker(reader, model_file, index):
+    import joblib
+
+    global _reader, _model, _index
+    _reader, _index = reader, index
+    _model = joblib.load(model_file)
+
+
+def evaluate_slots(timeslots, user_pairs, slots_per_orbit):
+    """Evaluates both routing strategies for every pair in a chunk of timeslots."""
+    rows = []
+    predicted_slots = predict_link_weights(_model, _reader, timeslots, _index)
+    for t, (src, dst, predicted) in zip(timeslots, predicted_slots):
+        _, _, delays = _reader.edges(t)
+        positions = _reader.positions(t)
+        delay_lookup = dict(zip(zip((src - 1).tolist(), (dst - 1).tolist()), delays.tolist()))
+
+        endpoints = [(nearest_satellite(positions, *source)[0] - 1, nearest_satellite(positions, *target)[0] - 1)
+                     for source, target in user_pairs.values()]
+        sources = np.array([s for s, _ in endpoints])
+        targets = np.array([d for _, d in endpoints])
+        classic_paths = route_pairs(_reader.num_satellites, src, dst, delays, sources, targets)
+        ai_paths = route_pairs(_reader.num_satellites, src, dst, predicted, sources, targets)
+
+        for pair_name, classic_path, ai_path in zip(user_pairs, classic_paths, ai_paths):
+            row = {'timeslot': t, 'orbit': (t - 1) // slots_per_orbit, 'pair': pair_name}
+            for label, path in (('classic', classic_path), ('ai', ai_path)):
+                row[f'{label}_delay'] = path_delay(path, delay_lookup) if path else float('nan')
+                row[f'{label}_hops'] = len(path) - 1 if path else -1
+                row[f'{label}_path'] = '-'.join(str(n + 1) for n in path) if path else ''
+            rows.append(row)
+        count('jitter.slots')
+    return rows
+
+
+def _evaluate_chunk(args):
+    return evaluate_slots(*args)
+
+
+# --- 3. Merge and Metrics ---
+def add_jitter_metrics(df, window):
+    """Path changes and rolling jitter per pair; df must be sorted by timeslot."""
+    for label in ('classic', 'ai'):
+        by_pair = df.groupby('pair', sort=False)
+        previous_path = by_pair[f'{label}_path'].shift()
+        df[f'{label}_path_changed'] = previous_path.notna() & (df[f'{label}_path'] != previous_path)
+        df[f'{label}_rolling_jitter'] = by_pair[f'{label}_delay'].transform(
+            lambda delays: delays.rolling(window, min_periods=2).std())
+    return df
+
+
+def jitter_analysis(reader, model_file, index, user_pairs, slots_per_orbit, num_workers=None,
+                    chunk_size=20, window=10):
+    timeslots = list(range(1, reader.num_timeslots + 1))
+    chunks = [(timeslots[i:i + chunk_size], user_pairs, slots_per_orbit)
+              for i in range(0, len(timeslots), chunk_size)]
+    reader.close()
+
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                             initargs=(reader, model_file, index)) as executor:
+        # map() returns chunks in submission order, i.e. merged by timeslot
+        rows = [row for chunk_rows in executor.map(_evaluate_chunk, chunks) for row in chunk_rows]
+    elapsed = time.time() - start_time
+    print(f"Evaluated {len(timeslots)} timeslots x {len(user_pairs)} pairs in {elapsed:.2f} s "
+          f"({len(timeslots) / elapsed:.1f} slots/s).")
+
+    df = pd.DataFrame(rows).sort_values(['timeslot', 'pair'], kind='stable').reset_index(drop=True)
+    return add_jitter_metrics(df, window)
+
+
+def summarize_jitter(df):
+    summary = df.groupby('pair').agg(
+        slots=('timeslot', 'count'),
+        classic_mean_delay=('classic_delay', 'mean'),
+        ai_mean_delay=('ai_delay', 'mean'),
+        classic_jitter=('classic_delay', 'std'),
+        ai_jitter=('ai_delay', 'std'),
+        classic_path_changes=('classic_path_changed', 'sum'),
+        ai_path_changes=('ai_path_changed', 'sum'),
+    )
+    print("\n======================================================================")
+    print("                 Full-Orbit Jitter Analysis Summary")
+    print("======================================================================")
+    print(summary.to_string(float_format=lambda x: f"{x:.6f}"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Full-orbit jitter analysis.")
+    parser.add_argument('--constellation', default='Telesat')
+    parser.add_argument('--shell', default='shell1')
+    parser.add_argument('--model', default='delay_predictor.joblib')
+    parser.add_argument('--walker', type=int, nargs=2, default=[27, 13], metavar=('ORBITS', 'SATS'),
+                        help="orbit layout used for the is_inter_plane feature")
+    parser.add_argument('--slots-per-orbit', type=int, default=None,
+                        help="timeslots per orbit_cycle (default: all slots are one orbit)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--window', type=int, default=10, help="rolling jitter window in slots")
+    parser.add_argument('--output', default='jitter_analysis.csv')
+    parser.add_argument('--shared-memory', action='store_true',
+                        help="load the snapshot once into shared memory for all workers")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    reader = SnapshotReader(h5_path_for(args.constellation), args.shell)
+    index = ConstellationIndex.walker(*args.walker, shell_name=args.shell)
+    if args.shared_memory:
+        with reader:
+            reader = SharedSnapshotStore.from_reader(reader, index)
+    slots_per_orbit = args.slots_per_orbit or reader.num_timeslots
+    with reader:
+        df = jitter_analysis(reader, args.model, index, USER_PAIRS, slots_per_orbit, args.workers,
+                             window=args.window)
+    df.to_csv(args.output, index=False)
+    print(f"Per-slot results saved to {args.output}")
+    summarize_jitter(df)
@@ -0,0 +1,349 @@
+"""
+================================================================
+Packet-Level Discrete-Event Simulator over the Snapshot Network
+================================================================
+Latencies elsewhere in this repository are propagation sums along a
+path. This simulator moves individual packets through the network,
+so queuing and congestion show up in the delays and drops:
+
+- event queue  a binary heap (heapq) of (time, sequence, Event)
+               tuples: tuple ordering runs in C, the sequence number
+               keeps equal-time events FIFO, and Event / Packet are
+               small __slots__ objects
+- links        one directed FIFO link per ISL/GSL direction with a
+               finite bandwidth and a drop-tail buffer (in bits).
+               The FIFO is kept implicitly as the time the link is
+               busy until, so a hop costs ONE event (the arrival at
+               the next node) instead of enqueue/dequeue events
+- topology     updates from snapshot_topologies() (every timeslot)
+               or ContactPlan.topologies() (topology changes plus a
+               delay refresh per polynomial segment; delays are held
+               constant between updates):
+               links keep their queues across updates, links that go
+               down drop the packets still travelling on them
+- routing      next-hop tables (predictive_routing_tables.py): a
+               RoutingTables horizon, or a table computed from the
+               propagation delays at every topology update
+- traffic      Poisson or constant-rate flows between nodes
+
+SimulationStats counts generated / delivered / dropped packets (by
+reason), end-to-end delay and hops, delivered throughput and the
+event rate. Nodes are 1-based: satellites 1..N, ground station i is
+N + 1 + i (as in gsl_visibility.with_ground_links()).
+"""
+import argparse
+import heapq
+import itertools
+import random
+import time
+
+import numpy as np
+
+from gsl_visibility import DEFAULT_MIN_ELEVATION_DEG, visible_satellites, with_ground_links
+from predictive_routing_tables import NO_ROUTE, compute_next_hop_table
+from tracing import count, span
+
+GENERATE, ARRIVE, TOPOLOGY = 0, 1, 2
+MAX_HOPS = 64
+# Next-hop tables up to this many nodes are converted to nested lists,
+# whose item lookup is several times faster than NumPy scalar indexing
+LIST_TABLE_MAX_NODES = 4000
+
+
+# --- 1. Events, Packets, Links, Flows ---
+class Event:
+    """A scheduled event; 'ref' is the link (ARRIVE), flow (GENERATE) or topology (TOPOLOGY)."""
+    __slots__ = ('kind', 'packet', 'node', 'ref')
+
+    def __init__(self, kind, packet=None, node=0, ref=None):
+        self.kind = kind
+        self.packet = packet
+        self.node = node
+        self.ref = ref
+
+
+class Packet:
+    __slots__ = ('flow', 'dst', 'size_bits', 'created_s', 'hops')
+
+    def __init__(self, flow, dst, size_bits, created_s):
+        self.flow = flow
+        self.dst = dst
+        self.size_bits = size_bits
+        self.created_s = created_s
+        self.hops = 0
+
+
+class Link:
+    """Directed link u -> v; the FIFO queue is 'busy_until' (end of the last queued transmission)."""
+    __slots__ = ('delay', 'bandwidth', 'buffer_bits', 'busy_until', 'up', 'packets', 'bits', 'drops')
+
+    def __init__(self, delay, bandwidth, buffer_bits):
+        self.delay = delay
+        self.bandwidth = bandwidth
+        self.buffer_bits = buffer_bits
+        self.busy_until = 0.0
+        self.up = True
+        self.packets = 0
+        self.bits = 0
+        self.drops = 0
+
+
+class Flow:
+    __slots__ = ('src', 'dst', 'rate_pps', 'size_bits', 'poisson', 'delivered', 'delay_sum')
+
+    def __init__(self, src, dst, rate_pps, size_bits=12000, poisson=True):
+        self.src = src
+        self.dst = dst
+        self.rate_pps = rate_pps
+        self.size_bits = size_bits
+        self.poisson = poisson
+        self.delivered = 0
+        self.delay_sum = 0.0
+
+
+class SimulationStats:
+    def __init__(self):
+        self.events = 0
+        self.generated = 0
+        self.delivered = 0
+        self.delivered_bits = 0
+        self.dropped = {'queue': 0, 'no_route': 0, 'link_down': 0, 'hop_limit': 0}
+        self.delay_sum = 0.0
+        self.delay_max = 0.0
+        self.hops_sum = 0
+        self.topology_updates = 0
+        self.simulated_s = 0.0
+        self.wall_s = 0.0
+
+    def summary(self):
+        delivered = max(self.delivered, 1)
+        return {
+            'events': self.events, 'events_per_s': self.events / self.wall_s if self.wall_s else 0.0,
+            'generated': self.generated, 'delivered': self.delivered, 'dropped': dict(self.dropped),
+            'in_flight': self.generated - self.delivered - sum(self.dropped.values()),
+            'mean_delay_ms': self.delay_sum / delivered * 1000, 'max_delay_ms': self.delay_max * 1000,
+            'mean_hops': self.hops_sum / delivered, 'topology_updates': self.topology_updates,
+            'throughput_mbps': self.delivered_bits / self.simulated_s / 1e6 if self.simulated_s else 0.0,
+        }
+
+
+# --- 2. Topology Sources ---
+def snapshot_topologies(reader, time_step_s=60, ground_stations=None, min_elevation_deg=DEFAULT_MIN_ELEVATION_DEG):
+    """
+    Yields (time_s, src, dst, delays) for every timeslot of a
+    SnapshotReader; with (G, 2) (lon, lat) ground stations the GSLs are
+    added as nodes N + 1 + i.
+    """
+    for t in range(1, reader.num_timeslots + 1):
+        src, dst, delays = reader.edges(t)
+        if ground_stations is not None:
+            links = visible_satellites(reader.positions(t), ground_stations[:, 0], ground_stations[:, 1],
+                                       min_elevation_deg)
+            src, dst, delays = with_ground_links(src, dst, delays, reader.num_satellites, links)
+        yield t * time_step_s, src, dst, delays
+
+
+# --- 3. Simulator ---
+class PacketSimulator:
+    """
+    Heap-scheduled packet simulator. 'topologies' is an iterator of
+    (time_s, src, dst, delays); the first one starts the simulation.
+    """
+
+    def __init__(self, num_satellites, topologies, num_ground_stations=0, isl_bandwidth_bps=1e9,
+                 gsl_bandwidth_bps=1e8, buffer_bits=100 * 12000, routing_tables=None, time_step_s=60, seed=0):
+        if routing_tables is not None and num_ground_stations:
+            # RoutingTables are (N, N) over satellites and cannot route to ground station nodes
+            raise ValueError("routing_tables only cover satellites; use num_ground_stations=0 "
+                             "or let the simulator compute next-hop tables.")
+        self.num_satellites = num_satellites
+        self.num_nodes = num_satellites + num_ground_stations
+        self.isl_bandwidth_bps = isl_bandwidth_bps
+        self.gsl_bandwidth_bps = gsl_bandwidth_bps
+        self.buffer_bits = buffer_bits
+        self.routing_tables = routing_tables
+        self.time_step_s = time_step_s
+        self.random = random.Random(seed)
+        self.stats = SimulationStats()
+        self.flows = []
+        self.links = {}
+        self.next_hop = None
+        self._heap = []
+        self._sequence = itertools.count()
+        self._topologies = iter(topologies)
+        first = next(self._topologies)
+        self.start_s = float(first[0])
+        self.now = self.start_s
+        self._schedule(self.start_s, Event(TOPOLOGY, ref=first))
+
+    def _schedule(self, time_s, event):
+        heapq.heappush(self._heap, (time_s, next(self._sequence), event))
+
+    def add_flow(self, src, dst, rate_pps, size_bits=12000, poisson=True):
+        """Adds a flow between two nodes; its first packet is generated at the simulation start."""
+        flow = Flow(src, dst, rate_pps, size_bits, poisson)
+        self.flows.append(flow)
+        self._schedule(self.start_s, Event(GENERATE, ref=flow))
+        return flow
+
+    def _apply_topology(self, time_s, src, dst, delays):
+        """Replaces the link set (queues of surviving links are kept) and the next-hop table."""
+        with span('sim.topology_update', links=len(src)):
+            old_links, links = self.links, {}
+            num_nodes, num_satellites = self.num_nodes, self.num_satellites
+            for u, v, delay in zip(src.tolist(), dst.tolist(), np.asarray(delays).tolist()):
+                bandwidth = self.gsl_bandwidth_bps if max(u, v) > num_satellites else self.isl_bandwidth_bps
+                for key in ((u - 1) * num_nodes + v - 1, (v - 1) * num_nodes + u - 1):
+                    link = old_links.pop(key, None) or Link(delay, bandwidth, self.buffer_bits)
+                    link.delay = delay
+                    links[key] = link
+            for link in old_links.values():
+                link.up = False
+            self.links = links
+
+            if self.routing_tables is not None:
+                slot = int(time_s // self.time_step_s)
+                slot = min(max(slot, int(self.routing_tables.timeslots[0])), int(self.routing_tables.timeslots[-1]))
+                next_hop = self.routing_tables.table(slot)
+            else:
+                next_hop = compute_next_hop_table(num_nodes, np.asarray(src), np.asarray(dst), delays)
+            self.next_hop = next_hop.tolist() if num_nodes <= LIST_TABLE_MAX_NODES else next_hop
+        self.stats.topology_updates += 1
+
+    def run(self, duration_s):
+        """Processes the next duration_s seconds of events; returns the SimulationStats."""
+        until = self.now + duration_s
+        heap, pop, push = self._heap, heapq.heappop, heapq.heappush
+        stats, dropped = self.stats, self.stats.dropped
+        expovariate = self.random.expovariate
+        num_nodes = self.num_nodes
+        links, next_hop = self.links, self.next_hop
+        sequence = self._sequence.__next__
+        events = 0
+
+        wall_start = time.perf_counter()
+        with span('sim.run', duration_s=duration_s):
+            while heap and heap[0][0] <= until:
+                now, _, event = pop(heap)
+                events += 1
+                kind = event.kind
+
+                if kind == ARRIVE:
+                    if not event.ref.up:
+                        dropped['link_down'] += 1
+                        continue
+                    packet, node = event.packet, event.node
+                elif kind == GENERATE:
+                    flow = event.ref
+                    gap = expovariate(flow.rate_pps) if flow.poisson else 1.0 / flow.rate_pps
+                    push(heap, (now + gap, sequence(), event))
+                    packet, node = Packet(flow, flow.dst, flow.size_bits, now), flow.src
+                    stats.generated += 1
+                else:
+                    time_s, src, dst, delays = event.ref
+                    self._apply_topology(time_s, src, dst, delays)
+                    links, next_hop = self.links, self.next_hop
+                    upcoming = next(self._topologies, None)
+                    if upcoming is not None:
+                        self._schedule(float(upcoming[0]), Event(TOPOLOGY, ref=upcoming))
+                    continue
+
+                # Forward the packet from 'node' (or deliver it)
+                if node == packet.dst:
+                    delay = now - packet.created_s
+                    stats.delivered += 1
+                    stats.delivered_bits += packet.size_bits
+                    stats.delay_sum += delay
+                    stats.hops_sum += packet.hops
+                    if delay > stats.delay_max:
+                        stats.delay_max = delay
+                    packet.flow.delivered += 1
+                    packet.flow.delay_sum += delay
+                    continue
+                if packet.hops >= MAX_HOPS:
+                    dropped['hop_limit'] += 1
+                    continue
+                # int(): a NumPy table (large or RoutingTables) holds int16 entries
+                next_node = int(next_hop[node - 1][packet.dst - 1])
+                link = links.get((node - 1) * num_nodes + next_node) if next_node != NO_ROUTE else None
+                if link is None:
+                    dropped['no_route'] += 1
+                    continue
+                start = link.busy_until if link.busy_until > now else now
+                if (start - now) * link.bandwidth > link.buffer_bits:
+                    link.drops += 1
+                    dropped['queue'] += 1
+                    continue
+                link.busy_until = start + packet.size_bits / link.bandwidth
+                link.packets += 1
+                link.bits += packet.size_bits
+                packet.hops += 1
+                push(heap, (link.busy_until + link.delay, sequence(), Event(ARRIVE, packet, next_node + 1, link)))
+
+        stats.events += events
+        stats.wall_s += time.perf_counter() - wall_start
+        stats.simulated_s = until - self.start_s
+        self.now = until
+        count('sim.events', events)
+        return stats
+
+
+def print_summary(simulator, flow_names=None):
+    summary = simulator.stats.summary()
+    print("\n======================================================================")
+    print("                  Packet Simulation Summary")
+    print("======================================================================")
+    print(f"  Simulated {summary['topology_updates']} topologies, {simulator.stats.simulated_s:.1f} s")
+    print(f"  Events: {summary['events']:,} ({summary['events_per_s']:,.0f} events/s wall clock)")
+    print(f"  Packets: {summary['generated']:,} generated, {summary['delivered']:,} delivered, "
+          f"{summary['in_flight']:,} in flight")
+    print(f"  Dropped: " + ", ".join(f"{reason} {n:,}" for reason, n in summary['dropped'].items()))
+    print(f"  Delay: mean {summary['mean_delay_ms']:.2f} ms, max {summary['max_delay_ms']:.2f} ms, "
+          f"mean hops {summary['mean_hops']:.1f}; throughput {summary['throughput_mbps']:.1f} Mbit/s")
+    for i, flow in enumerate(simulator.flows):
+        name = flow_names[i] if flow_names else f"{flow.src}->{flow.dst}"
+        mean_delay = flow.delay_sum / flow.delivered * 1000 if flow.delivered else float('nan')
+        print(f"    {name:<24} {flow.delivered:>9,} delivered  mean delay {mean_delay:8.2f} ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Packet-level discrete-event simulation between user pairs.")
+    parser.add_argument('--constellation', default='Telesat')
+    parser.add_argument('--shell', default='shell1')
+    parser.add_argument('--time-step', type=int, default=60, help="dT of the pre-computation in seconds")
+    parser.add_argument('--topology', choices=['snapshot', 'contact'], default='contact',
+                        help="update every timeslot, or at contact-plan changes plus a delay "
+                             "refresh every polynomial segment (delays are held in between)")
+    parser.add_argument('--duration', type=float, default=300.0, help="simulated seconds")
+    parser.add_argument('--rate', type=float, default=2000.0, help="packets/s per flow (Poisson)")
+    parser.add_argument('--packet-size', type=int, default=1500, help="bytes")
+    parser.add_argument('--isl-bandwidth', type=float, default=100.0, help="Mbit/s")
+    parser.add_argument('--gsl-bandwidth', type=float, default=50.0, help="Mbit/s")
+    parser.add_argument('--queue-packets', type=int, default=100, help="buffer per link in packets")
+    parser.add_argument('--min-elevation', type=float, default=DEFAULT_MIN_ELEVATION_DEG, help="degrees")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from contact_plan import build_contact_plan
+    from jitter_analysis import USER_PAIRS
+    from snapshot_reader import SnapshotReader, h5_path_for
+
+    args = parse_args()
+    stations = np.array([location for pair in USER_PAIRS.values() for location in pair])
+    with SnapshotReader(h5_path_for(args.constellation), args.shell) as reader:
+        if args.topology == 'contact':
+            plan = build_contact_plan(reader, args.time_step, stations, args.min_elevation)
+            topologies = plan.topologies()
+        else:
+            topologies = snapshot_topologies(reader, args.time_step, stations, args.min_elevation)
+        packet_bits = args.packet_size * 8
+        simulator = PacketSimulator(reader.num_satellites, topologies, len(stations),
+                                    isl_bandwidth_bps=args.isl_bandwidth * 1e6,
+                                    gsl_bandwidth_bps=args.gsl_bandwidth * 1e6,
+                                    buffer_bits=args.queue_packets * packet_bits, time_step_s=args.time_step)
+        for i in range(len(USER_PAIRS)):
+            simulator.add_flow(reader.num_satellites + 1 + 2 * i, reader.num_satellites + 2 + 2 * i,
+                               args.rate, packet_bits)
+        simulator.run(args.duration)
+    print_summary(simulator, list(USER_PAIRS))
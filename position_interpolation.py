@@ -0,0 +1,184 @@
+"""
+================================================================
+Sub-Timeslot Satellite Positions (orbit-aware interpolation)
+================================================================
+Positions are stored once per timeslot (dT = 60 s by default), and a
+finer dT multiplies the H5 size and the pre-computation time. Handover
+and jitter studies need positions in between, so PositionInterpolator
+answers positions at ARBITRARY times (seconds; timeslot t is at
+t * dT, as in the pre-computation):
+
+- 'slerp':    the stored Earth-fixed positions are rotated into an
+              inertial frame (undoing the Earth rotation), where a
+              satellite moves on a great circle at a constant rate;
+              the direction is interpolated spherically (slerp) and
+              the radius linearly, then rotated back to the query time.
+              This is exact only for circular orbits sampled
+              without noise; estimate_error() gives an empirical
+              error estimate on real data (see below), NOT a bound.
+- 'analytic': files written by walker_generator.py store their Walker
+              parameters, so positions are propagated exactly. Use it
+              whenever an error guarantee is needed.
+- 'auto':     'analytic' when the parameters are present, else 'slerp'.
+
+estimate_error() leaves every other stored slot out, interpolates it
+from its neighbours 2 dT apart and compares with the stored value.
+Assuming the error of a smooth orbit grows with the square of the
+interval, the error at dT is estimated as a quarter of the worst error
+found at 2 dT (reported in km and as one-way delay). This is a
+heuristic over the sampled slots, not a guarantee for other times.
+"""
+import argparse
+import json
+import time
+
+import h5py
+import numpy as np
+
+from earth_geometry import SPEED_OF_LIGHT_KM_S, lon_lat_alt_to_cartesian
+from walker_generator import EARTH_ROTATION_RAD_S, cartesian_to_lon_lat_alt, propagate_walker_delta
+
+
+def walker_parameters(h5_file_path):
+    """The Walker parameters stored by walker_generator.py, or None for other files."""
+    with h5py.File(h5_file_path, 'r') as f:
+        metadata = f.attrs.get('generator')
+    if metadata is None:
+        return None
+    metadata = json.loads(metadata)
+    return metadata if metadata.get('type') == 'walker_delta' else None
+
+
+def rotate_z(xyz, angle_rad):
+    """Rotates (..., N, 3) vectors about the Earth axis by per-time angles of shape (...)."""
+    cos_a, sin_a = np.cos(angle_rad)[..., None], np.sin(angle_rad)[..., None]
+    x, y = xyz[..., 0], xyz[..., 1]
+    return np.stack([cos_a * x - sin_a * y, sin_a * x + cos_a * y, xyz[..., 2]], axis=-1)
+
+
+def slerp(start, end, fraction):
+    """
+    Spherical interpolation of (..., 3) vectors: direction along the great
+    circle, length linearly. 'fraction' broadcasts against start[..., 0].
+    """
+    start_radius = np.linalg.norm(start, axis=-1)
+    end_radius = np.linalg.norm(end, axis=-1)
+    a, b = start / start_radius[..., None], end / end_radius[..., None]
+    angle = np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), np.einsum('...k,...k->...', a, b))
+    small = angle < 1e-9
+    sin_angle = np.where(small, 1.0, np.sin(angle))
+    weight_a = np.where(small, 1.0 - fraction, np.sin((1.0 - fraction) * angle) / sin_angle)
+    weight_b = np.where(small, fraction, np.sin(fraction * angle) / sin_angle)
+    direction = weight_a[..., None] * a + weight_b[..., None] * b
+    direction /= np.linalg.norm(direction, axis=-1, keepdims=True)
+    return direction * ((1.0 - fraction) * start_radius + fraction * end_radius)[..., None]
+
+
+class PositionInterpolator:
+    """Satellite positions of one shell at arbitrary times between stored timeslots."""
+
+    def __init__(self, reader, time_step_s=60, method='auto'):
+        self.reader = reader
+        self.walker = walker_parameters(reader.h5_file_path) if method in ('auto', 'analytic') else None
+        if method == 'analytic' and self.walker is None:
+            raise ValueError(f"{reader.h5_file_path} has no Walker parameters; use method='slerp'.")
+        self.method = 'analytic' if self.walker is not None else 'slerp'
+        self.time_step_s = self.walker['time_step_s'] if self.walker is not None else time_step_s
+        self.first_time_s = self.time_step_s
+        self.last_time_s = reader.num_timeslots * self.time_step_s
+        self._inertial = None
+
+    def _stored_inertial(self):
+        """(T, N, 3) stored positions in the inertial frame, loaded once."""
+        if self._inertial is None:
+            positions = np.asarray(self.reader.positions_range(1, self.reader.num_timeslots), dtype=np.float64)
+            xyz = lon_lat_alt_to_cartesian(positions[..., 0], positions[..., 1], positions[..., 2])
+            slot_times = np.arange(1, self.reader.num_timeslots + 1) * self.time_step_s
+            self._inertial = rotate_z(xyz, EARTH_ROTATION_RAD_S * slot_times)
+        return self._inertial
+
+    def cartesian_at(self, times_s, satellites=None):
+        """
+        (len(times_s), N, 3) Earth-fixed positions in km; 'satellites'
+        optionally selects 1-based satellite IDs.
+        """
+        times = np.atleast_1d(np.asarray(times_s, dtype=np.float64))
+        if times.min() < self.first_time_s - 1e-9 or times.max() > self.last_time_s + 1e-9:
+            raise ValueError(f"Times must lie within the stored range "
+                             f"[{self.first_time_s}, {self.last_time_s}] s.")
+        if self.method == 'analytic':
+            w = self.walker
+            xyz = propagate_walker_delta(w['planes'], w['sats_per_plane'], w['phasing'], w['altitude_km'],
+                                         w['inclination_deg'], times)
+            return xyz if satellites is None else xyz[:, np.asarray(satellites) - 1]
+
+        inertial = self._stored_inertial()
+        if satellites is not None:
+            inertial = inertial[:, np.asarray(satellites) - 1]
+        slot_position = times / self.time_step_s - 1.0  # 0-based fractional slot index
+        lower = np.clip(np.floor(slot_position).astype(np.int64), 0, max(len(inertial) - 2, 0))
+        upper = np.minimum(lower + 1, len(inertial) - 1)
+        fraction = np.clip(slot_position - lower, 0.0, 1.0)[:, None]
+        return rotate_z(slerp(inertial[lower], inertial[upper], fraction), -EARTH_ROTATION_RAD_S * times)
+
+    def positions_at(self, times_s, satellites=None):
+        """(len(times_s), N, 3) [lon, lat, alt] like SnapshotReader.positions_range()."""
+        return cartesian_to_lon_lat_alt(self.cartesian_at(times_s, satellites))
+
+    def sample(self, step_s=1.0, start_s=None, end_s=None, satellites=None):
+        """Fine-grained positions every 'step_s' seconds; returns (times, positions)."""
+        start_s = self.first_time_s if start_s is None else start_s
+        end_s = self.last_time_s if end_s is None else end_s
+        times = np.arange(start_s, end_s + 1e-9, step_s)
+        return times, self.positions_at(times, satellites)
+
+    def estimate_error(self):
+        """
+        Leave-one-out error of slot interpolation over 2 dT, and the
+        error estimated at dT (a quarter of it, assuming quadratic
+        growth), in km and seconds of delay. Not a bound.
+        """
+        inertial = self._stored_inertial()
+        if len(inertial) < 3:
+            raise ValueError("Need at least 3 stored timeslots to estimate the error.")
+        estimate = slerp(inertial[:-2], inertial[2:], np.full((len(inertial) - 2, 1), 0.5))
+        errors = np.linalg.norm(estimate - inertial[1:-1], axis=-1)
+        estimated_km = float(errors.max()) / 4
+        return {'max_km_at_2dt': float(errors.max()), 'mean_km_at_2dt': float(errors.mean()),
+                'estimated_km': estimated_km, 'estimated_delay_s': estimated_km / SPEED_OF_LIGHT_KM_S}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sub-timeslot satellite position interpolation.")
+    parser.add_argument('--constellation', default='Telesat')
+    parser.add_argument('--shell', default='shell1')
+    parser.add_argument('--time-step', type=int, default=60, help="dT of the pre-computation in seconds")
+    parser.add_argument('--method', choices=['auto', 'slerp', 'analytic'], default='auto')
+    parser.add_argument('--sample-step', type=float, default=1.0, help="seconds between samples")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from snapshot_reader import SnapshotReader, h5_path_for
+
+    args = parse_args()
+    with SnapshotReader(h5_path_for(args.constellation), args.shell) as reader:
+        interpolator = PositionInterpolator(reader, args.time_step, args.method)
+        print("\n======================================================================")
+        print(f"  {args.constellation}/{args.shell}: {reader.num_satellites} satellites, "
+              f"{reader.num_timeslots} slots of {interpolator.time_step_s} s, method '{interpolator.method}'")
+        print("======================================================================")
+
+        if interpolator.method == 'slerp':
+            error = interpolator.estimate_error()
+            print(f"  Leave-one-out error at 2 dT: max {error['max_km_at_2dt']:.4f} km, "
+                  f"mean {error['mean_km_at_2dt']:.4f} km")
+            print(f"  Estimated error at dT:       {error['estimated_km']:.4f} km "
+                  f"({error['estimated_delay_s'] * 1e6:.3f} us of delay)")
+            print("  (a heuristic, not a bound; Walker files from walker_generator.py are interpolated exactly)")
+
+        start_time = time.perf_counter()
+        times, positions = interpolator.sample(args.sample_step)
+        elapsed = time.perf_counter() - start_time
+        print(f"  Sampled {len(times)} instants x {positions.shape[1]} satellites every {args.sample_step} s "
+              f"in {elapsed:.2f} s ({positions.shape[0] * positions.shape[1] / elapsed / 1e6:.1f} M positions/s)")
@@ -0,0 +1,72 @@
+"""
+================================================================
+Typed Numeric Position Datasets for Constellation H5 Files
+================================================================
+The pre-computation writes 'position/<shell>/timeslot<t>' as (N, 3)
+arrays of STRINGS, so every read parses each coordinate and the file
+is several times larger than the numbers it holds. This module adds
+a typed layout next to it:
+
+    position_array/<shell>   (T, N, 3) float64 (or float32) [lon, lat, alt]
+
+stored as one contiguous dataset, so a whole-orbit load is a single
+read and one timeslot is a single hyperslab. migrate_positions()
+converts existing files; SnapshotReader reads the typed dataset when
+present and falls back to parsing the string groups otherwise.
+"""
+import time
+
+import h5py
+import numpy as np
+
+TYPED_POSITION_GROUP = 'position_array'
+COLUMNS = ['lon', 'lat', 'alt']
+
+
+def write_positions(h5_file, shell_name, positions):
+    """Writes a (T, N, 3) float array as the typed position dataset of a shell."""
+    group = h5_file.require_group(TYPED_POSITION_GROUP)
+    if shell_name in group:
+        del group[shell_name]
+    dataset = group.create_dataset(shell_name, data=positions)
+    dataset.attrs['columns'] = ','.join(COLUMNS)
+    return dataset
+
+
+def parse_string_positions(raw):
+    """Compatibility path: (N, 3) string/bytes coordinates -> float64 array."""
+    return np.asarray(raw).astype(np.float64)
+
+
+def migrate_positions(h5_file_path, shell_name, dtype=np.float64, drop_strings=False):
+    """
+    Converts 'position/<shell>' string datasets to the typed layout, in place.
+    With 'drop_strings' the string group is deleted afterwards (run h5repack
+    to reclaim the space). Returns the (T, N, 3) shape written.
+    """
+    with h5py.File(h5_file_path, 'a') as h5_file:
+        string_group = h5_file['position'][shell_name]
+        num_timeslots = len(string_group.keys())
+        num_satellites = string_group['timeslot1'].shape[0]
+
+        positions = np.empty((num_timeslots, num_satellites, len(COLUMNS)), dtype=dtype)
+        for t in range(1, num_timeslots + 1):
+            positions[t - 1] = parse_string_positions(string_group[f'timeslot{t}'][()])
+        write_positions(h5_file, shell_name, positions)
+
+        if drop_strings:
+            del h5_file['position'][shell_name]
+    return positions.shape
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Usage: python position_store.py <h5 file> <shell name> [float32|float64]
+    h5_file_path, shell_name = sys.argv[1], sys.argv[2]
+    dtype = np.dtype(sys.argv[3]) if len(sys.argv) > 3 else np.float64
+
+    start_time = time.time()
+    shape = migrate_positions(h5_file_path, shell_name, dtype)
+    print(f"Migrated {shape[0]} timeslots x {shape[1]} satellites to {TYPED_POSITION_GROUP}/{shell_name} "
+          f"({np.dtype(dtype).name}) in {time.time() - start_time:.2f} seconds.")
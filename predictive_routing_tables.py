@@ -0,0 +1,255 @@
+"""
+======================================================================
+Look-Ahead Predictive Routing Tables
+======================================================================
+ai_routing_comparison.py predicts link weights and runs Dijkstra for
+the current timeslot only, inside the measurement loop. This pipeline
+stage does the work ahead of time for a horizon of k future timeslots:
+
+1. Predict every link weight of every slot in ONE bulk model call.
+2. Compute a next-hop routing table per slot (all destinations), with
+   the slots spread over a process pool.
+3. Store the tables compactly as an int16/int32 (k, N, N) array.
+
+At simulation time routing is a table lookup, so table build
+throughput and lookup latency can be measured apart from prediction.
+"""
+import argparse
+import time
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from constellation_index import ConstellationIndex
+from snapshot_reader import SnapshotReader, h5_path_for, nearest_satellite
+from tracing import count, span, traced
+
+NO_ROUTE = -1
+
+
+# --- 1. Bulk Link Weight Prediction ---
+def predict_link_weights(model, reader, timeslots, index):
+    """
+    Predicts the weight of every ISL in every timeslot with a single
+    model.predict call ('index' is a ConstellationIndex). Returns a list
+    of (src, dst, predicted_weights) per timeslot.
+    """
+    slot_edges = [reader.edges(t) for t in timeslots]
+    counts = [len(src) for src, _, _ in slot_edges]
+
+    all_src = np.concatenate([src for src, _, _ in slot_edges])
+    all_dst = np.concatenate([dst for _, dst, _ in slot_edges])
+    features = pd.DataFrame({
+        'time_slot': np.repeat(np.asarray(timeslots), counts),
+        'is_inter_plane': index.is_inter_plane(all_src, all_dst).astype(np.int64),
+    })
+    with span('model.predict', slots=len(timeslots)):
+        predicted = np.asarray(model.predict(features), dtype=np.float64)
+    count('model.predicted_links', len(features))
+
+    split_points = np.cumsum(counts)[:-1]
+    return [(src, dst, weights) for (src, dst, _), weights
+            in zip(slot_edges, np.split(predicted, split_points))]
+
+
+# --- 2. Routing Table Computation ---
+@traced('route.next_hop_table')
+def compute_next_hop_table(num_satellites, src, dst, weights):
+    """
+    Computes the next-hop table of one timeslot: next_hop[s, d] is the
+    0-based index of the neighbour that s forwards to for destination d
+    (NO_ROUTE if d is unreachable, s itself if s == d).
+
+    All-pairs Dijkstra returns predecessor[d, s] = the node before s on
+    the shortest path from d to s. On an undirected graph that node is
+    exactly the next hop from s towards d, so the table is its transpose.
+    """
+    # Predicted weights can be <= 0; csgraph treats 0 as "no edge".
+    weights = np.maximum(weights, np.finfo(np.float64).tiny)
+    adjacency = csr_matrix((weights, (src - 1, dst - 1)), shape=(num_satellites, num_satellites))
+    _, predecessors = dijkstra(adjacency, directed=False, return_predecessors=True)
+
+    dtype = np.int16 if num_satellites < np.iinfo(np.int16).max else np.int32
+    next_hop = predecessors.T.astype(dtype)
+    next_hop[next_hop < 0] = NO_ROUTE
+    np.fill_diagonal(next_hop, np.arange(num_satellites, dtype=dtype))
+    return next_hop
+
+
+def _next_hop_worker(args):
+    return compute_next_hop_table(*args)
+
+
+class RoutingTables:
+    """Next-hop tables for a horizon of timeslots, looked up by satellite ID."""
+
+    def __init__(self, timeslots, next_hop):
+        self.timeslots = np.asarray(timeslots, dtype=np.int32)
+        self.next_hop = next_hop
+        self._slot_row = {int(t): i for i, t in enumerate(self.timeslots)}
+
+    def table(self, time_slot):
+        """The (N, N) 0-based next-hop table of a timeslot."""
+        return self.next_hop[self._slot_row[time_slot]]
+
+    def lookup_next_hop(self, time_slot, src_id, dst_id):
+        """Returns the satellite ID src forwards to for dst (None if unreachable)."""
+        hop = self.next_hop[self._slot_row[time_slot], src_id - 1, dst_id - 1]
+        return None if hop == NO_ROUTE else int(hop) + 1
+
+    def lookup_path(self, time_slot, src_id, dst_id):
+        """Follows the next-hop table from src to dst; returns satellite IDs or None."""
+        table = self.table(time_slot)
+        current, target = src_id - 1, dst_id - 1
+        path = [src_id]
+        while current != target:
+            current = int(table[current, target])
+            if current == NO_ROUTE or len(path) > table.shape[0]:
+                return None
+            path.append(current + 1)
+        return path
+
+    def save(self, output_file):
+        np.savez_compressed(output_file, timeslots=self.timeslots, next_hop=self.next_hop)
+
+    @classmethod
+    def load(cls, input_file):
+        with np.load(input_file) as data:
+            return cls(data['timeslots'], data['next_hop'])
+
+
+def build_routing_tables(predicted_slots, timeslots, num_satellites, max_workers=None):
+    """Computes the next-hop table of every timeslot in parallel worker processes."""
+    jobs = [(num_satellites, src, dst, weights) for src, dst, weights in predicted_slots]
+    if max_workers == 1:
+        tables = [_next_hop_worker(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            tables = list(executor.map(_next_hop_worker, jobs))
+    return RoutingTables(timeslots, np.stack(tables))
+
+
+# --- 3. Pipeline Entry Point ---
+def walker_index(h5_file_path, shell_name, walker=None):
+    """
+    ConstellationIndex from an (orbits, satellites per orbit) layout, or
+    from the Walker parameters walker_generator.py stores in the H5 file.
+    """
+    if walker is None:
+        from position_interpolation import walker_parameters
+
+        metadata = walker_parameters(h5_file_path)
+        if metadata is None:
+            raise ValueError(f"{h5_file_path} stores no Walker parameters; pass walker=(orbits, sats per orbit).")
+        walker = (metadata['planes'], metadata['sats_per_plane'])
+    return ConstellationIndex.walker(*walker, shell_name=shell_name)
+
+
+def precompute_routing_tables(h5_file_path=None, shell_name='shell1', walker=None,
+                              model_file='delay_predictor.joblib', output_file='routing_tables.npz',
+                              start_slot=1, horizon=50, constellation_name="Telesat", time_step_s=60,
+                              max_workers=None):
+    """
+    Predicts and stores the next-hop tables of 'horizon' timeslots from
+    'start_slot' on. Only reads the H5 file; the StarPerf pre-computation
+    ('constellation_name', 'time_step_s') runs only if the file is missing.
+    """
+    import joblib
+
+    h5_file_path = h5_file_path or h5_path_for(constellation_name)
+    # (lon, lat) of the pair used for the lookup benchmark
+    source_location = (105.84, 21.02)   # Hanoi
+    target_location = (-43.17, -22.91)  # Rio de Janeiro
+
+    print("======================================================================")
+    print(f"Predictive Routing Tables: {horizon} timeslots from slot {start_slot}")
+    print("======================================================================")
+
+    # --- 3.2 Pre-computation (only if the H5 data does not exist) ---
+    if not os.path.exists(h5_file_path):
+        from experiment_runner import precompute_constellation
+
+        print("\nH5 file not found, running pre-computation...")
+        precompute_constellation(constellation_name, time_step_s)
+
+    reader = SnapshotReader(h5_file_path, shell_name)
+    index = walker_index(h5_file_path, shell_name, walker)
+
+    end_slot = min(start_slot + horizon, reader.num_timeslots + 1)
+    timeslots = list(range(start_slot, end_slot))
+    model = joblib.load(model_file)
+
+    # --- 3.3 Bulk Prediction ---
+    start_time = time.time()
+    predicted_slots = predict_link_weights(model, reader, timeslots, index)
+    predict_time = time.time() - start_time
+    num_links = sum(len(src) for src, _, _ in predicted_slots)
+    print(f"\nPredicted {num_links} link weights in {predict_time:.3f} s "
+          f"({num_links / predict_time:,.0f} links/s).")
+
+    # --- 3.4 Routing Table Build ---
+    start_time = time.time()
+    tables = build_routing_tables(predicted_slots, timeslots, reader.num_satellites, max_workers)
+    build_time = time.time() - start_time
+    print(f"Built {len(timeslots)} routing tables in {build_time:.3f} s "
+          f"({len(timeslots) / build_time:.1f} tables/s).")
+    tables.save(output_file)
+    print(f"Tables saved to {output_file} ({tables.next_hop.nbytes / 1e6:.1f} MB in memory, "
+          f"dtype {tables.next_hop.dtype}).")
+
+    # --- 3.5 Lookup Latency ---
+    rng = np.random.default_rng(42)
+    num_lookups = 100000
+    lookup_slots = rng.choice(tables.timeslots, num_lookups)
+    lookup_pairs = rng.integers(1, reader.num_satellites + 1, size=(num_lookups, 2))
+    start_time = time.perf_counter()
+    for t, (s, d) in zip(lookup_slots.tolist(), lookup_pairs.tolist()):
+        tables.lookup_next_hop(t, s, d)
+    next_hop_us = (time.perf_counter() - start_time) / num_lookups * 1e6
+
+    path_lookups = 0
+    start_time = time.perf_counter()
+    for t in timeslots:
+        positions = reader.positions(t)
+        start_id, _ = nearest_satellite(positions, *source_location)
+        end_id, _ = nearest_satellite(positions, *target_location)
+        path_start = time.perf_counter()
+        path = tables.lookup_path(t, start_id, end_id)
+        path_lookups += 1
+        if t == timeslots[0] and path:
+            print(f"\n  Slot {t}: {len(path) - 1} hops via table lookup "
+                  f"({(time.perf_counter() - path_start) * 1e6:.1f} us).")
+    path_total_s = time.perf_counter() - start_time
+
+    print("\n----------------------------------------------------")
+    print(f"  Prediction:        {predict_time:.3f} s for {len(timeslots)} slots")
+    print(f"  Table build:       {build_time:.3f} s ({len(timeslots) / build_time:.1f} tables/s)")
+    print(f"  Next-hop lookup:   {next_hop_us:.3f} us per lookup")
+    print(f"  Access + path:     {path_total_s / path_lookups * 1e3:.3f} ms per slot")
+    print("----------------------------------------------------")
+    reader.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Look-ahead predictive routing tables.")
+    parser.add_argument('--constellation', default='Telesat')
+    parser.add_argument('--shell', default='shell1')
+    parser.add_argument('--walker', type=int, nargs=2, default=[27, 13], metavar=('ORBITS', 'SATS'),
+                        help="orbit layout used for the is_inter_plane feature")
+    parser.add_argument('--model', default='delay_predictor.joblib')
+    parser.add_argument('--output', default='routing_tables.npz')
+    parser.add_argument('--start-slot', type=int, default=1)
+    parser.add_argument('--horizon', type=int, default=50, help="number of future timeslots")
+    parser.add_argument('--time-step', type=int, default=60, help="dT of a missing pre-computation")
+    parser.add_argument('--workers', type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    precompute_routing_tables(h5_path_for(args.constellation), args.shell, args.walker, args.model, args.output,
+                              args.start_slot, args.horizon, args.constellation, args.time_step, args.workers)
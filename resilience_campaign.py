@@ -0,0 +1,309 @@
+"""
+======================================================================
+Monte Carlo Resilience Campaign Runner
+======================================================================
+ai_resilience_test.py studies ONE pair (Beijing-New York) at ONE
+timeslot with ONE failed satellite. This runner sweeps a scenario
+grid of timeslots x user pairs x failure models:
+
+- single_node:    one random satellite of the main path fails
+- k_random_nodes: k random satellites anywhere fail
+- top_risk:       the main-path satellite with the highest
+                  betweenness centrality fails (the original test)
+- link:           k random links of the main path fail
+
+For every scenario it records the proactive strategy (backup path
+pre-computed around the top-risk satellite, used if it survives the
+failure) against the reactive one (Dijkstra re-run after the failure):
+delay, hops and reroute time. Scenarios are grouped by timeslot and
+spread over a process pool; each worker opens the snapshot once and
+caches the graph and centrality of its current slot. Finished chunks
+are appended to a checkpoint file so an interrupted campaign resumes
+where it stopped. The aggregate is written as a columnar file
+(Parquet if pyarrow is installed, CSV otherwise).
+"""
+import argparse
+import importlib.util
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import networkx as nx
+import numpy as np
+
+from shared_snapshot_store import SharedSnapshotStore
+from snapshot_reader import SnapshotReader, h5_path_for, nearest_satellite
+from tracing import count, span
+
+USER_PAIRS = {
+    'Beijing-NewYork': ((116.41, 39.9), (-74.00, 40.43)),
+    'Hanoi-Rio_de_Janeiro': ((105.84, 21.02), (-43.17, -22.91)),
+    'San_Francisco-Sydney': ((-122.42, 37.77), (151.21, -33.87)),
+}
+FAILURE_MODELS = [('single_node', 1), ('k_random_nodes', 3), ('top_risk', 1), ('link', 1)]
+
+
+# --- 1. Scenario Grid ---
+def build_scenarios(timeslots, user_pairs, failure_models, seeds_per_model):
+    """Returns a list of scenario dicts, ordered by timeslot."""
+    scenarios = []
+    for t in timeslots:
+        for pair_name, (source, target) in user_pairs.items():
+            for model_name, k in failure_models:
+                # top_risk is deterministic, one draw is enough
+                seeds = [0] if model_name == 'top_risk' else range(seeds_per_model)
+                for seed in seeds:
+                    scenarios.append({
+                        'scenario_id': f"t{t}|{pair_name}|{model_name}|k{k}|s{seed}",
+                        'timeslot': t, 'pair': pair_name, 'source': source, 'target': target,
+                        'failure_model': model_name, 'k': k, 'seed': seed,
+                    })
+    return scenarios
+
+
+# --- 2. Worker State (one snapshot per worker process) ---
+_reader = None
+_slot_cache = {}
+_betweenness_samples = None
+
+
+def _init_worker(reader, betweenness_samples):
+    global _reader, _betweenness_samples
+    _reader = reader
+    _betweenness_samples = betweenness_samples
+
+
+def _slot_state(time_slot):
+    """Graph, positions and betweenness of a timeslot, cached for the current slot only."""
+    if time_slot not in _slot_cache:
+        _slot_cache.clear()
+        G = _reader.graph(time_slot, integer_nodes=True)
+        with span('risk.betweenness', slot=time_slot):
+            risk = nx.betweenness_centrality(G, k=_betweenness_samples, weight='weight', normalized=True, seed=0)
+        _slot_cache[time_slot] = (G, _reader.positions(time_slot), risk)
+    return _slot_cache[time_slot]
+
+
+def _path_metrics(G, path):
+    if not path:
+        return float('nan'), -1
+    return nx.path_weight(G, path, weight='weight'), len(path) - 1
+
+
+def _choose_failures(G, main_path, risk, model_name, k, rng):
+    """Returns (failed_nodes, failed_links) for one failure model."""
+    inner = main_path[1:-1]
+    if model_name == 'top_risk':
+        return ([max(inner, key=lambda n: risk.get(n, 0))] if inner else []), []
+    if model_name == 'single_node':
+        return ([int(rng.choice(inner))] if inner else []), []
+    if model_name == 'k_random_nodes':
+        candidates = np.setdiff1d(np.fromiter(G.nodes, dtype=np.int64), [main_path[0], main_path[-1]])
+        return rng.choice(candidates, size=min(k, len(candidates)), replace=False).tolist(), []
+    if model_name == 'link':
+        links = list(zip(main_path[:-1], main_path[1:]))
+        chosen = rng.choice(len(links), size=min(k, len(links)), replace=False)
+        return [], [links[i] for i in chosen]
+    raise ValueError(f"Unknown failure model: {model_name}")
+
+
+def _path_survives(path, failed_nodes, failed_links):
+    if not path:
+        return False
+    if set(path) & set(failed_nodes):
+        return False
+    path_links = set(zip(path[:-1], path[1:])) | set(zip(path[1:], path[:-1]))
+    return not (path_links & set(failed_links))
+
+
+def run_scenario(scenario):
+    G, positions, risk = _slot_state(scenario['timeslot'])
+    start_node, _ = nearest_satellite(positions, *scenario['source'])
+    end_node, _ = nearest_satellite(positions, *scenario['target'])
+    result = {key: scenario[key] for key in ('scenario_id', 'timeslot', 'pair', 'failure_model', 'k', 'seed')}
+    result.update(start_node=start_node, end_node=end_node)
+
+    try:
+        with span('route.dijkstra'):
+            main_path = nx.dijkstra_path(G, start_node, end_node, weight='weight')
+    except (nx.NetworkXNoPath, nx.NodeNotFound):
+        # NodeNotFound: the nearest satellite has no ISL in this slot
+        result['status'] = 'no_main_path'
+        return result
+    result['main_delay'], result['main_hops'] = _path_metrics(G, main_path)
+
+    # Proactive: backup path around the riskiest satellite, computed before any failure
+    inner = main_path[1:-1]
+    backup_path = None
+    if inner:
+        riskiest = max(inner, key=lambda n: risk.get(n, 0))
+        G_backup = G.copy()
+        G_backup.remove_node(riskiest)
+        try:
+            with span('route.dijkstra_backup'):
+                backup_path = nx.dijkstra_path(G_backup, start_node, end_node, weight='weight')
+        except nx.NetworkXNoPath:
+            backup_path = None
+
+    # Failure
+    rng = np.random.default_rng(zlib.crc32(scenario['scenario_id'].encode()))
+    failed_nodes, failed_links = _choose_failures(G, main_path, risk, scenario['failure_model'], scenario['k'], rng)
+    result['failed'] = json.dumps({'nodes': [int(n) for n in failed_nodes],
+                                   'links': [[int(u), int(v)] for u, v in failed_links]})
+    G_failed = G.copy()
+    G_failed.remove_nodes_from(failed_nodes)
+    G_failed.remove_edges_from(failed_links)
+    result['main_affected'] = not _path_survives(main_path, failed_nodes, failed_links)
+
+    # Reactive: re-run Dijkstra on the failed network
+    start_reroute_time = time.perf_counter()
+    try:
+        with span('route.dijkstra_reactive'):
+            reactive_path = nx.dijkstra_path(G_failed, start_node, end_node, weight='weight')
+    except (nx.NetworkXNoPath, nx.NodeNotFound):
+        reactive_path = None
+    reactive_ms = (time.perf_counter() - start_reroute_time) * 1000
+    if not result['main_affected']:
+        reactive_path, reactive_ms = main_path, 0.0
+    result['reactive_delay'], result['reactive_hops'] = _path_metrics(G, reactive_path)
+    result['reactive_reroute_ms'] = reactive_ms
+
+    # Proactive: switch to the backup if it survived, otherwise fall back to reactive
+    if not result['main_affected']:
+        proactive_path, proactive_ms, backup_valid = main_path, 0.0, True
+    elif _path_survives(backup_path, failed_nodes, failed_links):
+        proactive_path, proactive_ms, backup_valid = backup_path, 0.0, True
+    else:
+        proactive_path, proactive_ms, backup_valid = reactive_path, reactive_ms, False
+    result['backup_valid'] = backup_valid
+    result['proactive_delay'], result['proactive_hops'] = _path_metrics(G, proactive_path)
+    result['proactive_reroute_ms'] = proactive_ms
+    result['status'] = 'ok' if reactive_path else 'disconnected'
+    count('resilience.scenarios')
+    return result
+
+
+def _run_chunk(scenarios):
+    return [run_scenario(scenario) for scenario in scenarios]
+
+
+# --- 3. Checkpointing ---
+def load_checkpoint(checkpoint_file):
+    if not os.path.exists(checkpoint_file):
+        return []
+    with open(checkpoint_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def results_file(output_file):
+    """
+    The path write_results() produces for 'output_file': a '.parquet'
+    name becomes '.csv' when no Parquet engine is installed.
+    """
+    stem, extension = os.path.splitext(output_file)
+    if extension == '.parquet' and not any(importlib.util.find_spec(engine)
+                                           for engine in ('pyarrow', 'fastparquet')):
+        return stem + '.csv'
+    return output_file
+
+
+def write_results(results, output_file):
+    """Columnar output: Parquet when available, CSV otherwise. Returns the path written."""
+    import pandas as pd
+
+    df = pd.DataFrame(results).sort_values(['timeslot', 'pair', 'failure_model', 'seed'])
+    output_file = results_file(output_file)
+    if output_file.endswith('.parquet'):
+        df.to_parquet(output_file, index=False)
+    else:
+        df.to_csv(output_file, index=False)
+    return output_file
+
+
+# --- 4. Campaign Driver ---
+def run_campaign(reader, scenarios, output_file, num_workers=None, chunk_size=16,
+                 betweenness_samples=None, fresh=False):
+    checkpoint_file = output_file + '.partial.jsonl'
+    if fresh and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    results = load_checkpoint(checkpoint_file)
+    done = {result['scenario_id'] for result in results}
+    pending = [scenario for scenario in scenarios if scenario['scenario_id'] not in done]
+    print(f"{len(scenarios)} scenarios: {len(done)} already done, {len(pending)} to run.")
+
+    # Contiguous chunks keep one timeslot per chunk as far as possible
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    # Workers reopen the H5 file themselves; never share an open handle across fork
+    reader.close()
+    start_time = time.time()
+    with open(checkpoint_file, 'a') as checkpoint, \
+            ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                initargs=(reader, betweenness_samples)) as executor:
+        futures = [executor.submit(_run_chunk, chunk) for chunk in chunks]
+        for completed, future in enumerate(as_completed(futures), start=1):
+            chunk_results = future.result()
+            for result in chunk_results:
+                checkpoint.write(json.dumps(result) + '\n')
+            checkpoint.flush()
+            results.extend(chunk_results)
+            if completed % 10 == 0 or completed == len(futures):
+                print(f"  {completed}/{len(futures)} chunks done ({time.time() - start_time:.1f} s)")
+
+    # pandas is imported only after the pool is shut down, so forked
+    # workers never inherit it
+    import pandas as pd
+
+    written = write_results(results, output_file)
+    print(f"Results saved to {written}")
+    return pd.DataFrame(results)
+
+
+def summarize_campaign(df):
+    ok = df[df['status'] == 'ok']
+    summary = ok.groupby('failure_model').agg(
+        scenarios=('scenario_id', 'count'),
+        main_affected=('main_affected', 'mean'),
+        backup_valid=('backup_valid', 'mean'),
+        proactive_delay=('proactive_delay', 'mean'),
+        reactive_delay=('reactive_delay', 'mean'),
+        proactive_hops=('proactive_hops', 'mean'),
+        reactive_hops=('reactive_hops', 'mean'),
+        proactive_reroute_ms=('proactive_reroute_ms', 'mean'),
+        reactive_reroute_ms=('reactive_reroute_ms', 'mean'),
+    )
+    print("\n======================================================================")
+    print("                 Resilience Campaign Summary (means)")
+    print("======================================================================")
+    print(summary.to_string(float_format=lambda x: f"{x:.4f}"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Monte Carlo resilience campaign.")
+    parser.add_argument('--constellation', default='Telesat')
+    parser.add_argument('--shell', default='shell1')
+    parser.add_argument('--slot-step', type=int, default=10, help="evaluate every n-th timeslot")
+    parser.add_argument('--seeds', type=int, default=3, help="random draws per failure model")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--betweenness-samples', type=int, default=None,
+                        help="sample k sources for betweenness (default: exact)")
+    parser.add_argument('--output', default='resilience_campaign.parquet')
+    parser.add_argument('--fresh', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--shared-memory', action='store_true',
+                        help="load the snapshot once into shared memory for all workers")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    reader = SnapshotReader(h5_path_for(args.constellation), args.shell)
+    if args.shared_memory:
+        with reader:
+            reader = SharedSnapshotStore.from_reader(reader)
+    scenarios = build_scenarios(range(1, reader.num_timeslots + 1, args.slot_step), USER_PAIRS,
+                                FAILURE_MODELS, args.seeds)
+    with reader:
+        df = run_campaign(reader, scenarios, args.output, args.workers,
+                          betweenness_samples=args.betweenness_samples, fresh=args.fresh)
+    summarize_campaign(df)
@@ -1,39 +1,119 @@
+import os
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 import random
 
+from earth_geometry import central_angle_rad, grid_cell_centers, visibility_central_angle_rad
+from tracing import traced
+
+# Trajectories already loaded in this process, keyed by absolute path.
+# Every SatelliteEnv built from the same file shares one read-only buffer.
+_TRAJECTORY_CACHE = {}
+
+def load_trajectory(trajectory_file):
+    """
+    Loads a trajectory ONCE as a read-only (T, 2) float32 array of [lat, lon].
+    - '.npz' (written by extract_single_sat_data.py) is decompressed into a
+      contiguous array. Indexing an NpzFile re-reads the zip on every access.
+    - '.npy' (written by convert_trajectory_to_npy) is memory-mapped, so all
+      processes on the machine share the same pages of the OS file cache.
+    """
+    key = os.path.abspath(trajectory_file)
+    if key not in _TRAJECTORY_CACHE:
+        if trajectory_file.endswith('.npy'):
+            trajectory = np.load(trajectory_file, mmap_mode='r')
+        else:
+            with np.load(trajectory_file) as data:
+                trajectory = np.stack([data['lat'], data['lon']], axis=1).astype(np.float32)
+            trajectory.setflags(write=False)
+        _TRAJECTORY_CACHE[key] = trajectory
+    return _TRAJECTORY_CACHE[key]
+
+def convert_trajectory_to_npy(trajectory_file, output_file=None):
+    """Writes an '.npz' trajectory as a raw (T, 2) float32 '.npy' file for memory-mapping."""
+    if output_file is None:
+        output_file = os.path.splitext(trajectory_file)[0] + '.npy'
+    np.save(output_file, np.ascontiguousarray(load_trajectory(trajectory_file), dtype=np.float32))
+    return output_file
+
+def compute_visibility_masks(trajectory, altitude_km, min_elevation_deg, grid_rows=18, grid_cols=36,
+                             chunk_size=4096):
+    """
+    For every timestep of a (T, 2) [lat, lon] trajectory, marks the grid
+    cells whose centre sees the satellite above 'min_elevation_deg'.
+    Returns a (T, ceil(cells / 8)) uint8 bitset (np.packbits order).
+    The whole trajectory is processed at once, in chunks of timesteps to
+    bound the temporary (chunk, cells) angle matrix.
+    """
+    cell_lat, cell_lon = grid_cell_centers(grid_rows, grid_cols)
+    max_angle = visibility_central_angle_rad(altitude_km, min_elevation_deg)
+    packed = []
+    for start in range(0, len(trajectory), chunk_size):
+        chunk = np.asarray(trajectory[start:start + chunk_size], dtype=np.float64)
+        angles = central_angle_rad(chunk[:, 0:1], chunk[:, 1:2], cell_lat[None, :], cell_lon[None, :])
+        packed.append(np.packbits(angles <= max_angle, axis=1))
+    return np.concatenate(packed)
+
+def build_demand_map():
+    """
+    Returns the simplified user demand map shared by all beam steering envs.
+    A 36x18 grid representing the world (each cell is 10x10 degrees);
+    higher values mean more users.
+    """
+    demand_map = np.zeros((18, 36))
+    # Add high-demand zones (e.g., North America, Europe, East Asia)
+    demand_map[12:15, 2:7] = 10  # North America
+    demand_map[12:15, 18:24] = 12 # Europe
+    demand_map[9:12, 28:34] = 15 # East Asia
+    return demand_map
+
 class SatelliteEnv(gym.Env):
     """
     A custom environment for a single satellite beam steering problem.
     - State: Satellite's current lat/lon.
     - Action: Choose which grid cells to point beams at.
     - Reward: Total user demand covered by the beams.
+
+    With 'min_elevation_deg' set, the env precomputes which cells are visible
+    from the satellite at every timestep and exposes them through
+    action_masks(), the hook used by sb3_contrib's MaskablePPO.
     """
     metadata = {'render_modes': ['human']}
 
-    def __init__(self, trajectory_file='satellite_1_trajectory.npz'):
+    def __init__(self, trajectory_file='satellite_1_trajectory.npz', trajectory=None, coverage_index=None,
+                 min_elevation_deg=None, altitude_km=1015.0):
         super(SatelliteEnv, self).__init__()
 
         # --- 1. Load Satellite Trajectory ---
-        self.trajectory = np.load(trajectory_file)
-        self.total_timesteps = len(self.trajectory['lat'])
+        # A (T, 2) [lat, lon] array; pass 'trajectory' to share an already
+        # loaded buffer instead of reading the file again.
+        if trajectory is None:
+            trajectory = load_trajectory(trajectory_file)
+        self.trajectory = trajectory
+        self.total_timesteps = len(self.trajectory)
         self.current_timestep = 0
 
         # --- 2. Define User Demand Map (Simplified) ---
-        # Create a 36x18 grid representing the world (each cell is 10x10 degrees)
-        # Higher values mean more users.
-        self.demand_map = np.zeros((18, 36))
-        # Add high-demand zones (e.g., North America, Europe, East Asia)
-        self.demand_map[12:15, 2:7] = 10  # North America
-        self.demand_map[12:15, 18:24] = 12 # Europe
-        self.demand_map[9:12, 28:34] = 15 # East Asia
+        self.demand_map = build_demand_map()
+
+        # Optional high-fidelity reward model (see coverage_index.py). When set,
+        # each beam is scored by its footprint on a fine demand raster.
+        self.coverage_index = coverage_index
 
         # --- 3. Define Constants ---
         self.NUM_BEAMS = 4 # Our satellite has 4 beams
         self.GRID_ROWS = 18
         self.GRID_COLS = 36
 
+        # Optional visibility masks: one packed bit per grid cell and timestep.
+        # altitude_km defaults to the Telesat shell, since the trajectory
+        # files only store lat/lon.
+        self.visibility_masks = None
+        if min_elevation_deg is not None:
+            self.visibility_masks = compute_visibility_masks(self.trajectory, altitude_km, min_elevation_deg,
+                                                             self.GRID_ROWS, self.GRID_COLS)
+
         # --- 4. Define Action and Observation Space (Crucial for DRL) ---
         # Action Space: For each of the NUM_BEAMS, choose one of the GRID_COLS*GRID_ROWS cells.
         # This is a MultiDiscrete space, like 4 slot machines, each with 648 slots.
@@ -48,20 +128,32 @@ class SatelliteEnv(gym.Env):
 
     def _get_obs(self):
         """Returns the current observation (state) of the environment."""
-        lat = self.trajectory['lat'][self.current_timestep]
-        lon = self.trajectory['lon'][self.current_timestep]
-        return np.array([lat, lon], dtype=np.float32)
+        return np.array(self.trajectory[self.current_timestep], dtype=np.float32)
 
     def _get_info(self):
         """Returns auxiliary information (optional)."""
         return {'timestep': self.current_timestep}
 
+    def visible_cells(self):
+        """Boolean mask over grid cells visible at the current timestep."""
+        num_cells = self.GRID_ROWS * self.GRID_COLS
+        if self.visibility_masks is None:
+            return np.ones(num_cells, dtype=bool)
+        visible = np.unpackbits(self.visibility_masks[self.current_timestep], count=num_cells).astype(bool)
+        # Never hand a policy an all-False mask (e.g. a gap in coverage).
+        return visible if visible.any() else np.ones(num_cells, dtype=bool)
+
+    def action_masks(self):
+        """MaskablePPO format for MultiDiscrete: one cell mask per beam, concatenated."""
+        return np.tile(self.visible_cells(), self.NUM_BEAMS)
+
     def reset(self, seed=None, options=None):
         """Resets the environment to the beginning."""
         super().reset(seed=seed)
         self.current_timestep = 0
         return self._get_obs(), self._get_info()
 
+    @traced('env.step')
     def step(self, action):
         """
         Executes one time step in the environment.
@@ -72,6 +164,9 @@ class SatelliteEnv(gym.Env):
         """
         # --- Calculate Reward ---
         # The action is an array of indices, e.g., [10, 150, 34, 8]
+        if self.coverage_index is not None:
+            return self._advance(self.coverage_index.reward(action))
+
         total_reward = 0
         covered_cells = set()
         for cell_index in action:
@@ -82,27 +177,28 @@ class SatelliteEnv(gym.Env):
                 col = cell_index % self.GRID_COLS
                 total_reward += self.demand_map[row, col]
                 covered_cells.add(cell_index)
+        return self._advance(total_reward)
 
+    def _advance(self, total_reward):
+        """Moves to the next state and builds the step() return tuple."""
         # --- Move to the next state ---
         self.current_timestep += 1
 
         # --- Check if the episode is done ---
-        # The episode ends when the satellite has completed its trajectory
-        done = self.current_timestep >= (self.total_timesteps - 1)
+        # The episode ends when the satellite has completed its trajectory.
+        # That is a time limit, not a terminal state: terminated stays False
+        # and truncated is set, so agents still bootstrap from the last state.
+        truncated = self.current_timestep >= (self.total_timesteps - 1)
         
         # Get the next observation and info
         observation = self._get_obs()
         info = self._get_info()
 
-        # The 'truncated' flag is used for time limits, similar to 'done'
-        truncated = done
-
-        return observation, total_reward, done, truncated, info
+        return observation, total_reward, False, truncated, info
 
     def render(self):
         """A simple text-based rendering."""
-        lat = self.trajectory['lat'][self.current_timestep]
-        lon = self.trajectory['lon'][self.current_timestep]
+        lat, lon = self.trajectory[self.current_timestep]
         print(f"Timestep {self.current_timestep}: Sat at ({lat:.2f}, {lon:.2f})")
 
     def close(self):
@@ -0,0 +1,184 @@
+"""
+================================================================
+Shared-Memory Snapshot Store for Process Pools
+================================================================
+A SnapshotReader handed to a process pool is reopened by every
+worker, so each worker reads the same H5 data and keeps its own copy
+of it. SharedSnapshotStore loads the snapshot of one shell ONCE into
+multiprocessing.shared_memory blocks:
+
+- src, dst, delay, slot_offsets   all timeslots in the COO layout
+- positions                       (T, N, 3) [lon, lat, alt]
+- satellite_ids, orbit_ids, ...   the ConstellationIndex (optional)
+
+Workers attach to the blocks by name and get read-only NumPy views
+with the SnapshotReader API (edges, positions, positions_range,
+delay_matrix, graph), so it can be passed wherever a reader goes,
+e.g. as a process pool initializer argument. Pickling sends only the
+block names (the 'spec'), never the data.
+
+The process that created the store owns the blocks and must call
+unlink() (or use it as a context manager) when the pool is done.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from constellation_index import ConstellationIndex
+from snapshot_reader import SnapshotReader
+from tracing import traced
+
+INDEX_ARRAYS = ('satellite_ids', 'orbit_ids', 'in_orbit_indices')
+
+
+def _create_block(array):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, {'name': block.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+
+class SharedSnapshotStore(SnapshotReader):
+    """
+    Read-only snapshot in shared memory. Build it with from_reader() in
+    the parent process; every unpickled copy attaches lazily by name.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.h5_file_path = spec['h5_file_path']
+        self.shell_name = spec['shell_name']
+        self.num_timeslots = spec['num_timeslots']
+        self.num_satellites = spec['num_satellites']
+        self.delay_layout = 'coo'
+        self.typed_positions = True
+        self._owner = False
+        self._blocks = {}
+        self._arrays = None
+        self._index = None
+
+    @classmethod
+    def from_reader(cls, reader, index=None):
+        """Copies every timeslot of a SnapshotReader (and an optional index) into shared memory."""
+        slot_edges = [reader.edges(t) for t in range(1, reader.num_timeslots + 1)]
+        arrays = {
+            'src': np.concatenate([src for src, _, _ in slot_edges]).astype(np.int32),
+            'dst': np.concatenate([dst for _, dst, _ in slot_edges]).astype(np.int32),
+            'delay': np.concatenate([delays for _, _, delays in slot_edges]).astype(np.float64),
+            'slot_offsets': np.concatenate([[0], np.cumsum([len(src) for src, _, _ in slot_edges])]).astype(np.int64),
+            'positions': np.asarray(reader.positions_range(1, reader.num_timeslots)),
+        }
+        if index is not None:
+            ids = index.satellite_ids
+            arrays.update(satellite_ids=ids, orbit_ids=index.orbit_of[ids], in_orbit_indices=index.index_in_orbit[ids])
+
+        spec = {
+            'h5_file_path': reader.h5_file_path,
+            'shell_name': reader.shell_name,
+            'num_timeslots': reader.num_timeslots,
+            'num_satellites': reader.num_satellites,
+            'shell_index': index.shell_index if index is not None else 0,
+            'arrays': {},
+        }
+        blocks = {}
+        try:
+            for name, array in arrays.items():
+                blocks[name], spec['arrays'][name] = _create_block(np.ascontiguousarray(array))
+        except Exception:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+            raise
+
+        store = cls(spec)
+        store._owner = True
+        store._blocks = blocks
+        return store
+
+    # --- Shared memory management ---
+    def _attach(self):
+        """Maps every block (once per process) and returns read-only views by name."""
+        if self._arrays is None:
+            arrays = {}
+            for name, array_spec in self.spec['arrays'].items():
+                if name not in self._blocks:
+                    self._blocks[name] = shared_memory.SharedMemory(name=array_spec['name'])
+                view = np.ndarray(tuple(array_spec['shape']), dtype=np.dtype(array_spec['dtype']),
+                                  buffer=self._blocks[name].buf)
+                view.flags.writeable = False
+                arrays[name] = view
+            self._arrays = arrays
+        return self._arrays
+
+    @property
+    def nbytes(self):
+        return sum(int(np.prod(s['shape'])) * np.dtype(s['dtype']).itemsize for s in self.spec['arrays'].values())
+
+    def close(self):
+        """Detaches this process; views handed out before are invalid afterwards."""
+        self._arrays = None
+        self._index = None
+        for block in self._blocks.values():
+            block.close()
+        self._blocks = {}
+
+    def unlink(self):
+        """Frees the shared memory (owner only, once every worker is done)."""
+        names = [array_spec['name'] for array_spec in self.spec['arrays'].values()]
+        self.close()
+        if self._owner:
+            for name in names:
+                block = shared_memory.SharedMemory(name=name)
+                block.close()
+                block.unlink()
+            self._owner = False
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.unlink()
+
+    def __getstate__(self):
+        return {'spec': self.spec}
+
+    def __setstate__(self, state):
+        self.__init__(state['spec'])
+
+    # --- SnapshotReader API over shared arrays ---
+    @traced('shm.read_edges')
+    def edges(self, time_slot):
+        arrays = self._attach()
+        start, end = arrays['slot_offsets'][time_slot - 1], arrays['slot_offsets'][time_slot]
+        return arrays['src'][start:end], arrays['dst'][start:end], arrays['delay'][start:end]
+
+    @traced('shm.read_positions')
+    def positions(self, time_slot):
+        return self._attach()['positions'][time_slot - 1]
+
+    def positions_range(self, first_slot, last_slot):
+        return self._attach()['positions'][first_slot - 1:last_slot]
+
+    @property
+    def index(self):
+        """The ConstellationIndex stored with the snapshot (None if there is none)."""
+        if self._index is None and 'satellite_ids' in self.spec['arrays']:
+            arrays = self._attach()
+            self._index = ConstellationIndex(*(arrays[name] for name in INDEX_ARRAYS),
+                                             self.spec['shell_index'], self.shell_name)
+        return self._index
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    from snapshot_reader import h5_path_for
+
+    constellation_name = sys.argv[1] if len(sys.argv) > 1 else "Telesat"
+    shell_name = sys.argv[2] if len(sys.argv) > 2 else 'shell1'
+
+    start_time = time.time()
+    with SnapshotReader(h5_path_for(constellation_name), shell_name) as reader:
+        store = SharedSnapshotStore.from_reader(reader)
+    print(f"Loaded {store.num_timeslots} timeslots x {store.num_satellites} satellites "
+          f"({store.nbytes / 1e6:.1f} MB) into shared memory in {time.time() - start_time:.2f} s.")
+    with store:
+        src, dst, delays = store.edges(1)
+        print(f"Slot 1: {len(src)} ISLs, blocks: {', '.join(s['name'] for s in store.spec['arrays'].values())}")
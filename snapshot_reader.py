@@ -0,0 +1,167 @@
+"""
+================================================================
+Snapshot Reader for Pre-computed Constellation H5 Files
+================================================================
+The StarPerf pre-computation writes one dense delay matrix and one
+position table per timeslot into data/XML_constellation/<name>.h5.
+Every script used to reopen this file per timeslot and walk the
+(N+1)x(N+1) delay matrix with two Python loops. This module keeps
+the file open once and serves each timeslot as NumPy arrays:
+
+- edges(t):     (src_ids, dst_ids, delays) for every ISL
+- positions(t): (N, 3) float array of [lon, lat, alt]
+- graph(t):     the familiar NetworkX graph with 'satellite_<id>' nodes
+
+Satellite IDs are 1-based, as in the H5 file and the node names.
+Delays are read from the sparse 'delay_coo' layout (delay_store.py)
+when the file has it, and from the dense 'delay' matrices otherwise.
+Likewise positions come from the typed 'position_array' dataset
+(position_store.py) when present, else from the string tables.
+"""
+import h5py
+import numpy as np
+
+from delay_store import COO_GROUP, coo_to_dense, dense_to_coo, read_coo_slot
+from earth_geometry import ground_distance_km
+from position_store import TYPED_POSITION_GROUP, parse_string_positions
+from tracing import traced
+
+
+def h5_path_for(constellation_name):
+    """Returns the path the StarPerf pre-computation writes to."""
+    return f"data/XML_constellation/{constellation_name}.h5"
+
+
+class SnapshotReader:
+    """
+    Read-only access to the 'delay' and 'position' groups of one shell.
+    The reader can be pickled: the H5 handle is dropped and reopened
+    lazily, so a process pool can receive it as an initializer argument
+    and each worker opens the file exactly once.
+    """
+
+    def __init__(self, h5_file_path, shell_name):
+        self.h5_file_path = h5_file_path
+        self.shell_name = shell_name
+        self._file = None
+
+        h5_file = self._open()
+        if COO_GROUP in h5_file and shell_name in h5_file[COO_GROUP]:
+            self.delay_layout = 'coo'
+            coo_group = self._coo_group()
+            self._slot_offsets = coo_group['slot_offsets'][()]
+            self.num_timeslots = len(self._slot_offsets) - 1
+            self.num_satellites = int(coo_group.attrs['num_satellites'])
+        else:
+            self.delay_layout = 'dense'
+            delay_group = self._delay_group()
+            self.num_timeslots = len(delay_group.keys())
+            self.num_satellites = delay_group['timeslot1'].shape[0] - 1
+
+        self.typed_positions = TYPED_POSITION_GROUP in h5_file and shell_name in h5_file[TYPED_POSITION_GROUP]
+
+    # --- H5 handle management ---
+    def _open(self):
+        if self._file is None:
+            self._file = h5py.File(self.h5_file_path, 'r')
+        return self._file
+
+    def _delay_group(self):
+        return self._open()['delay'][self.shell_name]
+
+    def _coo_group(self):
+        return self._open()[COO_GROUP][self.shell_name]
+
+    def _position_group(self):
+        return self._open()['position'][self.shell_name]
+
+    def _typed_positions(self):
+        return self._open()[TYPED_POSITION_GROUP][self.shell_name]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+    # --- Per-timeslot data ---
+    def delay_matrix(self, time_slot):
+        """Returns the dense (N+1)x(N+1) delay matrix of a timeslot."""
+        if self.delay_layout == 'coo':
+            return coo_to_dense(self.num_satellites, *self.edges(time_slot))
+        return self._delay_group()[f'timeslot{time_slot}'][()]
+
+    @traced('h5.read_edges')
+    def edges(self, time_slot):
+        """
+        Returns the ISLs of a timeslot as three aligned arrays
+        (src_ids, dst_ids, delays) with src_id < dst_id.
+        """
+        if self.delay_layout == 'coo':
+            return read_coo_slot(self._coo_group(), self._slot_offsets, time_slot)
+        return dense_to_coo(self.delay_matrix(time_slot))
+
+    @traced('h5.read_positions')
+    def positions(self, time_slot):
+        """Returns the (N, 3) [lon, lat, alt] positions of a timeslot."""
+        if self.typed_positions:
+            return self._typed_positions()[time_slot - 1]
+        return parse_string_positions(self._position_group()[f'timeslot{time_slot}'][()])
+
+    def positions_range(self, first_slot, last_slot):
+        """
+        Returns the (k, N, 3) positions of timeslots first_slot..last_slot
+        (inclusive). With typed positions this is one contiguous read.
+        """
+        if self.typed_positions:
+            return self._typed_positions()[first_slot - 1:last_slot]
+        return np.stack([self.positions(t) for t in range(first_slot, last_slot + 1)])
+
+    def graph(self, time_slot, weights=None, integer_nodes=False):
+        """
+        Builds the NetworkX graph of a timeslot. If 'weights' is given it
+        replaces the real delays (e.g. with AI-predicted link weights).
+        With 'integer_nodes' the nodes are satellite IDs instead of
+        'satellite_<id>' names.
+        """
+        src, dst, delays = self.edges(time_slot)
+        return graph_from_edges(src, dst, delays if weights is None else weights, integer_nodes)
+
+
+@traced('graph.build')
+def graph_from_edges(src, dst, weights, integer_nodes=False):
+    """Builds a NetworkX graph from aligned edge arrays (see SnapshotReader.graph)."""
+    # networkx is imported on first use: array-only callers never pay for it
+    import networkx as nx
+
+    src, dst, weights = src.tolist(), dst.tolist(), np.asarray(weights).tolist()
+    G = nx.Graph()
+    if integer_nodes:
+        G.add_weighted_edges_from(zip(src, dst, weights))
+    else:
+        G.add_weighted_edges_from(
+            (f"satellite_{u}", f"satellite_{v}", w) for u, v, w in zip(src, dst, weights)
+        )
+    return G
+
+
+@traced('access.nearest_satellite')
+def nearest_satellite(positions, longitude, latitude):
+    """
+    Vectorized replacement for the per-satellite haversine loop: returns
+    the 1-based ID of the satellite whose sub-satellite point is closest
+    to (longitude, latitude), and that distance in km.
+    """
+    distances = ground_distance_km(float(latitude), float(longitude), positions[:, 1], positions[:, 0])
+    best = int(np.argmin(distances))
+    return best + 1, float(distances[best])
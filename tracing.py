@@ -0,0 +1,249 @@
+"""
+================================================================
+Hot-Path Tracing (Chrome trace-event JSON + summary table)
+================================================================
+Lightweight spans and counters for the hot paths (H5 read, graph
+build, access search, Dijkstra, betweenness, model predict, env step):
+
+    from tracing import span, traced, count
+
+    with span('route.dijkstra', pair=name):
+        ...
+
+    @traced('h5.read_edges')
+    def edges(self, time_slot): ...
+
+    count('env.transitions', n)
+
+Tracing is off by default; a disabled span() returns a shared no-op
+object and a disabled @traced function costs one flag check. Enable it
+with the STARPERF_TRACE=<file.json> environment variable (or
+'python cli.py --trace <file.json> <command> ...'), or enable() in code.
+
+With STARPERF_TRACE set, the main process writes <file.json> at exit
+(open it in chrome://tracing or https://ui.perfetto.dev) and prints a
+summary table (calls, total, self and max time per span). Worker
+processes of a pool write <file>.<pid>.json, which the main process
+merges into its trace. 'python tracing.py <trace.json>' prints the
+summary of a saved trace again.
+"""
+import atexit
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from multiprocessing import parent_process, util
+
+TRACE_ENV_VAR = 'STARPERF_TRACE'
+
+_enabled = False
+_trace_file = None
+_events = []
+_counters = {}
+_owner_pid = os.getpid()
+
+
+# --- 1. Spans and Counters ---
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start_ns')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end_ns = time.perf_counter_ns()
+        event = {'name': self.name, 'ph': 'X', 'ts': self.start_ns / 1000, 'dur': (end_ns - self.start_ns) / 1000,
+                 'pid': os.getpid(), 'tid': threading.get_ident()}
+        if self.args:
+            event['args'] = self.args
+        _record(event)
+        return False
+
+
+def span(name, **args):
+    """Context manager timing the enclosed block (nested spans nest in the trace)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorator form of span(); the span is named after the function by default."""
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(span_name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Adds 'value' to a counter (shown as a counter track in the trace)."""
+    if not _enabled:
+        return
+    _counters[name] = _counters.get(name, 0) + value
+    _record({'name': name, 'ph': 'C', 'ts': time.perf_counter_ns() / 1000, 'pid': os.getpid(),
+             'args': {name: _counters[name]}})
+
+
+def _record(event):
+    global _owner_pid
+    if os.getpid() != _owner_pid:
+        # First event in a forked worker: drop the parent's events and
+        # write this process's own trace file when the worker exits.
+        _owner_pid = os.getpid()
+        _events.clear()
+        _counters.clear()
+        if _trace_file:
+            util.Finalize(None, _write_worker_trace, exitpriority=10)
+    _events.append(event)
+
+
+# --- 2. Enabling and Export ---
+def enable(trace_file=None):
+    """Turns tracing on; with a trace_file the trace is written at process exit."""
+    global _enabled, _trace_file
+    _enabled = True
+    _trace_file = trace_file
+    if not trace_file:
+        return
+    if parent_process() is None:
+        atexit.register(_write_main_trace)
+    else:
+        # A spawned worker imports this module with the variable already set
+        util.Finalize(None, _write_worker_trace, exitpriority=10)
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def events():
+    return list(_events)
+
+
+def export_chrome_trace(output_file, trace_events=None):
+    """Writes trace events in the Chrome trace-event JSON format."""
+    with open(output_file, 'w') as f:
+        json.dump({'traceEvents': _events if trace_events is None else trace_events,
+                   'displayTimeUnit': 'ms'}, f)
+    return output_file
+
+
+def _worker_trace_pattern(trace_file):
+    base, extension = os.path.splitext(trace_file)
+    return f"{base}.[0-9]*{extension}"
+
+
+def _write_worker_trace():
+    base, extension = os.path.splitext(_trace_file)
+    export_chrome_trace(f"{base}.{os.getpid()}{extension}")
+
+
+def _write_main_trace():
+    trace_events = list(_events)
+    for worker_file in sorted(glob.glob(_worker_trace_pattern(_trace_file))):
+        with open(worker_file) as f:
+            trace_events.extend(json.load(f)['traceEvents'])
+        os.remove(worker_file)
+    export_chrome_trace(_trace_file, trace_events)
+    print(f"\nTrace written to {_trace_file} ({len(trace_events)} events)")
+    print_summary(trace_events)
+
+
+# --- 3. Summary ---
+def summarize(trace_events):
+    """
+    Per span name: calls, total time and self time (total minus time in
+    nested spans of the same thread), in milliseconds.
+    """
+    rows = {}
+    by_thread = {}
+    for event in trace_events:
+        if event.get('ph') == 'X':
+            by_thread.setdefault((event['pid'], event['tid']), []).append(event)
+
+    for thread_events in by_thread.values():
+        thread_events.sort(key=lambda e: (e['ts'], -e['dur']))
+        stack = []  # [end_ts, name, child_time]
+        for event in thread_events:
+            while stack and stack[-1][0] <= event['ts']:
+                _close_span(stack.pop(), rows)
+            if stack:
+                stack[-1][2] += event['dur']
+            stack.append([event['ts'] + event['dur'], event['name'], 0.0])
+            row = rows.setdefault(event['name'], {'calls': 0, 'total_ms': 0.0, 'self_ms': 0.0, 'max_ms': 0.0})
+            row['calls'] += 1
+            row['total_ms'] += event['dur'] / 1000
+            row['max_ms'] = max(row['max_ms'], event['dur'] / 1000)
+            row['self_ms'] += event['dur'] / 1000
+        while stack:
+            _close_span(stack.pop(), rows)
+
+    counters = {}
+    for event in trace_events:
+        if event.get('ph') == 'C':
+            key = (event['pid'], event['name'])
+            counters[key] = max(counters.get(key, 0), event['args'][event['name']])
+    totals = {}
+    for (_, name), value in counters.items():
+        totals[name] = totals.get(name, 0) + value
+    return rows, totals
+
+
+def _close_span(frame, rows):
+    _, name, child_time = frame
+    rows[name]['self_ms'] -= child_time / 1000
+
+
+def print_summary(trace_events=None):
+    rows, totals = summarize(_events if trace_events is None else trace_events)
+    print("\n======================================================================")
+    print("                      Trace Summary (by self time)")
+    print("======================================================================")
+    print(f"  {'span':<30} {'calls':>8} {'total ms':>11} {'self ms':>11} {'max ms':>9}")
+    for name, row in sorted(rows.items(), key=lambda item: -item[1]['self_ms']):
+        print(f"  {name:<30} {row['calls']:>8} {row['total_ms']:>11.2f} {row['self_ms']:>11.2f} {row['max_ms']:>9.3f}")
+    for name, value in sorted(totals.items()):
+        print(f"  counter {name:<22} {value:>12,.0f}")
+
+
+if os.environ.get(TRACE_ENV_VAR):
+    enable(os.environ[TRACE_ENV_VAR])
+
+
+if __name__ == '__main__':
+    import sys
+
+    with open(sys.argv[1]) as f:
+        print_summary(json.load(f)['traceEvents'])
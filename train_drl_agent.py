@@ -5,48 +5,171 @@ DRL Agent Training Script for Satellite Beam Steering
 This script initializes our custom SatelliteEnv, selects a DRL
 algorithm (PPO) from Stable Baselines3, trains the agent for a
 specified number of steps, and saves the resulting trained model.
+
+Scaling options:
+  --num-envs N --vec-env subproc   N SatelliteEnv worker processes
+  --vec-env batched                N episodes in one BatchedSatelliteEnv
+  --torch-threads K                threads for the policy update; env
+                                   workers are pinned to 1 thread each
+  --checkpoint-freq S / --resume   periodic checkpoints and resume
+
+Environment steps/s (rollout collection) and PPO update time are
+logged separately after every rollout.
 """
+import argparse
+import glob
+import os
 import time
-from stable_baselines3 import PPO
-from satellite_env import SatelliteEnv
 
-def train_agent():
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']
+
+def pin_threads(torch_threads):
+    """
+    Avoids oversubscription: worker processes inherit a single BLAS/OpenMP
+    thread from the environment variables, and the learner process uses
+    'torch_threads' threads for the policy update.
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = '1'
+    import torch
+    torch.set_num_threads(torch_threads)
+
+def make_training_env(num_envs, vec_env_type, seed):
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+    from satellite_env import SatelliteEnv
+
+    if vec_env_type == 'batched':
+        from batched_satellite_env import BatchedSatelliteEnv
+        return BatchedSatelliteEnv(num_envs, random_start=True, seed=seed)
+    vec_env_cls = SubprocVecEnv if vec_env_type == 'subproc' else DummyVecEnv
+    return make_vec_env(SatelliteEnv, n_envs=num_envs, seed=seed, vec_env_cls=vec_env_cls)
+
+def latest_checkpoint(checkpoint_dir, name_prefix):
+    checkpoints = glob.glob(os.path.join(checkpoint_dir, f"{name_prefix}_*_steps.zip"))
+    if not checkpoints:
+        return None
+    return max(checkpoints, key=lambda path: int(path.rsplit('_', 2)[-2]))
+
+def make_throughput_callback():
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    class ThroughputCallback(BaseCallback):
+        """Times rollout collection and PPO updates separately."""
+
+        def _on_training_start(self):
+            self.rollout_start = None
+            self.rollout_end = None
+            self.rollout_start_steps = self.num_timesteps
+            self.total_rollout_time = 0.0
+            self.total_rollout_steps = 0
+            self.total_update_time = 0.0
+
+        def _on_rollout_start(self):
+            now = time.perf_counter()
+            if self.rollout_end is not None:
+                update_time = now - self.rollout_end
+                self.total_update_time += update_time
+                self.logger.record('throughput/update_time_s', update_time)
+            self.rollout_start = now
+            self.rollout_start_steps = self.num_timesteps
+
+        def _on_rollout_end(self):
+            self.rollout_end = time.perf_counter()
+            rollout_time = self.rollout_end - self.rollout_start
+            self.total_rollout_time += rollout_time
+            steps = self.num_timesteps - self.rollout_start_steps
+            self.total_rollout_steps += steps
+            self.logger.record('throughput/env_steps_per_s', steps / rollout_time)
+            self.logger.record('throughput/rollout_time_s', rollout_time)
+
+        def _on_training_end(self):
+            if self.rollout_end is not None:
+                self.total_update_time += time.perf_counter() - self.rollout_end
+
+        def _on_step(self):
+            return True
+
+    return ThroughputCallback()
+
+def train_agent(training_steps=50000, num_envs=1, vec_env_type='dummy', torch_threads=1,
+                checkpoint_freq=0, checkpoint_dir='./checkpoints/', resume=None, seed=0):
+    pin_threads(torch_threads)
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.callbacks import CheckpointCallback
+
+    model_file = "drl_beam_steering_agent"
+
     print("--- Initializing the Satellite Environment ---")
-    env = SatelliteEnv()
-    print("Environment initialized.")
+    env = make_training_env(num_envs, vec_env_type, seed)
+    print(f"Environment initialized: {num_envs} env(s), vec env '{vec_env_type}', "
+          f"{torch_threads} torch thread(s).")
 
     # --- Model Definition ---
     # We will use the Proximal Policy Optimization (PPO) algorithm.
     # It's a robust and widely used DRL algorithm.
     # "MlpPolicy": Use a standard Multi-Layer Perceptron (a type of neural network).
     # verbose=1: Print training progress.
-    print("\n--- Defining the DRL (PPO) model ---")
-    model = PPO("MlpPolicy", env, verbose=1, tensorboard_log="./ppo_tensorboard/")
-    print("Model defined.")
+    if resume == 'latest':
+        resume = latest_checkpoint(checkpoint_dir, model_file)
+    if resume:
+        print(f"\n--- Resuming the DRL (PPO) model from {resume} ---")
+        model = PPO.load(resume, env=env, verbose=1, tensorboard_log="./ppo_tensorboard/")
+    else:
+        print("\n--- Defining the DRL (PPO) model ---")
+        model = PPO("MlpPolicy", env, verbose=1, tensorboard_log="./ppo_tensorboard/", seed=seed)
+    print(f"Model ready at {model.num_timesteps} timesteps.")
 
     # --- Training ---
     # total_timesteps: The total number of interactions (steps) the agent will
     # have with the environment. Let's start with 50,000 for a quick test.
     # For a "smarter" agent, this number should be much higher (e.g., 500,000 or 1M).
-    training_steps = 50000
-    print(f"\n--- Starting training for {training_steps} timesteps ---")
+    # When resuming, training continues until 'training_steps' in total.
+    remaining_steps = max(training_steps - model.num_timesteps, 0)
+    callbacks = [make_throughput_callback()]
+    if checkpoint_freq > 0:
+        # save_freq counts calls to env.step(), i.e. num_envs transitions each
+        callbacks.append(CheckpointCallback(save_freq=max(checkpoint_freq // num_envs, 1),
+                                            save_path=checkpoint_dir, name_prefix=model_file))
+
+    print(f"\n--- Starting training for {remaining_steps} timesteps ---")
     start_time = time.time()
-    
-    model.learn(total_timesteps=training_steps)
-    
+
+    model.learn(total_timesteps=remaining_steps, callback=callbacks, reset_num_timesteps=not resume)
+
     end_time = time.time()
+    throughput = callbacks[0]
     print("--- Training finished ---")
     print(f"Total training time: {end_time - start_time:.2f} seconds.")
+    if throughput.total_rollout_time > 0:
+        print(f"  Rollout collection: {throughput.total_rollout_time:.2f} s "
+              f"({throughput.total_rollout_steps / throughput.total_rollout_time:,.0f} env steps/s)")
+    print(f"  Policy updates:     {throughput.total_update_time:.2f} s")
 
     # --- Saving the Model ---
-    model_file = "drl_beam_steering_agent"
     print(f"\n--- Saving the trained agent to {model_file}.zip ---")
     model.save(model_file)
+    env.close()
     print("Agent saved successfully.")
 
     # Optional: You can view training curves by running this in the terminal:
     # tensorboard --logdir ./ppo_tensorboard/
 
-if __name__ == "__main__":
-    train_agent()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the PPO beam steering agent.")
+    parser.add_argument('--steps', type=int, default=50000, help="total training timesteps")
+    parser.add_argument('--num-envs', type=int, default=1, help="number of environment workers")
+    parser.add_argument('--vec-env', choices=['dummy', 'subproc', 'batched'], default='dummy')
+    parser.add_argument('--torch-threads', type=int, default=1, help="threads for the PPO update")
+    parser.add_argument('--checkpoint-freq', type=int, default=0,
+                        help="save a checkpoint every N timesteps (0 disables)")
+    parser.add_argument('--checkpoint-dir', default='./checkpoints/')
+    parser.add_argument('--resume', default=None, help="checkpoint .zip to resume from, or 'latest'")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
 
+if __name__ == "__main__":
+    args = parse_args()
+    train_agent(training_steps=args.steps, num_envs=args.num_envs, vec_env_type=args.vec_env,
+                torch_threads=args.torch_threads, checkpoint_freq=args.checkpoint_freq,
+                checkpoint_dir=args.checkpoint_dir, resume=args.resume, seed=args.seed)
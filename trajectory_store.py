@@ -0,0 +1,92 @@
+"""
+================================================================
+Bulk Trajectory Store: all satellites as one (T, N, 3) float32 array
+================================================================
+extract_single_sat_data.py reads one satellite per pass and parses
+every string coordinate with float(). This script reads the whole
+'position' group of a shell ONCE and writes:
+
+- <prefix>.npy   (T, N, 3) float32 [lon, lat, alt], memory-mappable
+- <prefix>.json  metadata (source file, shell, shape, columns, dT)
+
+Any satellite's trajectory is then a zero-copy slice of the mapped
+array: satellite_trajectory(positions, satellite_id).
+"""
+import json
+import time
+
+import numpy as np
+
+from position_store import COLUMNS
+from snapshot_reader import SnapshotReader, h5_path_for
+
+# Timeslots copied per read; one block is a single read with typed positions.
+SLOT_BLOCK = 256
+
+
+def extract_constellation_trajectories(h5_file_path, shell_name, output_prefix, time_step_s=None):
+    """One pass over the position group; returns the path of the .npy store."""
+    reader = SnapshotReader(h5_file_path, shell_name)
+    shape = (reader.num_timeslots, reader.num_satellites, len(COLUMNS))
+
+    store_file = f"{output_prefix}.npy"
+    positions = np.lib.format.open_memmap(store_file, mode='w+', dtype=np.float32, shape=shape)
+    for first_slot in range(1, reader.num_timeslots + 1, SLOT_BLOCK):
+        last_slot = min(first_slot + SLOT_BLOCK - 1, reader.num_timeslots)
+        positions[first_slot - 1:last_slot] = reader.positions_range(first_slot, last_slot)
+    positions.flush()
+    del positions
+    reader.close()
+
+    metadata = {
+        'source_file': h5_file_path,
+        'shell_name': shell_name,
+        'num_timeslots': shape[0],
+        'num_satellites': shape[1],
+        'columns': COLUMNS,
+        'dtype': 'float32',
+        'time_step_s': time_step_s,
+        'satellite_axis': "index = satellite_id - 1",
+    }
+    with open(f"{output_prefix}.json", 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return store_file
+
+
+def load_trajectory_store(output_prefix):
+    """Memory-maps a store read-only; returns (positions, metadata)."""
+    positions = np.load(f"{output_prefix}.npy", mmap_mode='r')
+    with open(f"{output_prefix}.json") as f:
+        metadata = json.load(f)
+    return positions, metadata
+
+
+def satellite_trajectory(positions, satellite_id):
+    """Zero-copy (T, 3) [lon, lat, alt] view of one satellite (1-based ID)."""
+    return positions[:, satellite_id - 1, :]
+
+
+def save_env_trajectory(positions, satellite_id, output_file):
+    """Writes the (T, 2) [lat, lon] '.npy' layout SatelliteEnv memory-maps."""
+    trajectory = satellite_trajectory(positions, satellite_id)
+    np.save(output_file, np.ascontiguousarray(trajectory[:, [1, 0]], dtype=np.float32))
+    return output_file
+
+
+if __name__ == '__main__':
+    constellation_name = "Telesat"
+    time_step_s = 60
+    h5_file_path = h5_path_for(constellation_name)
+    output_prefix = f"{constellation_name}_positions"
+
+    # The H5 file must already exist (run any of the pre-computation scripts first).
+    with SnapshotReader(h5_file_path, 'shell1') as probe:
+        print(f"Extracting {probe.num_timeslots} timeslots x {probe.num_satellites} satellites...")
+
+    start_time = time.time()
+    store_file = extract_constellation_trajectories(h5_file_path, 'shell1', output_prefix, time_step_s)
+    print(f"Trajectory store saved to {store_file} in {time.time() - start_time:.2f} seconds.")
+
+    positions, metadata = load_trajectory_store(output_prefix)
+    save_env_trajectory(positions, 1, 'satellite_1_trajectory.npy')
+    print("Satellite 1 trajectory saved to satellite_1_trajectory.npy for SatelliteEnv.")
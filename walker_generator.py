@@ -0,0 +1,247 @@
+"""
+================================================================
+Vectorized Walker-Delta +Grid Constellation Generator
+================================================================
+constellation_configuration() + execute_connection_policy() take
+hours for large shells. This generator produces the same H5 data for
+an idealised Walker-Delta shell i:T/P/F (circular orbits, spherical
+Earth) in seconds to minutes:
+
+1. propagate_walker_delta() computes the Earth-fixed position of
+   every satellite in every timeslot in ONE NumPy broadcast
+   (RAAN 360/P apart, in-plane spacing 360/S, phase offset
+   F*360/T between adjacent planes, Earth rotation).
+2. plus_grid_links() builds the +Grid ISLs: next satellite in the
+   plane and the same slot in the next plane. Across the seam (last
+   plane -> first plane) the Walker phase offset adds up to F slots,
+   so slot s links to slot s + F of the first plane.
+   check_line_of_sight() rejects ISLs that would cross the Earth.
+3. Delays are straight-line distances / speed of light for all links
+   and all timeslots at once.
+
+Satellite IDs run plane by plane from 1, like StarPerf. The output
+layout is selected with 'layout':
+
+- 'starperf': position/<shell>/timeslot<t> string tables and dense
+              delay/<shell>/timeslot<t> matrices (as the pre-compute)
+- 'compact':  delay_coo/<shell> (delay_store.py) and
+              position_array/<shell> (position_store.py)
+- 'both', or 'auto' = 'starperf' up to 2000 satellites, else 'compact'
+
+Dense (N+1)^2 matrices do not scale (800 MB per slot at 10k
+satellites), which is why 'auto' switches to the compact layout.
+"""
+import argparse
+import json
+import time
+
+import h5py
+import numpy as np
+
+from constellation_index import ConstellationIndex
+from delay_store import SparseDelayWriter
+from earth_geometry import EARTH_RADIUS_KM, SPEED_OF_LIGHT_KM_S
+from position_store import write_positions
+
+EARTH_MU_KM3_S2 = 398600.4418
+EARTH_ROTATION_RAD_S = 7.2921159e-5
+DENSE_LAYOUT_MAX_SATELLITES = 2000
+
+# name: (planes, satellites per plane, phasing F, altitude km, inclination deg)
+PRESETS = {
+    'telesat': (27, 13, 1, 1015.0, 98.98),
+    'oneweb': (18, 36, 1, 1200.0, 87.9),
+    'starlink': (72, 22, 39, 550.0, 53.0),
+    'mega': (100, 100, 1, 550.0, 53.0),
+}
+
+
+# --- 1. Orbits ---
+def orbital_period_s(altitude_km):
+    return 2 * np.pi * np.sqrt((EARTH_RADIUS_KM + altitude_km) ** 3 / EARTH_MU_KM3_S2)
+
+
+def propagate_walker_delta(planes, sats_per_plane, phasing, altitude_km, inclination_deg, times_s):
+    """
+    Earth-fixed Cartesian positions (km) of all satellites at all times:
+    returns a (len(times_s), planes * sats_per_plane, 3) array.
+    """
+    num_satellites = planes * sats_per_plane
+    ids = np.arange(num_satellites)
+    plane, slot = ids // sats_per_plane, ids % sats_per_plane
+    radius = EARTH_RADIUS_KM + altitude_km
+    mean_motion = np.sqrt(EARTH_MU_KM3_S2 / radius ** 3)
+    inclination = np.radians(inclination_deg)
+    times = np.asarray(times_s, dtype=np.float64)[:, None]
+
+    raan = 2 * np.pi * plane / planes
+    # Argument of latitude: in-plane spacing + Walker phase offset + motion
+    u = 2 * np.pi * slot / sats_per_plane + 2 * np.pi * phasing * plane / num_satellites + mean_motion * times
+    cos_u, sin_u = np.cos(u), np.sin(u)
+    cos_raan, sin_raan = np.cos(raan), np.sin(raan)
+    x = cos_raan * cos_u - sin_raan * sin_u * np.cos(inclination)
+    y = sin_raan * cos_u + cos_raan * sin_u * np.cos(inclination)
+    z = np.broadcast_to(sin_u * np.sin(inclination), x.shape)
+
+    # Inertial -> Earth-fixed: rotate by the Earth rotation angle
+    theta = EARTH_ROTATION_RAD_S * times
+    cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+    return radius * np.stack([cos_theta * x + sin_theta * y, -sin_theta * x + cos_theta * y, z], axis=-1)
+
+
+def cartesian_to_lon_lat_alt(xyz):
+    """(..., 3) Earth-fixed km -> (..., 3) [lon, lat, alt] in degrees / km (spherical Earth)."""
+    radius = np.linalg.norm(xyz, axis=-1)
+    lon = np.degrees(np.arctan2(xyz[..., 1], xyz[..., 0]))
+    lat = np.degrees(np.arcsin(xyz[..., 2] / radius))
+    return np.stack([lon, lat, radius - EARTH_RADIUS_KM], axis=-1)
+
+
+# --- 2. +Grid Links ---
+def plus_grid_links(planes, sats_per_plane, seam=True, phasing=0):
+    """
+    1-based (src, dst) ID arrays with src < dst: the next satellite in
+    the same plane, and the same slot in the next plane ('seam' also
+    links the last plane back to the first). Going once around all
+    planes shifts the argument of latitude by F slots, so the seam
+    links slot s to slot (s + F) % S of the first plane.
+    """
+    ids = np.arange(planes * sats_per_plane)
+    plane, slot = ids // sats_per_plane, ids % sats_per_plane
+    intra_dst = plane * sats_per_plane + (slot + 1) % sats_per_plane
+    has_next_plane = np.ones_like(ids, dtype=bool) if seam else plane < planes - 1
+    inter_src = ids[has_next_plane]
+    next_slot = np.where(plane == planes - 1, (slot + phasing) % sats_per_plane, slot)
+    inter_dst = ((plane[has_next_plane] + 1) % planes) * sats_per_plane + next_slot[has_next_plane]
+
+    src = np.concatenate([ids, inter_src])
+    dst = np.concatenate([intra_dst, inter_dst])
+    links = np.unique(np.stack([np.minimum(src, dst), np.maximum(src, dst)], axis=1), axis=0)
+    links = links[links[:, 0] != links[:, 1]]
+    return (links[:, 0] + 1).astype(np.int32), (links[:, 1] + 1).astype(np.int32)
+
+
+def line_of_sight_limit_km(altitude_km):
+    """Longest chord between two satellites at altitude_km that clears the (spherical) Earth."""
+    return 2 * np.sqrt((EARTH_RADIUS_KM + altitude_km) ** 2 - EARTH_RADIUS_KM ** 2)
+
+
+def check_line_of_sight(delays, altitude_km):
+    """Raises ValueError if any ISL in the (T, E) delays is longer than the line of sight."""
+    longest_km = float(delays.max()) * SPEED_OF_LIGHT_KM_S if delays.size else 0.0
+    limit_km = line_of_sight_limit_km(altitude_km)
+    if longest_km > limit_km:
+        raise ValueError(f"ISLs of up to {longest_km:.0f} km cross the Earth (line of sight at "
+                         f"{altitude_km} km: {limit_km:.0f} km); use more planes/satellites per plane.")
+    return longest_km
+
+
+def light_time_delays(xyz, src, dst):
+    """(T, E) one-way delays in seconds of links (src, dst) (1-based) for every timeslot."""
+    return np.linalg.norm(xyz[:, src - 1] - xyz[:, dst - 1], axis=-1) / SPEED_OF_LIGHT_KM_S
+
+
+# --- 3. H5 Output ---
+def write_starperf_layout(h5_file, shell_name, positions, src, dst, delays):
+    """String position tables and dense (N+1)x(N+1) delay matrices, one per timeslot."""
+    num_satellites = positions.shape[1]
+    position_group = h5_file.require_group('position').require_group(shell_name)
+    delay_group = h5_file.require_group('delay').require_group(shell_name)
+    for t in range(positions.shape[0]):
+        position_group.create_dataset(f'timeslot{t + 1}', data=positions[t].astype(str).astype('S'))
+        matrix = np.zeros((num_satellites + 1, num_satellites + 1))
+        matrix[src, dst] = delays[t]
+        matrix[dst, src] = delays[t]
+        delay_group.create_dataset(f'timeslot{t + 1}', data=matrix)
+
+
+def write_compact_layout(h5_file, shell_name, positions, src, dst, delays):
+    """COO delays (delay_store.py) and one typed (T, N, 3) position dataset."""
+    writer = SparseDelayWriter(h5_file, shell_name, positions.shape[1])
+    for t in range(positions.shape[0]):
+        writer.append_slot(src, dst, delays[t])
+    writer.close()
+    write_positions(h5_file, shell_name, positions)
+
+
+def generate_walker_delta(output_file, planes, sats_per_plane, phasing, altitude_km, inclination_deg,
+                          time_step_s=60, num_timeslots=None, shell_name='shell1', layout='auto', seam=True):
+    """
+    Generates one shell and writes it to 'output_file' (a new file).
+    By default the timeslots cover one orbital period, like the
+    pre-computation with max_duration=True. Returns the ConstellationIndex.
+    """
+    num_satellites = planes * sats_per_plane
+    if num_timeslots is None:
+        num_timeslots = int(orbital_period_s(altitude_km) / time_step_s)
+    if layout == 'auto':
+        layout = 'starperf' if num_satellites <= DENSE_LAYOUT_MAX_SATELLITES else 'compact'
+
+    # StarPerf's first timeslot is t = dT, not t = 0
+    times = np.arange(1, num_timeslots + 1) * time_step_s
+    xyz = propagate_walker_delta(planes, sats_per_plane, phasing, altitude_km, inclination_deg, times)
+    positions = cartesian_to_lon_lat_alt(xyz)
+    src, dst = plus_grid_links(planes, sats_per_plane, seam, phasing)
+    delays = light_time_delays(xyz, src, dst)
+    check_line_of_sight(delays, altitude_km)
+
+    with h5py.File(output_file, 'w') as f:
+        if layout in ('starperf', 'both'):
+            write_starperf_layout(f, shell_name, positions, src, dst, delays)
+        if layout in ('compact', 'both'):
+            write_compact_layout(f, shell_name, positions, src, dst, delays)
+        f.attrs['generator'] = json.dumps({
+            'type': 'walker_delta', 'planes': planes, 'sats_per_plane': sats_per_plane, 'phasing': phasing,
+            'altitude_km': altitude_km, 'inclination_deg': inclination_deg, 'time_step_s': time_step_s,
+            'num_timeslots': num_timeslots, 'seam': seam, 'layout': layout,
+        })
+    return ConstellationIndex.walker(planes, sats_per_plane, shell_name=shell_name)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Synthetic Walker-Delta +Grid constellation generator.")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default=None)
+    parser.add_argument('--planes', type=int, default=27)
+    parser.add_argument('--sats-per-plane', type=int, default=13)
+    parser.add_argument('--phasing', type=int, default=1)
+    parser.add_argument('--altitude', type=float, default=1015.0, help="km")
+    parser.add_argument('--inclination', type=float, default=98.98, help="degrees")
+    parser.add_argument('--time-step', type=int, default=60, help="seconds per timeslot")
+    parser.add_argument('--timeslots', type=int, default=None, help="default: one orbital period")
+    parser.add_argument('--layout', choices=['auto', 'starperf', 'compact', 'both'], default='auto')
+    parser.add_argument('--no-seam', action='store_true', help="no ISLs between the last and first plane")
+    parser.add_argument('--output', default='data/XML_constellation/Synthetic.h5')
+    parser.add_argument('--check', action='store_true',
+                        help="check the longest ISL of every preset against the line of sight and exit")
+    return parser.parse_args()
+
+
+def check_presets(time_step_s=60):
+    """Longest ISL over one orbit of every preset vs. the line of sight; returns True if all pass."""
+    passed = True
+    print(f"  {'preset':<10} {'longest ISL km':>15} {'line of sight km':>17}")
+    for name, (planes, sats_per_plane, phasing, altitude_km, inclination_deg) in PRESETS.items():
+        times = np.arange(1, int(orbital_period_s(altitude_km) / time_step_s) + 1) * time_step_s
+        xyz = propagate_walker_delta(planes, sats_per_plane, phasing, altitude_km, inclination_deg, times)
+        src, dst = plus_grid_links(planes, sats_per_plane, True, phasing)
+        longest_km = float(light_time_delays(xyz, src, dst).max()) * SPEED_OF_LIGHT_KM_S
+        limit_km = line_of_sight_limit_km(altitude_km)
+        passed &= longest_km <= limit_km
+        print(f"  {name:<10} {longest_km:>15.0f} {limit_km:>17.0f}  {'ok' if longest_km <= limit_km else 'FAIL'}")
+    return passed
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.check:
+        raise SystemExit(0 if check_presets(args.time_step) else 1)
+    if args.preset:
+        args.planes, args.sats_per_plane, args.phasing, args.altitude, args.inclination = PRESETS[args.preset]
+
+    start_time = time.time()
+    index = generate_walker_delta(args.output, args.planes, args.sats_per_plane, args.phasing, args.altitude,
+                                  args.inclination, args.time_step, args.timeslots, layout=args.layout,
+                                  seam=not args.no_seam)
+    print(f"Generated {index.num_satellites} satellites "
+          f"({args.planes} planes x {args.sats_per_plane}, F={args.phasing}) "
+          f"in {time.time() - start_time:.2f} seconds -> {args.output}")